@@ -193,6 +193,67 @@
     if (roleEl && !roleEl.textContent.trim()) roleEl.textContent = session.papel || 'Equipe';
   }
 
+  // Sino de notificações: contador de não lidas ao lado do link "Notificações".
+  // O endpoint responde com ETag; com cache 'no-cache' o navegador revalida
+  // (If-None-Match) e, se nada mudou, recebe 304 sem corpo.
+  const BADGE_URL = '/api/notificacoes/contador';
+  const BADGE_INTERVAL_MS = 60000;
+
+  function wireNotificationBadge() {
+    if (isLoginPage()) return;
+
+    const links = Array.from(
+      document.querySelectorAll('.nav-menu a.nav-link, aside .nav-menu a, .sidebar .nav-menu a')
+    ).filter((a) => (a.textContent || '').toLowerCase().includes('notific'));
+    if (!links.length) return;
+
+    const badges = links.map((a) => {
+      let badge = a.querySelector('.nav-badge');
+      if (!badge) {
+        badge = document.createElement('span');
+        badge.className = 'nav-badge';
+        badge.style.cssText =
+          'margin-left:auto;min-width:1.25rem;padding:0 .4rem;border-radius:999px;' +
+          'background:var(--vta-orange, #f57c00);color:#fff;font-size:.75rem;' +
+          'line-height:1.25rem;text-align:center;display:none;';
+        a.appendChild(badge);
+      }
+      return badge;
+    });
+
+    let timer = null;
+    let stopped = false;
+
+    async function refresh() {
+      if (stopped) return;
+      try {
+        const response = await fetch(BADGE_URL, { cache: 'no-cache', credentials: 'same-origin' });
+        if (response.status === 401 || response.status === 403) {
+          // Sem sessão no servidor (protótipo só com localStorage): não insiste
+          stopped = true;
+          clearInterval(timer);
+          return;
+        }
+        if (!response.ok) return;
+        const { nao_lidas: naoLidas } = await response.json();
+        badges.forEach((badge) => {
+          badge.textContent = naoLidas > 99 ? '99+' : String(naoLidas);
+          badge.style.display = naoLidas > 0 ? 'inline-block' : 'none';
+        });
+      } catch {
+        // Rede fora: tenta de novo no próximo intervalo
+      }
+    }
+
+    refresh();
+    timer = setInterval(() => {
+      if (document.visibilityState === 'visible') refresh();
+    }, BADGE_INTERVAL_MS);
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'visible') refresh();
+    });
+  }
+
   // Execução ao carregar documento
   document.addEventListener('DOMContentLoaded', () => {
     enforceAuth();
@@ -202,5 +263,6 @@
     wireBack();
     applyLayoutFixIfNeeded();
     hydrateUserHeader();
+    wireNotificationBadge();
   });
 })();
\ No newline at end of file
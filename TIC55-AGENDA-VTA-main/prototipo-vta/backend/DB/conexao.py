@@ -1,9 +1,21 @@
 import psycopg2
 import psycopg2.extras
 import os
+import threading
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context
+from backend.DB.pool import PoolConexoes
+
+# Chave usada em app.extensions para ligar a conexão por requisição
+EXTENSAO_CONEXAO_REQUISICAO = "vta_conexao_por_requisicao"
 
 class Conexao:
 
+    # Pools compartilhados pelo processo inteiro, um por configuração de banco.
+    # Todos os serviços (AutenticacaoServico, SalaServico, ...) usam o mesmo.
+    _pools: dict = {}
+    _pools_lock = threading.Lock()
+
     # Inicializa a configuração de conexão, pode usar string ou variáveis de ambiente.
     def __init__(self, conn_str=None):
         if conn_str:
@@ -21,11 +33,120 @@ class Conexao:
                 "port": os.getenv("DB_PORT", "5432"),
             }
 
-    # Abre uma conexão com o banco de dados PostgreSQL.
-    def _get_conn(self):
+    # Abre uma conexão nova com o banco de dados PostgreSQL (usada pelo pool).
+    def _abrir_conexao(self):
         if self.conn_str:
             # Conecta usando string de conexão direta
             return psycopg2.connect(self.conn_str, cursor_factory=psycopg2.extras.RealDictCursor)
         else:
             # Conecta usando dicionário de configuração
-            return psycopg2.connect(**self.db_config, cursor_factory=psycopg2.extras.RealDictCursor)
\ No newline at end of file
+            return psycopg2.connect(**self.db_config, cursor_factory=psycopg2.extras.RealDictCursor)
+
+    # Chave que identifica o banco; serviços com a mesma configuração dividem o pool.
+    def _chave_pool(self):
+        if self.conn_str:
+            return self.conn_str
+        return tuple(sorted(self.db_config.items()))
+
+    # Retorna (criando na primeira vez) o pool do processo para esta configuração.
+    def _get_pool(self) -> PoolConexoes:
+        chave = self._chave_pool()
+        pool = Conexao._pools.get(chave)
+        if pool is not None:
+            return pool
+
+        with Conexao._pools_lock:
+            pool = Conexao._pools.get(chave)
+            if pool is None:
+                pool = PoolConexoes(
+                    self._abrir_conexao,
+                    minimo=int(os.getenv("DB_POOL_MIN", "1")),
+                    maximo=int(os.getenv("DB_POOL_MAX", "10")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                    verificar_apos=float(os.getenv("DB_POOL_VERIFICAR_APOS", "30")),
+                )
+                Conexao._pools[chave] = pool
+            return pool
+
+    # Empresta uma conexão do pool. Uso: `with self._get_conn() as conn:`.
+    # Ao sair do bloco faz commit (ou rollback em caso de erro) e devolve ao pool.
+    # Dentro de uma requisição Flask (com registrar_app), todos os serviços
+    # reutilizam a mesma conexão, que só volta ao pool no teardown.
+    @contextmanager
+    def _get_conn(self):
+        if self._escopo_requisicao_ativo():
+            conn = self._conexao_da_requisicao()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return
+
+        pool = self._get_pool()
+        conn = pool.obter()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pool.devolver(conn, descartar=True)
+                raise
+            pool.devolver(conn)
+            raise
+        else:
+            pool.devolver(conn)
+
+    # Indica se há uma requisição Flask com conexão por requisição habilitada.
+    @staticmethod
+    def _escopo_requisicao_ativo() -> bool:
+        return has_app_context() and current_app.extensions.get(EXTENSAO_CONEXAO_REQUISICAO, False)
+
+    # Retorna a conexão desta requisição (guardada em flask.g), emprestando na primeira vez.
+    def _conexao_da_requisicao(self):
+        conexoes = g.setdefault("_vta_conexoes", {})
+        chave = self._chave_pool()
+        if chave not in conexoes:
+            pool = self._get_pool()
+            conexoes[chave] = (pool, pool.obter())
+        return conexoes[chave][1]
+
+    # Devolve já ao pool a conexão desta requisição, antes de um trabalho longo
+    # sem banco (ex.: PBKDF2). O próximo _get_conn da requisição empresta outra.
+    # Use só fora de um bloco `with self._get_conn()` (transação já encerrada).
+    def _liberar_conexao_requisicao(self):
+        if not self._escopo_requisicao_ativo():
+            return
+        item = g.get("_vta_conexoes", {}).pop(self._chave_pool(), None)
+        if item is not None:
+            pool, conn = item
+            pool.devolver(conn)
+
+    # Liga a conexão por requisição no app e registra a devolução no teardown.
+    @classmethod
+    def registrar_app(cls, app):
+        app.extensions[EXTENSAO_CONEXAO_REQUISICAO] = True
+        app.teardown_appcontext(cls.liberar_conexoes_requisicao)
+
+    # Devolve ao pool as conexões usadas na requisição (hook de teardown do Flask).
+    @staticmethod
+    def liberar_conexoes_requisicao(exc=None):
+        conexoes = g.pop("_vta_conexoes", {})
+        for pool, conn in conexoes.values():
+            pool.devolver(conn)
+
+    # Estatísticas do pool usado por este serviço (em uso, ociosas, esperas...).
+    def estatisticas_pool(self) -> dict:
+        return self._get_pool().estatisticas()
+
+    # Fecha todos os pools do processo (ex.: no encerramento da aplicação).
+    @classmethod
+    def fechar_pools(cls):
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.fechar()
@@ -0,0 +1,258 @@
+"""
+Barramento de invalidação de caches entre workers (PostgreSQL LISTEN/NOTIFY).
+
+Cada worker guarda caches locais (salas, usuários, dias da agenda). Quando um
+serviço escreve no banco, publica no canal o nome do cache e as chaves
+afetadas; o NOTIFY vai na mesma transação da escrita, então só é entregue
+se ela for commitada. Uma thread por worker escuta o canal e remove as
+chaves dos caches registrados.
+
+Se a conexão de escuta cair, mensagens podem ter se perdido: o barramento
+limpa todos os caches e reconecta com espera crescente.
+
+Com gunicorn --preload, chame `iniciar()` depois do fork (em cada worker).
+"""
+
+import json
+import os
+import select
+import threading
+from backend.DB.conexao import Conexao
+
+# Canal do PostgreSQL usado pelo barramento
+CANAL_INVALIDACAO = "vta_invalidacao"
+
+# O payload do NOTIFY é limitado a 8000 bytes; acima disso invalida o cache todo
+TAMANHO_MAXIMO_PAYLOAD = 7900
+
+
+class BarramentoInvalidacao(Conexao):
+    """
+    Publica e recebe invalidações de cache via LISTEN/NOTIFY.
+
+    Caches se registram com `registrar(nome, callback)`; o callback recebe a
+    lista de chaves a remover, ou None para limpar o cache inteiro.
+    """
+
+    def __init__(self, conn_str=None, canal: str = CANAL_INVALIDACAO,
+                 intervalo_verificacao: float = 30.0, espera_reconexao: float = 1.0,
+                 espera_maxima: float = 30.0):
+        """
+        Inicializa o barramento (sem conectar).
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            canal: Canal do LISTEN/NOTIFY
+            intervalo_verificacao: Segundos sem mensagens até testar a conexão
+            espera_reconexao: Espera inicial entre tentativas de reconexão
+            espera_maxima: Espera máxima entre tentativas de reconexão
+        """
+        super().__init__(conn_str)
+        self.canal = canal
+        self.intervalo_verificacao = intervalo_verificacao
+        self.espera_reconexao = espera_reconexao
+        self.espera_maxima = espera_maxima
+
+        self._callbacks: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._parar = threading.Event()
+        self.conectado = threading.Event()
+
+        # Estatísticas
+        self._publicadas = 0
+        self._recebidas = 0
+        self._reconexoes = 0
+        self._limpezas_totais = 0
+
+    def registrar(self, cache: str, callback) -> None:
+        """
+        Registra um cache local para receber invalidações.
+
+        Args:
+            cache: Nome do cache (ex.: "sala", "usuario", "agenda")
+            callback: Função chamada com a lista de chaves, ou None para limpar tudo
+        """
+        with self._lock:
+            self._callbacks.setdefault(cache, []).append(callback)
+
+    def publicar(self, cur, cache: str, chaves: list | None = None) -> None:
+        """
+        Publica uma invalidação na transação do cursor informado.
+
+        O NOTIFY só é entregue aos outros workers no commit; neste worker as
+        chaves já saem do cache local na hora.
+
+        Args:
+            cur: Cursor da transação que fez a escrita
+            cache: Nome do cache afetado
+            chaves: Chaves alteradas (None para invalidar o cache inteiro)
+        """
+        if chaves is not None:
+            chaves = [str(c) for c in chaves]
+
+        payload = self._payload(cache, chaves)
+        if len(payload.encode()) > TAMANHO_MAXIMO_PAYLOAD:
+            payload = self._payload(cache, None)
+
+        cur.execute("SELECT pg_notify(%s, %s);", (self.canal, payload))
+        self._invalidar(cache, chaves)
+
+        with self._lock:
+            self._publicadas += 1
+
+    def cabe(self, cache: str, chaves: list) -> bool:
+        """
+        Verifica se as chaves cabem em um único NOTIFY.
+
+        Mede o payload final (as chaves vão escapadas dentro do JSON). Quem
+        publica mensagens, e não só chaves, usa isto para não cair na
+        invalidação do cache inteiro.
+
+        Args:
+            cache: Nome do cache (ou canal)
+            chaves: Chaves a publicar
+
+        Returns:
+            True se o payload fica dentro de TAMANHO_MAXIMO_PAYLOAD
+        """
+        payload = self._payload(cache, [str(c) for c in chaves])
+        return len(payload.encode()) <= TAMANHO_MAXIMO_PAYLOAD
+
+    @staticmethod
+    def _payload(cache: str, chaves: list | None) -> str:
+        return json.dumps({"cache": cache, "chaves": chaves, "origem": os.getpid()})
+
+    def publicar_agora(self, cache: str, chaves: list | None = None) -> None:
+        """
+        Publica fora de uma transação de escrita (transação curta própria).
+
+        Para quem publica depois do commit, como o canal de eventos ao vivo.
+
+        Args:
+            cache: Nome do cache (ou canal) afetado
+            chaves: Chaves alteradas (None para invalidar o cache inteiro)
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            self.publicar(cur, cache, chaves)
+            conn.commit()
+
+    def _invalidar(self, cache: str, chaves: list | None) -> None:
+        """Aplica a invalidação nos caches locais registrados com esse nome."""
+        with self._lock:
+            callbacks = list(self._callbacks.get(cache, []))
+
+        for callback in callbacks:
+            try:
+                callback(chaves)
+            except Exception as e:
+                print(f"Erro ao invalidar cache {cache}: {e}")
+
+    def _processar(self, payload: str) -> None:
+        """Trata uma mensagem recebida do canal."""
+        try:
+            mensagem = json.loads(payload)
+            cache = mensagem["cache"]
+        except (ValueError, KeyError, TypeError):
+            print(f"Mensagem de invalidação inválida: {payload!r}")
+            return
+
+        with self._lock:
+            self._recebidas += 1
+
+        self._invalidar(cache, mensagem.get("chaves"))
+
+    def invalidar_tudo(self) -> None:
+        """Limpa todos os caches registrados (fallback após perda de mensagens)."""
+        with self._lock:
+            caches = list(self._callbacks)
+            self._limpezas_totais += 1
+
+        for cache in caches:
+            self._invalidar(cache, None)
+
+    def iniciar(self) -> None:
+        """Inicia a thread de escuta deste worker (idempotente)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._escutar, name="vta-invalidacao", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Encerra a thread de escuta."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _escutar(self) -> None:
+        """Laço da thread: conecta, escuta e reconecta quando a conexão cai."""
+        espera = self.espera_reconexao
+
+        while not self._parar.is_set():
+            conn = None
+            try:
+                # Conexão dedicada, fora do pool: fica presa no LISTEN
+                conn = self._abrir_conexao()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.canal};")
+
+                # O que mudou enquanto não escutávamos não vai chegar
+                self.invalidar_tudo()
+                self.conectado.set()
+                espera = self.espera_reconexao
+
+                while not self._parar.is_set():
+                    prontos, _, _ = select.select([conn], [], [], self.intervalo_verificacao)
+                    if prontos:
+                        conn.poll()
+                    else:
+                        # Sem mensagens há um tempo: confirma que a conexão está viva
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT 1;")
+
+                    while conn.notifies:
+                        self._processar(conn.notifies.pop(0).payload)
+
+            except Exception as e:
+                print(f"Barramento de invalidação desconectado: {e}")
+
+            finally:
+                self.conectado.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+            if self._parar.is_set():
+                break
+
+            self.invalidar_tudo()
+            with self._lock:
+                self._reconexoes += 1
+            self._parar.wait(espera)
+            espera = min(espera * 2, self.espera_maxima)
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna contadores do barramento.
+
+        Returns:
+            Dicionário com conectado, publicadas, recebidas, reconexoes e limpezas_totais
+        """
+        with self._lock:
+            return {
+                "conectado": self.conectado.is_set(),
+                "publicadas": self._publicadas,
+                "recebidas": self._recebidas,
+                "reconexoes": self._reconexoes,
+                "limpezas_totais": self._limpezas_totais,
+            }
+
+
+# Barramento do processo, compartilhado pelos serviços e caches
+barramento_invalidacao = BarramentoInvalidacao()
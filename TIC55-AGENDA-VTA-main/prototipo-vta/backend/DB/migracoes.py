@@ -0,0 +1,362 @@
+"""
+Migrações de esquema do banco da agenda.
+
+Cada migração tem um nome único e é aplicada uma única vez, em ordem, dentro
+de uma transação protegida por advisory lock (vários workers podem subir ao
+mesmo tempo sem aplicar a mesma migração duas vezes).
+
+Uso (a partir de prototipo-vta/):
+    python -m backend.DB.migracoes
+"""
+
+from backend.DB.conexao import Conexao
+
+# Chave do advisory lock usado durante a aplicação das migrações
+CHAVE_LOCK_MIGRACOES = 7_310_001
+
+# (nome, sql) em ordem de aplicação. Nunca edite uma migração já publicada:
+# crie uma nova.
+MIGRACOES = [
+    ("001_agendamento", """
+        CREATE TABLE IF NOT EXISTS agendamento (
+            uuid                 UUID PRIMARY KEY,
+            fk_sala_uuid         UUID NOT NULL,
+            fk_profissional_uuid UUID NOT NULL,
+            fk_cliente_uuid      UUID NOT NULL,
+            fk_pet_uuid          UUID NOT NULL,
+            inicio               TIMESTAMP NOT NULL,
+            fim                  TIMESTAMP NOT NULL,
+            tipo_atendimento     TEXT NOT NULL,
+            status               TEXT NOT NULL DEFAULT 'AGENDADO',
+            observacoes          TEXT,
+            criado_por           TEXT,
+            criado_em            TIMESTAMP NOT NULL DEFAULT now(),
+            cancelado_por        TEXT,
+            cancelado_em         TIMESTAMP,
+            CONSTRAINT agendamento_periodo_valido CHECK (inicio < fim)
+        );
+    """),
+    # Conflitos de horário resolvidos pelo próprio PostgreSQL: dois agendamentos
+    # ativos da mesma sala (ou do mesmo profissional) não podem ter períodos
+    # sobrepostos. '[)' permite horários encostados (09:00-09:30 e 09:30-10:00).
+    # A checagem é atômica e não exige lock de tabela: inserções concorrentes
+    # conflitantes esperam uma pela outra e a segunda falha com
+    # ExclusionViolation.
+    ("002_agendamento_sem_sobreposicao", """
+        CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+        ALTER TABLE agendamento
+            ADD CONSTRAINT agendamento_sala_sem_sobreposicao
+            EXCLUDE USING gist (
+                fk_sala_uuid WITH =,
+                tsrange(inicio, fim, '[)') WITH &&
+            ) WHERE (status <> 'CANCELADO');
+
+        ALTER TABLE agendamento
+            ADD CONSTRAINT agendamento_profissional_sem_sobreposicao
+            EXCLUDE USING gist (
+                fk_profissional_uuid WITH =,
+                tsrange(inicio, fim, '[)') WITH &&
+            ) WHERE (status <> 'CANCELADO');
+    """),
+    # Grade da agenda (/api/agendamentos): filtro por sala + período sai do
+    # índice sem visitar a tabela para descartar linhas; a semana de todas as
+    # salas usa o índice por início.
+    ("003_agendamento_indices_agenda", """
+        CREATE INDEX IF NOT EXISTS idx_agendamento_sala_inicio
+            ON agendamento (fk_sala_uuid, inicio) INCLUDE (fim, status);
+
+        CREATE INDEX IF NOT EXISTS idx_agendamento_inicio
+            ON agendamento (inicio) INCLUDE (fim, status, fk_sala_uuid);
+    """),
+    # Versão monotônica da agenda para o feed incremental (?since=<versao>).
+    # Toda escrita em agendamento recebe a próxima versão de um contador de
+    # uma linha; o lock dessa linha vai até o commit, então as versões ficam
+    # visíveis em ordem e um cursor nunca pula uma escrita ainda não
+    # commitada. Exclusões viram tombstones em agendamento_removido.
+    ("004_agendamento_versao", """
+        CREATE TABLE IF NOT EXISTS agenda_versao (
+            id    BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            valor BIGINT NOT NULL
+        );
+        INSERT INTO agenda_versao (id, valor) VALUES (TRUE, 0)
+            ON CONFLICT (id) DO NOTHING;
+
+        CREATE OR REPLACE FUNCTION agenda_proxima_versao() RETURNS BIGINT AS $$
+            UPDATE agenda_versao SET valor = valor + 1 RETURNING valor;
+        $$ LANGUAGE sql;
+
+        ALTER TABLE agendamento ADD COLUMN IF NOT EXISTS versao BIGINT NOT NULL DEFAULT 0;
+        CREATE INDEX IF NOT EXISTS idx_agendamento_versao ON agendamento (versao);
+
+        CREATE TABLE IF NOT EXISTS agendamento_removido (
+            uuid        UUID PRIMARY KEY,
+            versao      BIGINT NOT NULL,
+            removido_em TIMESTAMP NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS idx_agendamento_removido_versao
+            ON agendamento_removido (versao);
+
+        CREATE OR REPLACE FUNCTION agendamento_marcar_versao() RETURNS trigger AS $$
+        BEGIN
+            NEW.versao := agenda_proxima_versao();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION agendamento_registrar_remocao() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO agendamento_removido (uuid, versao)
+            VALUES (OLD.uuid, agenda_proxima_versao())
+            ON CONFLICT (uuid) DO UPDATE
+                SET versao = EXCLUDED.versao, removido_em = now();
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER agendamento_versao
+            BEFORE INSERT OR UPDATE ON agendamento
+            FOR EACH ROW EXECUTE FUNCTION agendamento_marcar_versao();
+
+        CREATE TRIGGER agendamento_remocao
+            AFTER DELETE ON agendamento
+            FOR EACH ROW EXECUTE FUNCTION agendamento_registrar_remocao();
+    """),
+    # Check-in da recepção, antes guardado só no navegador
+    ("005_agendamento_checkin", """
+        ALTER TABLE agendamento ADD COLUMN IF NOT EXISTS checkin_em TIMESTAMP;
+    """),
+    # Versão das permissões do usuário, copiada para o retrato da sessão.
+    # Mudanças de perfil/status a incrementam e forçam a renovação do retrato.
+    ("006_usuario_versao_permissoes", """
+        ALTER TABLE usuario ADD COLUMN IF NOT EXISTS versao_permissoes INTEGER NOT NULL DEFAULT 1;
+    """),
+    # Última execução de cada tarefa do AgendadorManutencao, lida sob o
+    # advisory lock da tarefa: o próximo líder sabe se ela já rodou no
+    # intervalo em outro worker.
+    ("007_tarefa_manutencao", """
+        CREATE TABLE IF NOT EXISTS tarefa_manutencao (
+            nome         TEXT PRIMARY KEY,
+            executada_em TIMESTAMPTZ NOT NULL,
+            duracao_ms   DOUBLE PRECISION NOT NULL,
+            resultado    BIGINT
+        );
+    """),
+    # Tokens de recuperação guardados só como SHA-256 (quem lê o banco não
+    # consegue redefinir senhas). Tokens existentes são convertidos.
+    # redefinir_senha vira uma busca no índice único do hash;
+    # invalidar_tokens_usuario só percorre os tokens ainda não usados do
+    # usuário; a limpeza de expirados percorre o índice de expiraem.
+    ("008_tokenrecuperacao_hash_indices", """
+        ALTER TABLE tokenrecuperacao ADD COLUMN IF NOT EXISTS token_hash TEXT;
+
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'tokenrecuperacao' AND column_name = 'token') THEN
+                UPDATE tokenrecuperacao
+                    SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')
+                    WHERE token_hash IS NULL;
+                ALTER TABLE tokenrecuperacao DROP COLUMN token;
+            END IF;
+        END $$;
+
+        ALTER TABLE tokenrecuperacao ALTER COLUMN token_hash SET NOT NULL;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_tokenrecuperacao_token_hash
+            ON tokenrecuperacao (token_hash);
+
+        CREATE INDEX IF NOT EXISTS idx_tokenrecuperacao_usuario_pendentes
+            ON tokenrecuperacao (fk_usuario_idusuario) WHERE utilizado = FALSE;
+
+        CREATE INDEX IF NOT EXISTS idx_tokenrecuperacao_expiraem
+            ON tokenrecuperacao (expiraem);
+    """),
+    # Notificações (RepositorioNotificacoesPostgres). O sino lê "não lidas do
+    # usuário, mais recentes primeiro": o índice parcial só contém não lidas,
+    # já na ordem da listagem, e a contagem sai dele sem visitar a tabela.
+    # A retenção percorre só as lidas, pela data de criação.
+    ("009_notificacao", """
+        CREATE TABLE IF NOT EXISTS notificacao (
+            uuid            UUID PRIMARY KEY,
+            fk_usuario_uuid UUID NOT NULL,
+            tipo            TEXT NOT NULL,
+            titulo          TEXT NOT NULL,
+            mensagem        TEXT NOT NULL,
+            criada_em       TIMESTAMPTZ NOT NULL DEFAULT now(),
+            lida            BOOLEAN NOT NULL DEFAULT FALSE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_notificacao_usuario_nao_lidas
+            ON notificacao (fk_usuario_uuid, criada_em DESC) WHERE NOT lida;
+
+        CREATE INDEX IF NOT EXISTS idx_notificacao_usuario_criada
+            ON notificacao (fk_usuario_uuid, criada_em DESC);
+
+        CREATE INDEX IF NOT EXISTS idx_notificacao_lidas_criada
+            ON notificacao (criada_em) WHERE lida;
+    """),
+    # Contador de não lidas por usuário, mantido por triggers de comando
+    # (uma atualização por usuário por comando, não por linha): o sino lê uma
+    # linha pela chave primária sem tocar em notificacao. `versao` muda a
+    # cada alteração do contador e vira o ETag de /api/notificacoes/contador.
+    # As inserções seguem a ordem de fk_usuario_uuid para dois envios em lote
+    # simultâneos travarem as linhas na mesma ordem; exclusões de lidas (a
+    # retenção) não alteram o contador e não travam nada.
+    ("010_notificacao_contador", """
+        CREATE TABLE IF NOT EXISTS notificacao_contador (
+            fk_usuario_uuid UUID PRIMARY KEY,
+            nao_lidas       INTEGER NOT NULL DEFAULT 0,
+            versao          BIGINT NOT NULL DEFAULT 0
+        );
+
+        INSERT INTO notificacao_contador (fk_usuario_uuid, nao_lidas, versao)
+            SELECT fk_usuario_uuid, count(*) FILTER (WHERE NOT lida), 1
+            FROM notificacao GROUP BY fk_usuario_uuid
+            ON CONFLICT (fk_usuario_uuid) DO NOTHING;
+
+        CREATE OR REPLACE FUNCTION notificacao_atualizar_contador() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO notificacao_contador AS c (fk_usuario_uuid, nao_lidas, versao)
+                    SELECT fk_usuario_uuid, count(*) FILTER (WHERE NOT lida), 1
+                    FROM novas GROUP BY fk_usuario_uuid ORDER BY fk_usuario_uuid
+                    ON CONFLICT (fk_usuario_uuid) DO UPDATE
+                        SET nao_lidas = c.nao_lidas + EXCLUDED.nao_lidas,
+                            versao = c.versao + 1;
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE notificacao_contador AS c
+                    SET nao_lidas = c.nao_lidas + d.delta, versao = c.versao + 1
+                    FROM (
+                        SELECT n.fk_usuario_uuid,
+                               count(*) FILTER (WHERE NOT n.lida)
+                                 - count(*) FILTER (WHERE NOT a.lida) AS delta
+                        FROM novas n JOIN antigas a ON a.uuid = n.uuid
+                        GROUP BY n.fk_usuario_uuid
+                    ) d
+                    WHERE c.fk_usuario_uuid = d.fk_usuario_uuid AND d.delta <> 0;
+            ELSE
+                UPDATE notificacao_contador AS c
+                    SET nao_lidas = c.nao_lidas - d.removidas, versao = c.versao + 1
+                    FROM (
+                        SELECT fk_usuario_uuid, count(*) AS removidas
+                        FROM antigas WHERE NOT lida GROUP BY fk_usuario_uuid
+                    ) d
+                    WHERE c.fk_usuario_uuid = d.fk_usuario_uuid;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER notificacao_contador_insercao
+            AFTER INSERT ON notificacao REFERENCING NEW TABLE AS novas
+            FOR EACH STATEMENT EXECUTE FUNCTION notificacao_atualizar_contador();
+
+        CREATE TRIGGER notificacao_contador_atualizacao
+            AFTER UPDATE ON notificacao REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+            FOR EACH STATEMENT EXECUTE FUNCTION notificacao_atualizar_contador();
+
+        CREATE TRIGGER notificacao_contador_remocao
+            AFTER DELETE ON notificacao REFERENCING OLD TABLE AS antigas
+            FOR EACH STATEMENT EXECUTE FUNCTION notificacao_atualizar_contador();
+    """),
+    # Lembretes já enviados (LembretesAgenda). Todo worker tem o próprio heap;
+    # quem insere a linha primeiro envia o lembrete. O início faz parte da
+    # chave: um agendamento remarcado recebe os lembretes do novo horário.
+    ("011_lembrete_enviado", """
+        CREATE TABLE IF NOT EXISTS lembrete_enviado (
+            fk_agendamento_uuid UUID NOT NULL,
+            antecedencia_min    INTEGER NOT NULL,
+            inicio              TIMESTAMP NOT NULL,
+            enviado_em          TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (fk_agendamento_uuid, antecedencia_min, inicio)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_lembrete_enviado_inicio
+            ON lembrete_enviado (inicio);
+    """),
+    # Saídas de sala para o feed filtrado (?since=&sala=): um agendamento
+    # movido da sala A para a B deixa de casar com o filtro de A, então a
+    # mudança de sala grava a sala antiga com a versão da escrita. O feed de A
+    # devolve esses IDs em `removidos`.
+    ("012_agendamento_saida_sala", """
+        CREATE TABLE IF NOT EXISTS agendamento_saida_sala (
+            uuid         UUID NOT NULL,
+            fk_sala_uuid UUID NOT NULL,
+            versao       BIGINT NOT NULL,
+            PRIMARY KEY (uuid, fk_sala_uuid)
+        );
+        CREATE INDEX IF NOT EXISTS idx_agendamento_saida_sala_versao
+            ON agendamento_saida_sala (fk_sala_uuid, versao);
+
+        CREATE OR REPLACE FUNCTION agendamento_registrar_saida_sala() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO agendamento_saida_sala (uuid, fk_sala_uuid, versao)
+            VALUES (OLD.uuid, OLD.fk_sala_uuid, NEW.versao)
+            ON CONFLICT (uuid, fk_sala_uuid) DO UPDATE SET versao = EXCLUDED.versao;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER agendamento_saida_sala
+            AFTER UPDATE OF fk_sala_uuid ON agendamento
+            FOR EACH ROW WHEN (OLD.fk_sala_uuid IS DISTINCT FROM NEW.fk_sala_uuid)
+            EXECUTE FUNCTION agendamento_registrar_saida_sala();
+    """),
+]
+
+
+class Migrador(Conexao):
+    """Aplica as migrações pendentes de MIGRACOES."""
+
+    def migracoes_aplicadas(self) -> list[str]:
+        """
+        Lista as migrações já aplicadas no banco.
+
+        Returns:
+            Nomes das migrações, em ordem de aplicação
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('schema_migracao') AS tabela;")
+            if cur.fetchone()["tabela"] is None:
+                return []
+            cur.execute("SELECT nome FROM schema_migracao ORDER BY aplicada_em, nome;")
+            return [row["nome"] for row in cur.fetchall()]
+
+    def aplicar(self) -> list[str]:
+        """
+        Aplica as migrações pendentes em uma única transação.
+
+        Returns:
+            Nomes das migrações aplicadas nesta chamada
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (CHAVE_LOCK_MIGRACOES,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migracao (
+                    nome       TEXT PRIMARY KEY,
+                    aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            cur.execute("SELECT nome FROM schema_migracao;")
+            aplicadas = {row["nome"] for row in cur.fetchall()}
+
+            novas = []
+            for nome, sql in MIGRACOES:
+                if nome in aplicadas:
+                    continue
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_migracao (nome) VALUES (%s);", (nome,))
+                novas.append(nome)
+
+            conn.commit()
+
+        for nome in novas:
+            print(f"✓ Migração {nome} aplicada")
+        return novas
+
+
+if __name__ == "__main__":
+    aplicadas = Migrador().aplicar()
+    if not aplicadas:
+        print("Banco já está atualizado.")
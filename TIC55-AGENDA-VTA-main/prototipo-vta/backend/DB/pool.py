@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolEsgotadoErro(Exception):
+    """Lançada quando nenhuma conexão fica livre dentro do tempo limite."""
+
+
+class PoolConexoes:
+    """
+    Pool de conexões thread-safe compartilhado pelo processo.
+
+    Mantém entre `minimo` e `maximo` conexões abertas. Conexões ociosas são
+    reutilizadas em ordem LIFO (a mais recente primeiro, que tem mais chance
+    de estar saudável) e verificadas antes de serem entregues.
+
+    Attributes:
+        minimo: Quantidade de conexões abertas na criação do pool
+        maximo: Limite de conexões abertas ao mesmo tempo
+        timeout: Segundos de espera por uma conexão livre
+        verificar_apos: Conexões ociosas há mais que isso recebem um SELECT 1
+    """
+
+    def __init__(self, fabrica, minimo: int = 1, maximo: int = 10, timeout: float = 5.0, verificar_apos: float = 30.0):
+        """
+        Inicializa o pool.
+
+        Args:
+            fabrica: Função sem argumentos que abre uma nova conexão
+            minimo: Conexões abertas de início
+            maximo: Máximo de conexões simultâneas
+            timeout: Tempo máximo (segundos) esperando uma conexão livre
+            verificar_apos: Ociosidade (segundos) a partir da qual a conexão é testada
+
+        Raises:
+            ValueError: Se os limites forem inválidos
+        """
+        if minimo < 0 or maximo < 1 or minimo > maximo:
+            raise ValueError("Limites do pool inválidos (0 <= minimo <= maximo, maximo >= 1)")
+
+        if timeout < 0:
+            raise ValueError("Timeout não pode ser negativo")
+
+        self._fabrica = fabrica
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.verificar_apos = verificar_apos
+
+        self._cond = threading.Condition(threading.Lock())
+        self._ociosas = deque()  # (conexao, instante_devolucao)
+        self._em_uso = set()
+        self._abertas = 0
+        self._fechado = False
+
+        # Estatísticas
+        self._esperas = 0
+        self._tempo_espera_total = 0.0
+        self._emprestimos = 0
+        self._descartadas = 0
+
+        for _ in range(minimo):
+            self._ociosas.append((self._fabrica(), time.monotonic()))
+            self._abertas += 1
+
+    def obter(self):
+        """
+        Empresta uma conexão do pool.
+
+        Returns:
+            Conexão saudável, exclusiva de quem chamou até `devolver`
+
+        Raises:
+            PoolEsgotadoErro: Se nenhuma conexão ficar livre dentro do timeout
+            RuntimeError: Se o pool já foi fechado
+        """
+        limite = time.monotonic() + self.timeout
+        esperou = False
+        inicio_espera = None
+
+        while True:
+            with self._cond:
+                if self._fechado:
+                    raise RuntimeError("Pool de conexões fechado")
+
+                while not self._ociosas and self._abertas >= self.maximo:
+                    if not esperou:
+                        esperou = True
+                        inicio_espera = time.monotonic()
+                        self._esperas += 1
+
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._tempo_espera_total += time.monotonic() - inicio_espera
+                        raise PoolEsgotadoErro(
+                            f"Nenhuma conexão livre em {self.timeout:.1f}s "
+                            f"({self._abertas} abertas, máximo {self.maximo})"
+                        )
+                    self._cond.wait(restante)
+
+                    if self._fechado:
+                        raise RuntimeError("Pool de conexões fechado")
+
+                if esperou:
+                    self._tempo_espera_total += time.monotonic() - inicio_espera
+                    esperou = False
+
+                if self._ociosas:
+                    conn, devolvida_em = self._ociosas.pop()
+                else:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    conn, devolvida_em = None, None
+                    self._abertas += 1
+
+            if conn is None:
+                try:
+                    conn = self._fabrica()
+                except Exception:
+                    with self._cond:
+                        self._abertas -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._saudavel(conn, devolvida_em):
+                self._descartar(conn)
+                continue
+
+            with self._cond:
+                self._em_uso.add(id(conn))
+                self._emprestimos += 1
+            return conn
+
+    def devolver(self, conn, descartar: bool = False) -> None:
+        """
+        Devolve uma conexão ao pool.
+
+        Transações abertas são desfeitas para que a próxima requisição
+        receba a conexão limpa.
+
+        Args:
+            conn: Conexão obtida com `obter`
+            descartar: Se True, fecha a conexão em vez de reaproveitá-la
+        """
+        with self._cond:
+            self._em_uso.discard(id(conn))
+
+        if not descartar and not getattr(conn, "closed", False):
+            try:
+                conn.rollback()
+            except Exception:
+                descartar = True
+        else:
+            descartar = True
+
+        if descartar or self._fechado:
+            self._descartar(conn)
+            return
+
+        with self._cond:
+            self._ociosas.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _saudavel(self, conn, devolvida_em: float) -> bool:
+        """Verifica se a conexão ociosa ainda pode ser usada."""
+        if getattr(conn, "closed", False):
+            return False
+
+        if time.monotonic() - devolvida_em < self.verificar_apos:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, conn) -> None:
+        """Fecha a conexão e libera sua vaga no pool."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+        with self._cond:
+            self._abertas -= 1
+            self._descartadas += 1
+            self._cond.notify()
+
+    def fechar(self) -> None:
+        """Fecha todas as conexões ociosas e impede novos empréstimos."""
+        with self._cond:
+            self._fechado = True
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+            self._cond.notify_all()
+
+        for conn, _ in ociosas:
+            self._descartar(conn)
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna um retrato do uso do pool.
+
+        Returns:
+            Dicionário com em_uso, ociosas, abertas, maximo, esperas,
+            tempo_espera_total, tempo_espera_medio, emprestimos e descartadas
+        """
+        with self._cond:
+            return {
+                "em_uso": len(self._em_uso),
+                "ociosas": len(self._ociosas),
+                "abertas": self._abertas,
+                "maximo": self.maximo,
+                "esperas": self._esperas,
+                "tempo_espera_total": self._tempo_espera_total,
+                "tempo_espera_medio": (
+                    self._tempo_espera_total / self._esperas if self._esperas else 0.0
+                ),
+                "emprestimos": self._emprestimos,
+                "descartadas": self._descartadas,
+            }
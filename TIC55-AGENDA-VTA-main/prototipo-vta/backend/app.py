@@ -1,22 +1,96 @@
-from flask import Flask
+import atexit
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
-# Carrega as variáveis de ambiente do arquivo .env
+# Permite importar o pacote 'backend' (DB, serviços) ao rodar `python app.py`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Carrega as variáveis de ambiente do arquivo .env ANTES de importar o backend:
+# os serviços do processo (barramento, pools, hash, limites) leem a
+# configuração na importação
 load_dotenv()
 
-# Cria a instância principal da aplicação
-app = Flask(__name__)
+# Os processos de hashing (ExecutorHash, contexto spawn) reimportam este
+# arquivo como __mp_main__ ao rodar `python app.py`. Eles só executam
+# Usuario.hash_senha/validar_senha: não montam a aplicação nem as rotas.
+if __name__ != "__mp_main__":
+    from flask import Flask
+    from backend.DB.conexao import Conexao
+    from backend.DB.invalidacao import barramento_invalidacao
+    from backend.services.registro_login import registro_login
+    from backend.services.agendador_manutencao import agendador_manutencao
+    from backend.services.despacho_notificacoes import despacho_notificacoes
+
+    # Cria a instância principal da aplicação
+    app = Flask(__name__)
+
+    # Configura uma chave secreta para a sessão. Essencial para segurança!
+    # Puxa do arquivo .env ou usa um valor padrão se não encontrar
+    app.secret_key = os.getenv("SECRET_KEY", "uma-chave-secreta-padrao-para-testes")
+
+    # Atrás de proxies reversos (nginx), remote_addr seria o IP do proxy e o
+    # limite de login por IP valeria para todos os clientes juntos. Com
+    # PROXY_CONFIAVEIS=<quantidade de proxies>, o IP vem do X-Forwarded-For
+    # (só os saltos adicionados por esses proxies são aceitos)
+    proxies_confiaveis = int(os.getenv("PROXY_CONFIAVEIS", "0"))
+    if proxies_confiaveis > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies_confiaveis, x_proto=proxies_confiaveis)
+
+    # Uma conexão do pool por requisição, compartilhada por todos os serviços
+    # e devolvida no teardown
+    Conexao.registrar_app(app)
+
+    # --- Importa as rotas DEPOIS de criar o 'app' ---
+    # Isso evita problemas de importação circular.
+    from routes import *
+
+
+def iniciar_servicos() -> None:
+    """
+    Sobe as threads do worker e registra o encerramento de cada uma.
+
+    Fica fora da importação: quem serve a aplicação chama uma vez por
+    processo (o bloco __main__ abaixo, ou o gunicorn.conf.py em cada worker
+    depois do fork). Importar app.py (testes, scripts, processos de
+    hashing) não abre conexões nem sobe threads.
+    """
+    from routes import lembretes_agenda
+    from backend.DB.migracoes import Migrador
+
+    # Esquema em dia antes de atender (login, agenda e lembretes dependem
+    # das migrações). Os workers sobem juntos: o advisory lock do Migrador
+    # faz um aplicar e os outros só conferirem
+    if os.getenv("MIGRAR_NA_INICIALIZACAO", "1") == "1":
+        Migrador().aplicar()
+
+    # Escuta as invalidações de cache publicadas pelos outros workers
+    barramento_invalidacao.iniciar()
+
+    # Grava ultimo_login em lote; no encerramento descarrega o que faltar
+    registro_login.iniciar()
+    atexit.register(registro_login.parar)
+
+    # Tarefas periódicas (limpeza de tokens, retenção); registradas em routes.py
+    agendador_manutencao.iniciar()
+    atexit.register(agendador_manutencao.parar)
+
+    # Grava e publica notificações em lote; no encerramento esvazia a fila
+    despacho_notificacoes.iniciar()
+    atexit.register(despacho_notificacoes.parar)
 
-# Configura uma chave secreta para a sessão. Essencial para segurança!
-# Puxa do arquivo .env ou usa um valor padrão se não encontrar
-app.secret_key = os.getenv("SECRET_KEY", "uma-chave-secreta-padrao-para-testes")
+    # Lembretes de atendimento (criados em routes.py, junto dos serviços que usam)
+    lembretes_agenda.iniciar()
+    atexit.register(lembretes_agenda.parar)
 
-# --- Importa as rotas DEPOIS de criar o 'app' ---
-# Isso evita problemas de importação circular.
-from routes import *
 
 # --- Ponto de entrada para rodar o servidor ---
 if __name__ == '__main__':
-    # O modo debug reinicia o servidor automaticamente a cada alteração
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # O modo debug reinicia o servidor automaticamente a cada alteração. O
+    # reloader roda o arquivo em dois processos: só o filho (que serve)
+    # sobe as threads
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        iniciar_servicos()
+    app.run(debug=True, port=5000)
@@ -0,0 +1,48 @@
+"""
+Benchmark: idas ao banco de SalaServico.listar_salas_disponiveis por número de salas.
+
+Usa uma conexão simulada que conta cada cursor.execute, então não precisa
+de PostgreSQL. Antes da consulta em lote eram 1 + 2N consultas; agora deve
+ser sempre 1.
+
+Uso (a partir de prototipo-vta/):
+    python -m backend.benchmarks.bench_disponibilidade_salas
+"""
+
+import time
+from datetime import datetime
+from uuid import uuid4
+from unittest.mock import MagicMock, Mock, patch
+
+from backend.services.sala_servico import SalaServico
+
+
+def medir(quantidade_salas: int) -> tuple[int, float]:
+    """Retorna (consultas executadas, tempo em ms) para N salas."""
+    conn = MagicMock()
+    cursor = MagicMock()
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+    conn.cursor.return_value = cursor
+    cursor.fetchall.return_value = [
+        {"uuid": str(uuid4()), "nome": f"Sala {i}", "tipo": "Consulta",
+         "ativa": True, "ocupada": i % 3 == 0}
+        for i in range(quantidade_salas)
+    ]
+
+    servico = SalaServico()
+    with patch.object(servico, "_get_conn", return_value=conn):
+        inicio = time.perf_counter()
+        servico.listar_salas_disponiveis(datetime.now())
+        duracao = (time.perf_counter() - inicio) * 1000
+
+    return cursor.execute.call_count, duracao
+
+
+if __name__ == "__main__":
+    print(f"{'salas':>6} | {'consultas':>9} | {'antes (1+2N)':>12} | {'tempo (ms)':>10}")
+    for n in (1, 5, 10, 50, 100, 500):
+        consultas, ms = medir(n)
+        print(f"{n:>6} | {consultas:>9} | {1 + 2 * n:>12} | {ms:>10.2f}")
@@ -0,0 +1,74 @@
+# calibrar_hash.py
+"""
+Calibra o custo do PBKDF2 para este servidor.
+
+Mede quantas iterações PBKDF2-HMAC-SHA256 por segundo a máquina faz e sugere
+HASH_ITERACOES para que validar uma senha leve cerca de --alvo-ms. Senhas
+gravadas com menos iterações são regravadas no próximo login.
+
+Uso (a partir de backend/):
+    python calibrar_hash.py
+    python calibrar_hash.py --alvo-ms 400
+"""
+
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.models.usuario import Usuario
+
+# Iterações usadas em cada medição e arredondamento da sugestão
+ITERACOES_AMOSTRA = 100_000
+ARREDONDAMENTO = 10_000
+
+# Recomendação da OWASP para PBKDF2-HMAC-SHA256
+ITERACOES_OWASP = 600_000
+
+
+def medir_iteracoes_por_segundo(repeticoes: int = 7) -> float:
+    """Mediana de várias medições (descarta picos de outros processos)."""
+    salt = os.urandom(16)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibracao-vta", salt, ITERACOES_AMOSTRA)
+        tempos.append(time.perf_counter() - inicio)
+    return ITERACOES_AMOSTRA / statistics.median(tempos)
+
+
+def sugerir_iteracoes(iteracoes_por_segundo: float, alvo_ms: float) -> int:
+    """Iterações que levam ~alvo_ms, arredondadas e acima do mínimo do Usuario."""
+    iteracoes = int(iteracoes_por_segundo * alvo_ms / 1000) // ARREDONDAMENTO * ARREDONDAMENTO
+    return max(iteracoes, Usuario.ITERACOES_MINIMAS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra HASH_ITERACOES para este servidor.")
+    parser.add_argument("--alvo-ms", type=float, default=250.0,
+                        help="Tempo desejado para validar uma senha (padrão: 250 ms)")
+    args = parser.parse_args()
+
+    por_segundo = medir_iteracoes_por_segundo()
+    sugestao = sugerir_iteracoes(por_segundo, args.alvo_ms)
+    atual_ms = Usuario.ITERACOES_PBKDF2 / por_segundo * 1000
+
+    print(f"\nPBKDF2-HMAC-SHA256: {por_segundo:,.0f} iterações/s neste servidor")
+    print(f"Atual:    {Usuario.ITERACOES_PBKDF2:,} iterações (~{atual_ms:.0f} ms por login)")
+    print(f"Sugerido: {sugestao:,} iterações (~{sugestao / por_segundo * 1000:.0f} ms por login)")
+
+    if sugestao < ITERACOES_OWASP:
+        print(f"\nAviso: abaixo das {ITERACOES_OWASP:,} iterações recomendadas pela OWASP.")
+
+    print("\n--- ADICIONE AO ARQUIVO .env ---\n")
+    print(f"HASH_ITERACOES={sugestao}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,24 @@
 # gerar_hash.py
-from werkzeug.security import generate_password_hash
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.models.usuario import Usuario
 
 # Senhas que você quer criptografar
 senha_admin = 'admin123'
 senha_recepcao = 'recepcao123'
 senha_vet = 'vet123'
 
-# Gerar os hashes
-hash_admin = generate_password_hash(senha_admin)
-hash_recepcao = generate_password_hash(senha_recepcao)
-hash_vet = generate_password_hash(senha_vet)
+# Gerar os hashes (PBKDF2, mesmo formato usado no login)
+hash_admin = Usuario.hash_senha(senha_admin)
+hash_recepcao = Usuario.hash_senha(senha_recepcao)
+hash_vet = Usuario.hash_senha(senha_vet)
 
 print("\n--- COPIE OS COMANDOS SQL ABAIXO E COLE NO psql ---\n")
-print(f"INSERT INTO usuarios (nome, email, senha_hash, perfil) VALUES ('Administrador', 'admin@vta.com', '{hash_admin}', 'Administrador');")
-print(f"INSERT INTO usuarios (nome, email, senha_hash, perfil) VALUES ('Recepcionista', 'recepcao@vta.com', '{hash_recepcao}', 'Recepcionista');")
-print(f"INSERT INTO usuarios (nome, email, senha_hash, perfil) VALUES ('Veterinário', 'veterinario@vta.com', '{hash_vet}', 'Veterinário');")
-print("\n")
\ No newline at end of file
+print(f"INSERT INTO usuario (uuid, nome, email, senhahash, perfil, status) VALUES ('{uuid4()}', 'Administrador', 'admin@vta.com', '{hash_admin}', 'admin', 'ativo');")
+print(f"INSERT INTO usuario (uuid, nome, email, senhahash, perfil, status) VALUES ('{uuid4()}', 'Recepcionista', 'recepcao@vta.com', '{hash_recepcao}', 'recepcionista', 'ativo');")
+print(f"INSERT INTO usuario (uuid, nome, email, senhahash, perfil, status) VALUES ('{uuid4()}', 'Veterinário', 'veterinario@vta.com', '{hash_vet}', 'veterinario', 'ativo');")
+print("\n")
@@ -0,0 +1,36 @@
+"""
+Configuração do gunicorn (lida automaticamente ao rodar `gunicorn app:app`
+na pasta backend).
+
+As threads do worker (barramento, despacho, lembretes...) não sobem na
+importação de app.py: cada worker as inicia depois de carregar a aplicação.
+
+Com o worker gevent, o psycopg2 precisa cooperar com o loop: sem o patch do
+psycogreen, cada consulta bloqueia o processo inteiro (todas as abas e
+requisições do worker) até o banco responder. Para um worker com threads,
+use GUNICORN_WORKER_CLASS=gthread e GUNICORN_THREADS.
+"""
+
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "200"))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+
+
+def post_fork(server, worker):
+    """No worker gevent, torna o psycopg2 cooperativo antes de qualquer conexão."""
+    if "gevent" not in server.cfg.worker_class_str:
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        raise RuntimeError("Worker gevent exige o psycogreen: pip install psycogreen")
+    patch_psycopg()
+
+
+def post_worker_init(worker):
+    """Sobe as threads deste worker (também com --preload, já depois do fork)."""
+    from app import iniciar_servicos
+    iniciar_servicos()
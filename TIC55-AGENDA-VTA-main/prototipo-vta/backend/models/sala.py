@@ -54,7 +54,8 @@ class Sala:
         
         Args:
             dataHora: Data/hora para verificar
-            reservas: Lista de reservas (objetos com .inicio e .fim)
+            reservas: Lista de reservas (objetos com .inicio e .fim) ou
+                índice da sala (IndiceReservasSala), consultado em O(log n)
             
         Returns:
             'bloqueada', 'ocupada' ou 'livre'
@@ -69,6 +70,10 @@ class Sala:
         if reservas is None:
             reservas = []
         
+        # Índice de intervalos: busca binária em vez de varrer a lista
+        if hasattr(reservas, 'ocupada_em'):
+            return "ocupada" if reservas.ocupada_em(dataHora) else "livre"
+        
         for reserva in reservas:
             if hasattr(reserva, 'inicio') and hasattr(reserva, 'fim'):
                 if reserva.inicio <= dataHora <= reserva.fim:
@@ -31,6 +31,18 @@ class Usuario:
         PerfilUsuario.VETERINARIO: frozenset({"visualizar"}),
     }
 
+    # Máscaras de bits compiladas de PERMISSOES_POR_PERFIL (ver _compilar_permissoes)
+    BIT_POR_ACAO: dict[str, int] = {}
+    BIT_OUTRAS_ACOES = 0
+    MASCARA_POR_PERFIL: dict[PerfilUsuario, int] = {}
+    MASCARA_POR_VALOR: dict[str, int] = {}
+    PERMISSOES_COMPILADAS: dict[PerfilUsuario, frozenset[str]] = {}
+
+    # Custo do PBKDF2: ajuste HASH_ITERACOES com `python calibrar_hash.py`.
+    # Hashes abaixo do valor atual são regravados no próximo login.
+    ITERACOES_MINIMAS = 100_000
+    ITERACOES_PBKDF2 = int(os.getenv("HASH_ITERACOES", "600000"))
+
     # Padrão de validação de email (básico mas mais robusto)
     EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
@@ -104,13 +116,14 @@ class Usuario:
         return hash(self.uuid)
 
     @staticmethod
-    def hash_senha(senha: str, iterations: int = 600_000) -> str:
+    def hash_senha(senha: str, iterations: int | None = None) -> str:
         """
         Gera hash seguro da senha usando PBKDF2-HMAC-SHA256.
         
         Args:
             senha: Senha em texto plano
-            iterations: Número de iterações (mínimo 600.000 recomendado pela OWASP)
+            iterations: Número de iterações (padrão: ITERACOES_PBKDF2; mínimo
+                600.000 recomendado pela OWASP)
             
         Returns:
             Hash no formato: iterations$salt_hex$hash_hex
@@ -121,7 +134,10 @@ class Usuario:
         if not senha or not senha.strip():
             raise ValueError("Senha não pode ser vazia")
         
-        if iterations < 100_000:
+        if iterations is None:
+            iterations = Usuario.ITERACOES_PBKDF2
+        
+        if iterations < Usuario.ITERACOES_MINIMAS:
             raise ValueError("Número de iterações muito baixo (mínimo: 100.000)")
         
         salt = os.urandom(16)
@@ -178,6 +194,29 @@ class Usuario:
         except (ValueError, TypeError, AttributeError):
             return False
 
+    @staticmethod
+    def precisa_rehash(senha_hash: str) -> bool:
+        """
+        Indica se o hash armazenado está abaixo dos parâmetros atuais.
+        
+        Args:
+            senha_hash: Hash armazenado
+            
+        Returns:
+            True para SHA256 legado ou PBKDF2 com menos iterações que
+            ITERACOES_PBKDF2; False se estiver em dia (ou for ilegível)
+        """
+        if not isinstance(senha_hash, str) or not senha_hash:
+            return False
+
+        if "$" not in senha_hash:
+            return True
+
+        try:
+            return int(senha_hash.split("$", 1)[0]) < Usuario.ITERACOES_PBKDF2
+        except ValueError:
+            return False
+
     # Métodos de Status
 
     def is_ativo(self) -> bool:
@@ -236,6 +275,94 @@ class Usuario:
 
     # Sistema de Permissões
 
+    @classmethod
+    def _compilar_permissoes(cls) -> None:
+        """
+        Compila PERMISSOES_POR_PERFIL em máscaras de bits (chamado ao importar).
+
+        Cada ação do mapa recebe um bit e cada perfil vira um inteiro com os
+        bits das suas ações; autorizar passa a ser um AND. ADMIN recebe todos
+        os bits (~0), inclusive o de ações fora do mapa.
+        """
+        acoes = sorted(set().union(*cls.PERMISSOES_POR_PERFIL.values()))
+        cls.BIT_POR_ACAO = {acao: 1 << i for i, acao in enumerate(acoes)}
+        cls.BIT_OUTRAS_ACOES = 1 << len(acoes)
+
+        cls.MASCARA_POR_PERFIL = {}
+        for perfil in PerfilUsuario:
+            if perfil == PerfilUsuario.ADMIN:
+                mascara = ~0
+            else:
+                permissoes = cls.PERMISSOES_POR_PERFIL.get(perfil, cls.PERMISSOES_PADRAO)
+                mascara = sum(cls.BIT_POR_ACAO[acao] for acao in permissoes)
+            cls.MASCARA_POR_PERFIL[perfil] = mascara
+
+        # Mesmas máscaras pelo valor do perfil (ex.: retrato da sessão)
+        cls.MASCARA_POR_VALOR = {p.value: m for p, m in cls.MASCARA_POR_PERFIL.items()}
+
+        cls.PERMISSOES_COMPILADAS = {
+            perfil: frozenset(a for a, bit in cls.BIT_POR_ACAO.items() if mascara & bit)
+            for perfil, mascara in cls.MASCARA_POR_PERFIL.items()
+        }
+
+    @classmethod
+    def bit_permissao(cls, acao: str) -> int:
+        """
+        Bit de uma ação na máscara de permissões.
+
+        Args:
+            acao: Nome da ação (normalizado: lowercase, sem espaços)
+
+        Returns:
+            Bit da ação; BIT_OUTRAS_ACOES se ela não estiver no mapa (só
+            ADMIN a tem); 0 se a ação for inválida (nenhum perfil a tem)
+        """
+        bit = cls.BIT_POR_ACAO.get(acao)
+        if bit is not None:
+            return bit
+
+        if not isinstance(acao, str):
+            return 0
+
+        acao_limpa = acao.strip().lower()
+        if not acao_limpa:
+            return 0
+
+        return cls.BIT_POR_ACAO.get(acao_limpa, cls.BIT_OUTRAS_ACOES)
+
+    @classmethod
+    def perfis_com_permissao(cls, acao: str) -> frozenset[PerfilUsuario]:
+        """
+        Perfis cuja máscara inclui a ação (para filtrar listagens no banco).
+
+        Args:
+            acao: Nome da ação
+
+        Returns:
+            Set imutável de perfis
+        """
+        bit = cls.bit_permissao(acao)
+        return frozenset(p for p, mascara in cls.MASCARA_POR_PERFIL.items() if mascara & bit)
+
+    @classmethod
+    def filtrar_por_permissao(cls, usuarios: list["Usuario"], acao: str) -> list["Usuario"]:
+        """
+        Filtra, em lote, os usuários ativos que podem executar a ação.
+
+        Args:
+            usuarios: Usuários a filtrar
+            acao: Nome da ação
+
+        Returns:
+            Usuários com a permissão, na ordem original
+        """
+        bit = cls.bit_permissao(acao)
+        mascaras = cls.MASCARA_POR_PERFIL
+        return [
+            u for u in usuarios
+            if u.status is StatusUsuario.ATIVO and mascaras.get(u.perfil, 0) & bit
+        ]
+
     def pode(self, acao: str) -> bool:
         """
         Verifica se o usuário tem permissão para executar uma ação.
@@ -250,47 +377,24 @@ class Usuario:
             - Usuários inativos nunca têm permissão
             - Admin tem todas as permissões
             - Ação é normalizada (lowercase, sem espaços)
+            - Um AND entre a máscara do perfil e o bit da ação
         """
-        # Usuários inativos não têm permissão
-        if not self.is_ativo():
+        if self.status is not StatusUsuario.ATIVO:
             return False
 
-        # Validação da ação
-        if not isinstance(acao, str):
-            return False
-        
-        acao_limpa = acao.strip().lower()
-        if not acao_limpa:
-            return False
-
-        # Admin tem acesso total
-        if self.perfil == PerfilUsuario.ADMIN:
-            return True
-
-        # Verifica permissões do perfil
-        permissoes = self.PERMISSOES_POR_PERFIL.get(
-            self.perfil, 
-            self.PERMISSOES_PADRAO
-        )
-        return acao_limpa in permissoes
+        return bool(self.MASCARA_POR_PERFIL.get(self.perfil, 0) & self.bit_permissao(acao))
 
     def get_permissoes(self) -> frozenset[str]:
         """
         Retorna todas as permissões do usuário.
         
         Returns:
-            Set imutável de permissões
+            Set imutável de permissões (pré-compilado por perfil)
         """
         if not self.is_ativo():
             return frozenset()
-        
-        if self.perfil == PerfilUsuario.ADMIN:
-            return frozenset({"visualizar", "criar", "editar", "excluir"})
-        
-        return self.PERMISSOES_POR_PERFIL.get(
-            self.perfil, 
-            self.PERMISSOES_PADRAO
-        )
+
+        return self.PERMISSOES_COMPILADAS.get(self.perfil, self.PERMISSOES_PADRAO)
 
     # Métodos de Serialização
 
@@ -364,4 +468,8 @@ class Usuario:
             perfil=perfil,
             status=status,
             ultimo_login=ultimo_login
-        )
\ No newline at end of file
+        )
+
+
+# Política de permissões compilada uma única vez, na importação
+Usuario._compilar_permissoes()
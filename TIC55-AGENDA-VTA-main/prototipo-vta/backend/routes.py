@@ -1,24 +1,68 @@
 # routes.py CORRIGIDO
 
-from flask import request, jsonify, session, render_template, redirect, url_for
-import psycopg2
-import psycopg2.extras # Importante para o cursor como dicionário
-from werkzeug.security import check_password_hash
+import json
 import os
+from functools import wraps
+from datetime import datetime, timedelta
+from flask import request, jsonify, session, g, render_template, redirect, url_for, Response, stream_with_context
 
 # Importa a instância 'app' do arquivo app.py
 from app import app
+from backend.DB.conexao import Conexao
+from backend.models.usuario import Usuario
+from backend.enums.status_usuario import StatusUsuario
+from backend.services.agendamento_servico import AgendamentoServico
+from backend.services.indice_agenda import IndiceAgenda
+from backend.services.sala_servico import SalaServico
+from backend.services.autenticacao_servico import AutenticacaoServico
+from backend.services.notificacao_servico import NotificacaoServico
+from backend.services.despacho_notificacoes import despacho_notificacoes
+from backend.services.lembretes_agenda import LembretesAgenda
+from backend.services.agendador_manutencao import agendador_manutencao
+from backend.services.eventos_servico import canal_eventos
+from backend.services.cache_salas import cache_salas
+from backend.services.executor_hash import executor_hash, HashIndisponivelErro
+from backend.services.limitador_login import limitador_login, LimiteExcedidoErro
+from backend.services.sessao import sessao_permissoes, CHAVE_SESSAO
+from backend.services.registro_login import registro_login
+from backend.DB.invalidacao import barramento_invalidacao
 
 # --- Configuração da Conexão com o Banco de Dados ---
-DB_HOST = os.getenv("DB_HOST")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
+# Usa as mesmas variáveis de ambiente dos serviços (DB_NAME, DB_USER, DB_PASSWORD...).
+# Dentro de uma requisição, a conexão é a mesma usada pelos serviços (flask.g).
+db = Conexao()
+# Reservas dos próximos dias em memória: carregado na primeira consulta e
+# mantido em dia pelas escritas deste worker e pelo canal "agenda" do barramento
+indice_agenda = IndiceAgenda(janela_dias=int(os.getenv("INDICE_AGENDA_DIAS", "7")))
+agendamento_servico = AgendamentoServico(indice_agenda=indice_agenda)
+sala_servico = SalaServico(indice_agenda=indice_agenda)
+autenticacao_servico = AutenticacaoServico()
+# Envios vão para a fila do despacho (gravação em lote fora da requisição)
+notificacao_servico = NotificacaoServico(
+    repositorio=despacho_notificacoes.repositorio, despacho=despacho_notificacoes
+)
 
-def get_db_connection():
-    """Cria e retorna uma nova conexão com o banco de dados."""
-    conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS)
-    return conn
+# Lembretes de atendimento (profissional e recepção); antecedências em minutos.
+# A thread sobe em app.iniciar_servicos.
+lembretes_agenda = LembretesAgenda(
+    agendamento_servico, autenticacao_servico, notificacao_servico,
+    antecedencias=[int(m) for m in os.getenv("LEMBRETES_ANTECEDENCIAS", "1440,60").split(",")],
+)
+
+# Tarefas de manutenção: cada uma roda em um só worker por intervalo
+agendador_manutencao.registrar(
+    "limpar_tokens_expirados", autenticacao_servico.limpar_tokens_expirados, intervalo=3600
+)
+agendador_manutencao.registrar(
+    "retencao_notificacoes", notificacao_servico.aplicar_retencao, intervalo=86400
+)
+agendador_manutencao.registrar(
+    "limpar_lembretes_enviados", lembretes_agenda.limpar_enviados, intervalo=86400
+)
+
+# Intervalo entre heartbeats do /api/eventos (mantém proxies e o navegador
+# sabendo que a conexão está viva)
+INTERVALO_HEARTBEAT = 15
 
 # --- ROTAS DE PÁGINAS E AUTENTICAÇÃO ---
 
@@ -37,34 +81,31 @@ def login():
     if not email or not senha:
         return jsonify({"message": "Email e senha são obrigatórios!"}), 400
 
-    conn = None
+    # sessao_login barra rajadas de tentativas antes do banco e do hash (429)
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        cur.execute("SELECT id, email, senha_hash, perfil FROM usuarios WHERE email = %s", (email,))
-        user = cur.fetchone()
-        
-        cur.close()
-
-        if user and check_password_hash(user['senha_hash'], senha):
-            session['user_id'] = user['id']
-            session['user_perfil'] = user['perfil']
-            
-            # Responde ao front-end com a URL de redirecionamento
-            return jsonify({
-                "message": "Login bem-sucedido! Redirecionando...", 
-                "redirect_url": url_for('dashboard')
-            }), 200
-        else:
-            return jsonify({"message": "Email/usuário ou senha incorretos."}), 401
-
+        usuario = autenticacao_servico.sessao_login(email, senha, ip=request.remote_addr)
+        snapshot = sessao_permissoes.iniciar(usuario) if usuario else None
+    except LimiteExcedidoErro as e:
+        espera = max(1, round(e.tentar_novamente_em))
+        return jsonify({"message": f"{e} Tente novamente em {espera}s."}), 429, {"Retry-After": str(espera)}
+    except HashIndisponivelErro:
+        return jsonify({"message": "Servidor ocupado. Tente novamente."}), 503, {"Retry-After": "1"}
     except Exception as e:
         print(f"Erro no login: {e}")
         return jsonify({"message": "Erro interno no servidor."}), 500
-    finally:
-        if conn:
-            conn.close()
+
+    if snapshot is None:
+        return jsonify({"message": "Email/usuário ou senha incorretos."}), 401
+
+    # Retrato assinado do perfil: as rotas protegidas autorizam sem ir ao banco
+    session.clear()
+    session[CHAVE_SESSAO] = snapshot
+
+    # Responde ao front-end com a URL de redirecionamento
+    return jsonify({
+        "message": "Login bem-sucedido! Redirecionando...",
+        "redirect_url": url_for('dashboard')
+    }), 200
 
 # Rota de Logout
 @app.route('/logout')
@@ -74,10 +115,63 @@ def logout():
 
 # --- ROTAS PROTEGIDAS (EXIGEM LOGIN) ---
 
+def _usuario_logado():
+    """
+    Retrato do usuário da sessão, conferido com a versão de permissões.
+
+    Normalmente não consulta o banco; se o perfil ou o status mudou desde o
+    login, o retrato é renovado uma vez (ou a sessão é encerrada, se o
+    usuário foi desativado).
+    """
+    snapshot = session.get(CHAVE_SESSAO)
+    if snapshot is None:
+        return None
+
+    atual = sessao_permissoes.validar(snapshot)
+    if atual is None:
+        session.clear()
+    elif atual is not snapshot:
+        session[CHAVE_SESSAO] = atual
+    return atual
+
+
+def requer_permissao(acao):
+    """
+    Exige sessão válida e permissão para a ação (rotas da API).
+
+    O bit da ação é resolvido uma vez, ao decorar: cada requisição faz só o
+    AND com a máscara do perfil do retrato. O retrato validado fica em
+    g.usuario.
+
+    Args:
+        acao: Nome da ação (visualizar, criar, editar, excluir)
+
+    Raises:
+        ValueError: Se a ação não estiver em Usuario.PERMISSOES_POR_PERFIL
+    """
+    bit = Usuario.bit_permissao(acao)
+    if bit not in Usuario.BIT_POR_ACAO.values():
+        raise ValueError(f"Ação desconhecida: {acao!r}")
+
+    def decorador(rota):
+        @wraps(rota)
+        def protegida(*args, **kwargs):
+            usuario = _usuario_logado()
+            if usuario is None:
+                return jsonify({"message": "Não autenticado."}), 401
+
+            if usuario["status"] != StatusUsuario.ATIVO.value or not Usuario.MASCARA_POR_VALOR.get(usuario["perfil"], 0) & bit:
+                return jsonify({"message": "Sem permissão."}), 403
+
+            g.usuario = usuario
+            return rota(*args, **kwargs)
+        return protegida
+    return decorador
+
 # Rota do Dashboard
 @app.route('/dashboard')
 def dashboard():
-    if 'user_id' not in session:
+    if _usuario_logado() is None:
         return redirect(url_for('login_page'))
     # Renderiza o arquivo HTML do dashboard
     return render_template('2. dashboard_vta.html')
@@ -85,10 +179,153 @@ def dashboard():
 # Rota da Agenda
 @app.route('/agenda')
 def agenda_page():
-    if 'user_id' not in session:
+    if _usuario_logado() is None:
         return redirect(url_for('login_page'))
     # Renderiza o arquivo HTML da agenda
     return render_template('3. agenda_vta.html')
 
 # Adicione aqui outras rotas para as demais páginas (clientes, pets, etc.)
-# seguindo o mesmo modelo.
\ No newline at end of file
+# seguindo o mesmo modelo.
+
+# --- API DA AGENDA ---
+
+# Lista agendamentos de um período: /api/agendamentos?inicio=&fim=&sala=
+# Sem parâmetros, retorna a semana atual (segunda a domingo) de todas as salas.
+# O cabeçalho X-Agenda-Versao traz o cursor para o feed incremental:
+# /api/agendamentos?since=<versao> retorna só o que mudou depois dele.
+@app.route('/api/agendamentos', methods=['GET'])
+@requer_permissao("visualizar")
+def listar_agendamentos():
+    if request.args.get('since') is not None:
+        try:
+            alteracoes = agendamento_servico.listar_alteracoes(
+                int(request.args['since']), sala_id=request.args.get('sala') or None
+            )
+        except ValueError as e:
+            return jsonify({"message": f"Parâmetros inválidos: {e}"}), 400
+
+        return jsonify(alteracoes), 200
+
+    try:
+        if request.args.get('inicio'):
+            inicio = datetime.fromisoformat(request.args['inicio'])
+        else:
+            hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            inicio = hoje - timedelta(days=hoje.weekday())
+
+        if request.args.get('fim'):
+            fim = datetime.fromisoformat(request.args['fim'])
+        else:
+            fim = inicio + timedelta(days=7)
+
+        # Versão lida antes da lista: o que mudar no meio volta no próximo ?since
+        versao = agendamento_servico.versao_atual()
+        agenda = agendamento_servico.listar_agenda(inicio, fim, sala_id=request.args.get('sala') or None)
+    except ValueError as e:
+        return jsonify({"message": f"Parâmetros inválidos: {e}"}), 400
+
+    return jsonify(agenda), 200, {"X-Agenda-Versao": str(versao)}
+
+# Salas ativas livres em um instante: /api/salas/disponiveis?dataHora=<ISO>
+# (padrão: agora). Respondido pelo índice da agenda quando o dia está nele.
+@app.route('/api/salas/disponiveis', methods=['GET'])
+@requer_permissao("visualizar")
+def listar_salas_disponiveis():
+    try:
+        dataHora = datetime.fromisoformat(request.args['dataHora']) if request.args.get('dataHora') else datetime.now()
+    except ValueError as e:
+        return jsonify({"message": f"Parâmetros inválidos: {e}"}), 400
+
+    return jsonify([sala.to_dict() for sala in sala_servico.listar_salas_disponiveis(dataHora)]), 200
+
+# Check-in da recepção: {"checkin": {...}} registra, {"checkin": null} desfaz.
+# Registrar a chegada é lançamento da recepção: exige "criar", não "editar".
+@app.route('/api/agendamentos/<agendamento_id>', methods=['PUT'])
+@requer_permissao("criar")
+def atualizar_agendamento(agendamento_id):
+    dados = request.get_json(silent=True) or {}
+    if 'checkin' not in dados:
+        return jsonify({"message": "Alteração não suportada."}), 400
+
+    if not agendamento_servico.registrar_checkin(agendamento_id, realizado=dados['checkin'] is not None):
+        return jsonify({"message": "Agendamento não encontrado."}), 404
+
+    return jsonify({"message": "Agendamento atualizado."}), 200
+
+
+def _formatar_evento(evento):
+    """Serializa um evento no formato text/event-stream."""
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['dados'], default=str)}\n\n"
+
+
+def _fluxo_eventos(assinatura):
+    """Gera os eventos da assinatura, com heartbeat enquanto não houver nada."""
+    # O navegador reconecta sozinho após 5s se a conexão cair
+    yield "retry: 5000\n\n"
+    while True:
+        evento = assinatura.proximo(timeout=INTERVALO_HEARTBEAT)
+        if evento is None:
+            yield ": heartbeat\n\n"
+        else:
+            yield _formatar_evento(evento)
+
+
+# Atualizações ao vivo (Server-Sent Events): mudanças na agenda e
+# notificações do usuário logado. /api/eventos?sala=<uuid>&sala=<uuid>
+# restringe a agenda às salas indicadas.
+# Cada conexão fica aberta; sirva com um worker evented para não prender
+# uma thread por aba (ver README: gunicorn -k gevent). Eventos publicados
+# em outros workers chegam pelo barramento (LISTEN/NOTIFY).
+@app.route('/api/eventos', methods=['GET'])
+@requer_permissao("visualizar")
+def eventos():
+    assinatura = canal_eventos.assinar(g.usuario['id'], salas=set(request.args.getlist('sala')) or None)
+
+    resposta = Response(
+        stream_with_context(_fluxo_eventos(assinatura)),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            # Desliga o buffer do nginx para o evento sair na hora
+            "X-Accel-Buffering": "no",
+        },
+    )
+    # Aba fechada: o servidor percebe no próximo envio (evento ou heartbeat)
+    resposta.call_on_close(lambda: canal_eventos.cancelar(assinatura))
+    return resposta
+
+
+# Contador do sino (barra de navegação), consultado a cada página: lê só o
+# contador do usuário, nunca as notificações. O ETag muda junto com o
+# contador; If-None-Match igual responde 304 sem corpo.
+@app.route('/api/notificacoes/contador', methods=['GET'])
+@requer_permissao("visualizar")
+def contador_notificacoes():
+    contador = notificacao_servico.contador(g.usuario['id'])
+
+    resposta = jsonify(contador)
+    resposta.set_etag(f"{contador['versao']}-{contador['nao_lidas']}")
+    # Só o navegador do usuário guarda, e sempre revalida
+    resposta.headers["Cache-Control"] = "private, no-cache"
+    return resposta.make_conditional(request)
+
+
+# Métricas internas do worker (pool de conexões, hashing, caches, eventos)
+@app.route('/api/metricas', methods=['GET'])
+@requer_permissao("visualizar")
+def metricas():
+    return jsonify({
+        "pool_conexoes": db.estatisticas_pool(),
+        "hash_senhas": executor_hash.estatisticas(),
+        "limite_login": limitador_login.estatisticas(),
+        "sessoes": sessao_permissoes.estatisticas(),
+        "ultimo_login": registro_login.estatisticas(),
+        "manutencao": agendador_manutencao.estatisticas(),
+        "cache_salas": cache_salas.estatisticas(),
+        "indice_agenda": indice_agenda.estatisticas(),
+        "invalidacao": barramento_invalidacao.estatisticas(),
+        "eventos": canal_eventos.estatisticas(),
+        "notificacoes": notificacao_servico.repositorio.estatisticas(),
+        "despacho_notificacoes": despacho_notificacoes.estatisticas(),
+        "lembretes": lembretes_agenda.estatisticas(),
+    }), 200
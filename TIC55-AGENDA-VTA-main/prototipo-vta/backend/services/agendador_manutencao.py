@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+import zlib
+from backend.DB.conexao import Conexao
+
+# Primeira chave dos advisory locks de manutenção (a segunda vem do nome da
+# tarefa). Ver também CHAVE_LOCK_MIGRACOES.
+CLASSE_LOCK_MANUTENCAO = 7_310_002
+
+
+class TarefaManutencao:
+    """
+    Tarefa periódica registrada no AgendadorManutencao.
+
+    Attributes:
+        nome: Identificador único (também define o advisory lock)
+        funcao: Chamável sem argumentos; o retorno (ex.: linhas removidas)
+            vai para as métricas
+        intervalo: Segundos entre execuções, somando todos os workers
+    """
+
+    def __init__(self, nome: str, funcao, intervalo: float):
+        self.nome = nome
+        self.funcao = funcao
+        self.intervalo = intervalo
+        self.chave_lock = zlib.crc32(nome.encode("utf-8")) & 0x7FFFFFFF
+        self.proxima = 0.0
+
+        # Estatísticas
+        self.execucoes = 0
+        self.puladas = 0
+        self.falhas = 0
+        self.ultimo_resultado = None
+        self.ultima_duracao = 0.0
+        self.duracao_total = 0.0
+        self.duracao_maxima = 0.0
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas da tarefa neste worker.
+
+        Returns:
+            Dicionário com execucoes, puladas (outro worker era o líder ou
+            já tinha executado), falhas, ultimo_resultado e durações em ms
+        """
+        return {
+            "intervalo": self.intervalo,
+            "execucoes": self.execucoes,
+            "puladas": self.puladas,
+            "falhas": self.falhas,
+            "ultimo_resultado": self.ultimo_resultado,
+            "ultima_duracao_ms": self.ultima_duracao * 1000,
+            "duracao_media_ms": (self.duracao_total / self.execucoes * 1000) if self.execucoes else 0.0,
+            "duracao_maxima_ms": self.duracao_maxima * 1000,
+        }
+
+
+class AgendadorManutencao(Conexao):
+    """
+    Executa tarefas de manutenção periódicas dentro da aplicação.
+
+    Todo worker tem um agendador, mas cada tarefa só roda em um deles por
+    intervalo: o worker que consegue o advisory lock da tarefa é o líder
+    daquela execução, e a tabela tarefa_manutencao (lida sob o lock) diz se
+    outro worker já a executou dentro do intervalo. Se o líder morrer, o
+    PostgreSQL solta o lock com a conexão e outro worker assume.
+
+    O lock é de sessão e fica em uma conexão dedicada, fora do pool, durante
+    a tarefa, sem transação aberta: a tarefa pega as próprias conexões do
+    pool sem disputar com a que segura o lock (com DB_POOL_MAX pequeno, as
+    duas do mesmo pool deixariam as requisições sem conexão ou travariam).
+    A tarefa deve trabalhar em lotes curtos (ver limpar_tokens_expirados).
+    """
+
+    def __init__(self, conn_str=None, verificar_a_cada: float = 60.0, relogio=time.monotonic):
+        """
+        Inicializa o agendador sem tarefas (a thread sobe em `iniciar`).
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            verificar_a_cada: Segundos entre verificações de tarefas vencidas
+            relogio: Função de tempo (substituível nos testes)
+        """
+        super().__init__(conn_str)
+        self.verificar_a_cada = verificar_a_cada
+        self._relogio = relogio
+        self._tarefas: dict[str, TarefaManutencao] = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def registrar(self, nome: str, funcao, intervalo: float) -> None:
+        """
+        Registra (ou substitui) uma tarefa periódica.
+
+        Args:
+            nome: Identificador único da tarefa
+            funcao: Chamável sem argumentos
+            intervalo: Segundos entre execuções
+
+        Raises:
+            ValueError: Se o intervalo não for positivo
+        """
+        if intervalo <= 0:
+            raise ValueError("Intervalo deve ser positivo")
+        with self._lock:
+            self._tarefas[nome] = TarefaManutencao(nome, funcao, intervalo)
+
+    def executar(self, nome: str) -> bool:
+        """
+        Executa a tarefa se este worker for o líder e ela estiver vencida.
+
+        Args:
+            nome: Nome de uma tarefa registrada
+
+        Returns:
+            True se a tarefa rodou neste worker, False se foi pulada
+
+        Raises:
+            KeyError: Se a tarefa não estiver registrada
+        """
+        tarefa = self._tarefas[nome]
+
+        # Conexão dedicada: fechá-la solta o lock de sessão (também em erro)
+        conn = self._abrir_conexao()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT pg_try_advisory_lock(%s, %s) AS lider;",
+                    (CLASSE_LOCK_MANUTENCAO, tarefa.chave_lock)
+                )
+                if not cur.fetchone()["lider"]:
+                    tarefa.puladas += 1
+                    return False
+
+                cur.execute("""
+                    SELECT executada_em > now() - make_interval(secs => %s) AS recente
+                    FROM tarefa_manutencao WHERE nome = %s;
+                """, (tarefa.intervalo, nome))
+                row = cur.fetchone()
+                # Sem transação aberta durante a tarefa (o lock de sessão continua)
+                conn.commit()
+
+                if row and row["recente"]:
+                    tarefa.puladas += 1
+                    return False
+
+                inicio = time.monotonic()
+                try:
+                    resultado = tarefa.funcao()
+                except Exception as e:
+                    tarefa.falhas += 1
+                    print(f"Erro na tarefa de manutenção {nome}: {e}")
+                    resultado = None
+                duracao = time.monotonic() - inicio
+
+                tarefa.execucoes += 1
+                tarefa.ultimo_resultado = resultado
+                tarefa.ultima_duracao = duracao
+                tarefa.duracao_total += duracao
+                tarefa.duracao_maxima = max(tarefa.duracao_maxima, duracao)
+
+                cur.execute("""
+                    INSERT INTO tarefa_manutencao (nome, executada_em, duracao_ms, resultado)
+                    VALUES (%s, now(), %s, %s)
+                    ON CONFLICT (nome) DO UPDATE
+                        SET executada_em = excluded.executada_em,
+                            duracao_ms = excluded.duracao_ms,
+                            resultado = excluded.resultado;
+                """, (nome, duracao * 1000, resultado if isinstance(resultado, int) else None))
+                conn.commit()
+                return True
+        finally:
+            conn.close()
+
+    def executar_vencidas(self) -> None:
+        """Executa, em ordem de registro, as tarefas cujo horário chegou."""
+        agora = self._relogio()
+        with self._lock:
+            vencidas = [t for t in self._tarefas.values() if t.proxima <= agora]
+
+        for tarefa in vencidas:
+            tarefa.proxima = agora + tarefa.intervalo
+            try:
+                self.executar(tarefa.nome)
+            except Exception as e:
+                # Banco fora: tenta de novo na próxima verificação
+                tarefa.proxima = agora
+                print(f"Tarefa de manutenção {tarefa.nome} não executada: {e}")
+
+    def _executar(self) -> None:
+        """Laço da thread."""
+        while not self._parar.wait(self.verificar_a_cada):
+            self.executar_vencidas()
+
+    def iniciar(self) -> None:
+        """Inicia a thread do agendador deste worker (idempotente)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="vta-manutencao", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Encerra a thread (uma tarefa em andamento termina antes)."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas de cada tarefa registrada.
+
+        Returns:
+            Dicionário nome -> estatísticas da tarefa
+        """
+        with self._lock:
+            return {nome: t.estatisticas() for nome, t in self._tarefas.items()}
+
+
+# Agendador do processo; as tarefas são registradas em routes.py
+agendador_manutencao = AgendadorManutencao(
+    verificar_a_cada=float(os.getenv("MANUTENCAO_VERIFICAR_A_CADA", "60"))
+)
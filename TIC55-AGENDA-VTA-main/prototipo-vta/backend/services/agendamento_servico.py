@@ -0,0 +1,501 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+import psycopg2.errors
+from backend.DB.conexao import Conexao
+from backend.DB.invalidacao import BarramentoInvalidacao, barramento_invalidacao
+from backend.enums.status_Agendamento import statusAgendamento
+from backend.models.agendamento import Agendamento
+from backend.services.eventos_servico import CanalEventos, canal_eventos
+
+
+class AgendamentoServico(Conexao):
+    """
+    Serviço responsável por criar, mover e cancelar agendamentos.
+
+    Conflitos de horário (mesma sala ou mesmo profissional) são barrados
+    pelas exclusion constraints do banco (ver DB/migracoes.py), não por um
+    SELECT antes do INSERT: duas recepções agendando ao mesmo tempo nunca
+    geram reserva dupla, e não há lock de tabela.
+    """
+
+    # Nome da constraint -> recurso em conflito (para a mensagem ao usuário)
+    RESTRICOES_CONFLITO = {
+        "agendamento_sala_sem_sobreposicao": "sala",
+        "agendamento_profissional_sem_sobreposicao": "profissional",
+    }
+
+    # Agendamentos já com os nomes de sala, profissional, cliente e pet
+    SELECT_AGENDA = """
+        SELECT a.uuid, a.inicio, a.fim, a.status, a.tipo_atendimento,
+               a.observacoes, a.fk_sala_uuid, a.fk_profissional_uuid,
+               a.fk_cliente_uuid, a.fk_pet_uuid, a.versao, a.checkin_em,
+               s.nome AS sala_nome,
+               u.nome AS profissional_nome,
+               c.nome AS cliente_nome,
+               p.nome AS pet_nome
+        FROM agendamento a
+        JOIN sala s ON s.uuid = a.fk_sala_uuid
+        LEFT JOIN usuario u ON u.uuid = a.fk_profissional_uuid
+        LEFT JOIN cliente c ON c.uuid = a.fk_cliente_uuid
+        LEFT JOIN pet p ON p.uuid = a.fk_pet_uuid
+    """
+
+    def __init__(self, conn_str=None, indice_agenda=None, canal: CanalEventos = None,
+                 barramento: BarramentoInvalidacao = None):
+        """
+        Inicializa o serviço.
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            indice_agenda: IndiceAgenda a manter atualizado após cada escrita (opcional)
+            canal: Canal de eventos ao vivo (padrão: canal do processo)
+            barramento: Barramento de invalidação (padrão: o do processo).
+                Cada escrita publica no canal "agenda" os dias tocados; o
+                IndiceAgenda dos outros workers recarrega esses dias.
+        """
+        super().__init__(conn_str)
+        self.indice_agenda = indice_agenda
+        self.canal = canal if canal is not None else canal_eventos
+        self.barramento = barramento if barramento is not None else barramento_invalidacao
+
+    @staticmethod
+    def _dias(*periodos: tuple[datetime, datetime]) -> list[str]:
+        """Dias (ISO) tocados pelos períodos: chaves do cache "agenda"."""
+        dias = set()
+        for inicio, fim in periodos:
+            dia = inicio.date()
+            while dia <= fim.date():
+                dias.add(dia.isoformat())
+                dia += timedelta(days=1)
+        return sorted(dias)
+
+    def _publicar(self, acao: str, agendamento_id: str, sala_id, **dados) -> None:
+        """Avisa as abas abertas que a agenda mudou (após o commit)."""
+        dados.update({"acao": acao, "id": str(agendamento_id), "sala_id": str(sala_id)})
+        self.canal.publicar("agendamento", dados, sala_id=sala_id)
+
+    def _recurso_em_conflito(self, erro: psycopg2.errors.ExclusionViolation) -> str:
+        """Identifica se o conflito foi de sala ou de profissional."""
+        constraint = getattr(erro.diag, "constraint_name", None)
+        return self.RESTRICOES_CONFLITO.get(constraint, "horário")
+
+    def _criar_agendamento_from_row(self, row: dict) -> Agendamento:
+        """
+        Cria objeto Agendamento a partir de uma linha do banco.
+
+        Args:
+            row: Dicionário com dados do banco (fetchone())
+
+        Returns:
+            Instância de Agendamento
+        """
+        agendamento = Agendamento(
+            id=str(row["uuid"]),
+            sala_id=str(row["fk_sala_uuid"]),
+            profissional_id=str(row["fk_profissional_uuid"]),
+            cliente_id=str(row["fk_cliente_uuid"]),
+            pet_id=str(row["fk_pet_uuid"]),
+            inicio=row["inicio"],
+            fim=row["fim"],
+            tipo_atendimento=row["tipo_atendimento"],
+            observacoes=row.get("observacoes"),
+            criado_por=row.get("criado_por")
+        )
+        agendamento.status = row["status"]
+        if row.get("criado_em"):
+            agendamento.criado_em = row["criado_em"]
+        agendamento.cancelado_por = row.get("cancelado_por")
+        agendamento.cancelado_em = row.get("cancelado_em")
+        return agendamento
+
+    def criar_agendamento(self, sala_id: str, profissional_id: str, cliente_id: str,
+                          pet_id: str, inicio: datetime, fim: datetime,
+                          tipo_atendimento: str, observacoes: str = None,
+                          criado_por: str = None) -> Agendamento | None:
+        """
+        Cria um novo agendamento.
+
+        Args:
+            sala_id: UUID da sala
+            profissional_id: UUID do profissional
+            cliente_id: UUID do cliente
+            pet_id: UUID do pet
+            inicio: Data/hora de início
+            fim: Data/hora de término
+            tipo_atendimento: Tipo do atendimento
+            observacoes: Observações (opcional)
+            criado_por: Quem criou (opcional)
+
+        Returns:
+            Agendamento criado ou None se houver conflito de horário
+
+        Raises:
+            ValueError: Se dados inválidos (validação do modelo)
+        """
+        agendamento = Agendamento(
+            id=str(uuid4()),
+            sala_id=sala_id,
+            profissional_id=profissional_id,
+            cliente_id=cliente_id,
+            pet_id=pet_id,
+            inicio=inicio,
+            fim=fim,
+            tipo_atendimento=tipo_atendimento,
+            observacoes=observacoes,
+            criado_por=criado_por
+        )
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            try:
+                cur.execute("""
+                    INSERT INTO agendamento
+                        (uuid, fk_sala_uuid, fk_profissional_uuid, fk_cliente_uuid,
+                         fk_pet_uuid, inicio, fim, tipo_atendimento, status,
+                         observacoes, criado_por, criado_em)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+                """, (
+                    agendamento.id,
+                    agendamento.sala_id,
+                    agendamento.profissional_id,
+                    agendamento.cliente_id,
+                    agendamento.pet_id,
+                    agendamento.inicio,
+                    agendamento.fim,
+                    agendamento.tipo_atendimento,
+                    agendamento.status,
+                    agendamento.observacoes,
+                    agendamento.criado_por,
+                    agendamento.criado_em
+                ))
+            except psycopg2.errors.ExclusionViolation as e:
+                conn.rollback()
+                print(f"Conflito de horário: {self._recurso_em_conflito(e)} já reservado(a) nesse período.")
+                return None
+
+            self.barramento.publicar(cur, "agenda", self._dias((agendamento.inicio, agendamento.fim)))
+            conn.commit()
+
+        if self.indice_agenda is not None:
+            self.indice_agenda.registrar(agendamento.id, agendamento.sala_id, agendamento.inicio, agendamento.fim)
+
+        self._publicar("criado", agendamento.id, agendamento.sala_id,
+                       inicio=agendamento.inicio.isoformat(), fim=agendamento.fim.isoformat())
+
+        print(f"✓ Agendamento {agendamento.id} criado com sucesso!")
+        return agendamento
+
+    def buscar_agendamento(self, agendamento_id: str) -> Agendamento | None:
+        """
+        Busca um agendamento por UUID.
+
+        Args:
+            agendamento_id: UUID do agendamento
+
+        Returns:
+            Agendamento encontrado ou None
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT * FROM agendamento WHERE uuid = %s;", (agendamento_id,))
+            row = cur.fetchone()
+
+            if not row:
+                return None
+
+            return self._criar_agendamento_from_row(row)
+
+    def _linha_agenda_para_dict(self, row: dict) -> dict:
+        """
+        Converte uma linha da consulta da agenda no formato da grade.
+
+        Mantém os campos usados pela página da agenda (data, horario, sala,
+        cliente, pet, obs) junto dos identificadores e horários completos.
+        """
+        return {
+            "id": str(row["uuid"]),
+            "data": row["inicio"].date().isoformat(),
+            "horario": row["inicio"].strftime("%H:%M"),
+            "inicio": row["inicio"].isoformat(),
+            "fim": row["fim"].isoformat(),
+            "status": row["status"],
+            "tipo": row["tipo_atendimento"],
+            "obs": row["observacoes"],
+            "sala_id": str(row["fk_sala_uuid"]),
+            "sala": row["sala_nome"],
+            "profissional_id": str(row["fk_profissional_uuid"]),
+            "profissional": row["profissional_nome"],
+            "cliente_id": str(row["fk_cliente_uuid"]),
+            "cliente": row["cliente_nome"],
+            "pet_id": str(row["fk_pet_uuid"]),
+            "pet": row["pet_nome"],
+            "versao": row.get("versao"),
+            "checkin": {
+                "realizado": True,
+                "data": row["checkin_em"].date().isoformat(),
+                "horario": row["checkin_em"].strftime("%H:%M"),
+            } if row.get("checkin_em") else None,
+        }
+
+    def listar_agenda(self, inicio: datetime, fim: datetime, sala_id: str = None,
+                      incluir_cancelados: bool = False) -> list[dict]:
+        """
+        Lista os agendamentos de um período já com os nomes de sala, cliente,
+        pet e profissional, em uma única consulta.
+
+        Args:
+            inicio: Início do período (ex.: segunda-feira 00:00)
+            fim: Fim do período (exclusivo)
+            sala_id: Restringe a uma sala (None para todas)
+            incluir_cancelados: Se True, inclui agendamentos cancelados
+
+        Returns:
+            Lista de dicionários prontos para JSON, ordenada por início e sala
+
+        Raises:
+            ValueError: Se inicio >= fim
+        """
+        if inicio >= fim:
+            raise ValueError("O início do período deve ser anterior ao fim")
+
+        filtros = ["a.inicio < %(fim)s", "a.fim > %(inicio)s"]
+        if sala_id is not None:
+            filtros.append("a.fk_sala_uuid = %(sala_id)s")
+        if not incluir_cancelados:
+            filtros.append("a.status != %(cancelado)s")
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                {self.SELECT_AGENDA}
+                WHERE {' AND '.join(filtros)}
+                ORDER BY a.inicio, s.nome;
+            """, {
+                "inicio": inicio,
+                "fim": fim,
+                "sala_id": sala_id,
+                "cancelado": statusAgendamento.CANCELADO.value,
+            })
+            return [self._linha_agenda_para_dict(row) for row in cur.fetchall()]
+
+    def versao_atual(self) -> int:
+        """
+        Retorna a versão atual da agenda (cursor para listar_alteracoes).
+
+        Returns:
+            Última versão atribuída a uma escrita em agendamento
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT valor FROM agenda_versao;")
+            row = cur.fetchone()
+            return row["valor"] if row else 0
+
+    def listar_alteracoes(self, desde: int, sala_id: str = None) -> dict:
+        """
+        Lista o que mudou na agenda depois de uma versão (feed incremental).
+
+        Args:
+            desde: Versão já conhecida pelo cliente (cursor)
+            sala_id: Restringe as alterações a uma sala (None para todas)
+
+        Returns:
+            Dicionário com:
+            - versao: novo cursor para a próxima chamada
+            - alterados: agendamentos criados, movidos ou cancelados
+              (cancelados vêm com status CANCELADO)
+            - removidos: IDs de agendamentos excluídos (tombstones) e, com
+              sala_id, dos que saíram da sala (movidos para outra)
+
+        Raises:
+            ValueError: Se a versão for negativa
+        """
+        if desde < 0:
+            raise ValueError("Versão não pode ser negativa")
+
+        filtro_sala = "AND a.fk_sala_uuid = %(sala_id)s" if sala_id is not None else ""
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            # Lê o cursor primeiro: toda versão <= atual já está commitada, e o
+            # que for escrito depois volta na próxima chamada
+            cur.execute("SELECT valor FROM agenda_versao;")
+            atual = cur.fetchone()["valor"]
+
+            if atual <= desde:
+                return {"versao": atual, "alterados": [], "removidos": []}
+
+            params = {"desde": desde, "atual": atual, "sala_id": sala_id}
+            cur.execute(f"""
+                {self.SELECT_AGENDA}
+                WHERE a.versao > %(desde)s
+                  AND a.versao <= %(atual)s
+                  {filtro_sala}
+                ORDER BY a.versao;
+            """, params)
+            alterados = [self._linha_agenda_para_dict(row) for row in cur.fetchall()]
+
+            # Com filtro de sala, quem foi movido para outra sala não casa mais
+            # com o filtro: sai da sala como se tivesse sido removido (a menos
+            # que já tenha voltado para ela)
+            saidas_sala = """
+                UNION ALL
+                SELECT s.uuid, s.versao
+                FROM agendamento_saida_sala s
+                WHERE s.fk_sala_uuid = %(sala_id)s
+                  AND s.versao > %(desde)s
+                  AND s.versao <= %(atual)s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM agendamento a
+                      WHERE a.uuid = s.uuid AND a.fk_sala_uuid = s.fk_sala_uuid
+                  )
+            """ if sala_id is not None else ""
+
+            cur.execute(f"""
+                SELECT uuid
+                FROM (
+                    SELECT uuid, versao
+                    FROM agendamento_removido
+                    WHERE versao > %(desde)s
+                      AND versao <= %(atual)s
+                    {saidas_sala}
+                ) r
+                GROUP BY uuid
+                ORDER BY max(versao);
+            """, params)
+            removidos = [str(row["uuid"]) for row in cur.fetchall()]
+
+        return {"versao": atual, "alterados": alterados, "removidos": removidos}
+
+    def mover_agendamento(self, agendamento_id: str, inicio: datetime, fim: datetime,
+                          sala_id: str = None, profissional_id: str = None) -> bool:
+        """
+        Move um agendamento para outro horário (e opcionalmente outra sala/profissional).
+
+        Args:
+            agendamento_id: UUID do agendamento
+            inicio: Novo início
+            fim: Novo término
+            sala_id: Nova sala (None para manter)
+            profissional_id: Novo profissional (None para manter)
+
+        Returns:
+            True se movido, False se não encontrado, cancelado ou em conflito
+
+        Raises:
+            ValueError: Se inicio >= fim
+        """
+        if inicio >= fim:
+            raise ValueError("A data de início deve ser anterior à data de término")
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            try:
+                # A autojunção devolve o horário anterior (o dia antigo também
+                # sai dos caches)
+                cur.execute("""
+                    UPDATE agendamento a
+                    SET inicio = %s,
+                        fim = %s,
+                        fk_sala_uuid = COALESCE(%s, a.fk_sala_uuid),
+                        fk_profissional_uuid = COALESCE(%s, a.fk_profissional_uuid)
+                    FROM agendamento anterior
+                    WHERE anterior.uuid = a.uuid
+                      AND a.uuid = %s
+                      AND a.status != %s
+                    RETURNING a.fk_sala_uuid, anterior.inicio AS inicio_anterior,
+                              anterior.fim AS fim_anterior;
+                """, (inicio, fim, sala_id, profissional_id, agendamento_id,
+                      statusAgendamento.CANCELADO.value))
+            except psycopg2.errors.ExclusionViolation as e:
+                conn.rollback()
+                print(f"Conflito de horário: {self._recurso_em_conflito(e)} já reservado(a) nesse período.")
+                return False
+
+            row = cur.fetchone()
+            if not row:
+                print(f"Agendamento {agendamento_id} não encontrado ou cancelado")
+                return False
+
+            self.barramento.publicar(cur, "agenda", self._dias(
+                (row["inicio_anterior"], row["fim_anterior"]), (inicio, fim)
+            ))
+            conn.commit()
+
+        if self.indice_agenda is not None:
+            self.indice_agenda.registrar(agendamento_id, row["fk_sala_uuid"], inicio, fim)
+
+        self._publicar("movido", agendamento_id, row["fk_sala_uuid"],
+                       inicio=inicio.isoformat(), fim=fim.isoformat())
+
+        print(f"✓ Agendamento movido com sucesso!")
+        return True
+
+    def cancelar_agendamento(self, agendamento_id: str, cancelado_por: str = None) -> bool:
+        """
+        Cancela um agendamento (libera sala e profissional no horário).
+
+        Args:
+            agendamento_id: UUID do agendamento
+            cancelado_por: Quem cancelou (opcional)
+
+        Returns:
+            True se cancelado, False se não encontrado ou já cancelado
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE agendamento
+                SET status = %s,
+                    cancelado_por = %s,
+                    cancelado_em = %s
+                WHERE uuid = %s
+                  AND status != %s
+                RETURNING fk_sala_uuid, inicio, fim;
+            """, (statusAgendamento.CANCELADO.value, cancelado_por, datetime.now(),
+                  agendamento_id, statusAgendamento.CANCELADO.value))
+
+            row = cur.fetchone()
+            if not row:
+                print(f"Agendamento {agendamento_id} não encontrado ou já cancelado")
+                return False
+
+            self.barramento.publicar(cur, "agenda", self._dias((row["inicio"], row["fim"])))
+            conn.commit()
+
+        if self.indice_agenda is not None:
+            self.indice_agenda.cancelar(agendamento_id)
+
+        self._publicar("cancelado", agendamento_id, row["fk_sala_uuid"])
+
+        print(f"✓ Agendamento cancelado com sucesso!")
+        return True
+
+    def registrar_checkin(self, agendamento_id: str, realizado: bool = True) -> bool:
+        """
+        Registra (ou desfaz) o check-in do paciente na recepção.
+
+        Args:
+            agendamento_id: UUID do agendamento
+            realizado: False para desfazer o check-in
+
+        Returns:
+            True se atualizado, False se não encontrado ou cancelado
+        """
+        checkin_em = datetime.now() if realizado else None
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE agendamento
+                SET checkin_em = %s
+                WHERE uuid = %s
+                  AND status != %s
+                RETURNING fk_sala_uuid, inicio, fim;
+            """, (checkin_em, agendamento_id, statusAgendamento.CANCELADO.value))
+
+            row = cur.fetchone()
+            if not row:
+                print(f"Agendamento {agendamento_id} não encontrado ou cancelado")
+                return False
+
+            self.barramento.publicar(cur, "agenda", self._dias((row["inicio"], row["fim"])))
+            conn.commit()
+
+        self._publicar("checkin", agendamento_id, row["fk_sala_uuid"],
+                       checkin_em=checkin_em.isoformat() if checkin_em else None)
+
+        print(f"✓ Check-in {'registrado' if realizado else 'desfeito'} com sucesso!")
+        return True
@@ -1,42 +1,83 @@
 from datetime import datetime, timezone, timedelta
 from uuid import UUID
+import hashlib
 import os
 from backend.enums.perfil_usuario import PerfilUsuario
 from backend.enums.status_usuario import StatusUsuario
 from backend.models.usuario import Usuario
 from backend.DB.conexao import Conexao
+from backend.DB.invalidacao import BarramentoInvalidacao, barramento_invalidacao
+from backend.services.executor_hash import ExecutorHash, executor_hash as executor_hash_padrao
+from backend.services.limitador_login import LimitadorLogin, limitador_login as limitador_login_padrao
+from backend.services.sessao import SessaoPermissoes, sessao_permissoes
+from backend.services.registro_login import RegistroLogin, registro_login as registro_login_padrao
 
 class AutenticacaoServico(Conexao):
     """
     Serviço responsável por autenticação, gerenciamento de senhas e tokens.
     
-    Utiliza o sistema de hash do Usuario (PBKDF2 com 600k iterações).
+    Utiliza o sistema de hash do Usuario (PBKDF2 com 600k iterações),
+    executado no ExecutorHash (pool de processos) para não ocupar as
+    threads do Flask. Se o executor estiver sobrecarregado, os métodos
+    propagam HashIndisponivelErro.
     """
 
     # Configurações de token
     TOKEN_EXPIRACAO_MINUTOS = 30
     TOKEN_TAMANHO_BYTES = 32  # 64 caracteres hex
 
-    def sessao_login(self, email: str, senha: str) -> Usuario | None:
+    def __init__(self, conn_str=None, barramento: BarramentoInvalidacao = None,
+                 executor_hash: ExecutorHash = None, limitador: LimitadorLogin = None,
+                 sessoes: SessaoPermissoes = None, registro_login: RegistroLogin = None):
+        """
+        Inicializa o serviço.
+        
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            barramento: Barramento de invalidação (padrão: o do processo)
+            executor_hash: Executor do PBKDF2 (padrão: o do processo)
+            limitador: Limitador de tentativas de login (padrão: o do processo)
+            sessoes: Versões de permissão das sessões (padrão: as do processo)
+            registro_login: Buffer de ultimo_login (padrão: o do processo)
+        """
+        super().__init__(conn_str)
+        self.barramento = barramento if barramento is not None else barramento_invalidacao
+        self.executor_hash = executor_hash if executor_hash is not None else executor_hash_padrao
+        self.limitador = limitador if limitador is not None else limitador_login_padrao
+        self.sessoes = sessoes if sessoes is not None else sessao_permissoes
+        self.registro_login = registro_login if registro_login is not None else registro_login_padrao
+
+    def sessao_login(self, email: str, senha: str, ip: str = None) -> Usuario | None:
         """
         Realiza login do usuário.
         
         Args:
             email: Email do usuário
             senha: Senha em texto plano
+            ip: Endereço do cliente, para o limite por IP (opcional)
             
         Returns:
             Usuario se autenticado com sucesso, None caso contrário
             
+        Raises:
+            LimiteExcedidoErro: Muitas tentativas (antes de banco e hash)
+            
         Notes:
             - Valida email, senha e status do usuário
-            - Atualiza campo ultimo_login se existir
+            - Anota ultimo_login no RegistroLogin (gravado em lote, sem
+              escrita no login)
+            - Regrava hashes desatualizados (ver Usuario.precisa_rehash)
             - Mensagens genéricas para não revelar se email existe
         """
         if not email or not senha:
             print("Credenciais inválidas.")
             return None
 
+        # Barra rajadas antes de qualquer consulta ou PBKDF2
+        self.limitador.verificar(ip, email)
+
+        # A transação só dura a leitura: o PBKDF2 (até HASH_TIMEOUT) roda sem
+        # segurar conexão do pool nem transação aberta
         with self._get_conn() as conn, conn.cursor() as cur:
             # Busca usuário por email
             cur.execute(
@@ -44,39 +85,48 @@ class AutenticacaoServico(Conexao):
                 (email.strip().lower(),)
             )
             usuario_row = cur.fetchone()
+        self._liberar_conexao_requisicao()
 
-            # Validações (mensagem genérica para não revelar se email existe)
-            if not usuario_row:
-                print("Credenciais inválidas.")
-                return None
+        # Validações (mensagem genérica para não revelar se email existe)
+        if not usuario_row:
+            print("Credenciais inválidas.")
+            return None
 
-            # Valida senha usando o método do Usuario
-            if not Usuario.validar_senha(usuario_row["senhahash"], senha):
-                print("Credenciais inválidas.")
-                return None
+        # Valida senha (PBKDF2 no executor de hash)
+        if not self.executor_hash.validar_senha(usuario_row["senhahash"], senha):
+            print("Credenciais inválidas.")
+            return None
 
-            # Verifica se usuário está ativo
-            status = StatusUsuario(usuario_row["status"])
-            if status != StatusUsuario.ATIVO:
-                print("Usuário inativo. Contate o administrador.")
-                return None
+        # Verifica se usuário está ativo
+        status = StatusUsuario(usuario_row["status"])
+        if status != StatusUsuario.ATIVO:
+            print("Usuário inativo. Contate o administrador.")
+            return None
 
-            # Atualiza último login (se o campo existir na tabela)
-            try:
+        # Hash abaixo dos parâmetros atuais (SHA256 legado ou menos
+        # iterações): regrava com a senha recém-validada, em uma transação
+        # curta depois do hash. O filtro pelo hash antigo não sobrescreve
+        # uma troca de senha concorrente.
+        if Usuario.precisa_rehash(usuario_row["senhahash"]):
+            novo_hash = self.executor_hash.hash_senha(senha)
+            with self._get_conn() as conn, conn.cursor() as cur:
                 cur.execute(
-                    "UPDATE usuario SET ultimo_login = %s WHERE idusuario = %s;",
-                    (datetime.now(timezone.utc), usuario_row["idusuario"])
+                    "UPDATE usuario SET senhahash = %s WHERE idusuario = %s AND senhahash = %s;",
+                    (novo_hash, usuario_row["idusuario"], usuario_row["senhahash"])
                 )
+                self.barramento.publicar(cur, "usuario", [usuario_row["email"]])
                 conn.commit()
-            except Exception as e:
-                # Campo ultimo_login pode não existir na tabela
-                print(f"Aviso: não foi possível atualizar último login: {e}")
+            usuario_row = {**usuario_row, "senhahash": novo_hash}
 
-            print(f"Usuário {usuario_row['nome']} logado com sucesso!")
+        # Último login só é anotado; o RegistroLogin grava em lote
+        self.registro_login.registrar(usuario_row["idusuario"], datetime.now(timezone.utc))
 
-            # Cria objeto Usuario a partir dos dados do banco
-            usuario = self._criar_usuario_from_row(usuario_row)
-            return usuario
+        self.limitador.registrar_sucesso(email)
+        print(f"Usuário {usuario_row['nome']} logado com sucesso!")
+
+        # Cria objeto Usuario a partir dos dados do banco
+        usuario = self._criar_usuario_from_row(usuario_row)
+        return usuario
 
     def _criar_usuario_from_row(self, row: dict) -> Usuario:
         """
@@ -100,7 +150,7 @@ class AutenticacaoServico(Conexao):
 
         # Cria usuário
         return Usuario(
-            uuid=UUID(row["uuid"]) if row.get("uuid") else None,
+            usuario_id=UUID(str(row["uuid"])) if row.get("uuid") else None,
             nome=row["nome"],
             email=row["email"],
             senha_hash=row["senhahash"],
@@ -132,8 +182,8 @@ class AutenticacaoServico(Conexao):
         if len(senha) < 8:
             raise ValueError("Senha deve ter no mínimo 8 caracteres")
 
-        # Gera hash da senha usando o método do Usuario
-        senha_hash = Usuario.hash_senha(senha)
+        # Gera hash da senha (PBKDF2 no executor de hash)
+        senha_hash = self.executor_hash.hash_senha(senha)
 
         # Cria usuário (validações feitas no construtor)
         usuario = Usuario(
@@ -171,6 +221,7 @@ class AutenticacaoServico(Conexao):
             ))
             
             usuario_id = cur.fetchone()["idusuario"]
+            self.barramento.publicar(cur, "usuario", [usuario.email])
             conn.commit()
             
             print(f"Usuário {usuario.nome} criado com sucesso! ID: {usuario_id}")
@@ -203,28 +254,45 @@ class AutenticacaoServico(Conexao):
                 (email.strip().lower(),)
             )
             usuario_row = cur.fetchone()
+        # Validar e gerar hash (PBKDF2) sem conexão nem transação abertas
+        self._liberar_conexao_requisicao()
 
-            if not usuario_row:
-                print("Usuário não encontrado.")
-                return False
+        if not usuario_row:
+            print("Usuário não encontrado.")
+            return False
 
-            # Valida senha atual
-            if not Usuario.validar_senha(usuario_row["senhahash"], senha_atual):
-                print("Senha atual incorreta.")
-                return False
+        # Valida senha atual
+        if not self.executor_hash.validar_senha(usuario_row["senhahash"], senha_atual):
+            print("Senha atual incorreta.")
+            return False
 
-            # Gera novo hash
-            novo_hash = Usuario.hash_senha(senha_nova)
+        # Gera novo hash
+        novo_hash = self.executor_hash.hash_senha(senha_nova)
 
-            # Atualiza no banco
+        # Atualiza no banco; o filtro pelo hash lido barra uma troca concorrente
+        with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "UPDATE usuario SET senhahash = %s WHERE idusuario = %s;",
-                (novo_hash, usuario_row["idusuario"])
+                "UPDATE usuario SET senhahash = %s WHERE idusuario = %s AND senhahash = %s;",
+                (novo_hash, usuario_row["idusuario"], usuario_row["senhahash"])
             )
+            if cur.rowcount == 0:
+                print("Senha alterada em outra sessão. Tente novamente.")
+                return False
+            self.barramento.publicar(cur, "usuario", [email.strip().lower()])
             conn.commit()
 
-            print("Senha alterada com sucesso.")
-            return True
+        print("Senha alterada com sucesso.")
+        return True
+
+    @staticmethod
+    def _hash_token(token: str) -> str:
+        """
+        Hash guardado no lugar do token de recuperação.
+
+        SHA-256 simples basta (sem salt nem PBKDF2): o token já tem 256 bits
+        aleatórios, não há o que adivinhar por força bruta.
+        """
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
     def solicitar_recuperacao_senha(self, email: str) -> str | None:
         """
@@ -240,6 +308,7 @@ class AutenticacaoServico(Conexao):
             - Token expira em 30 minutos
             - Não revela se email existe (sempre retorna mensagem de sucesso)
             - Em produção, enviar token por email em vez de retornar
+            - O banco guarda só o SHA-256 do token (ver _hash_token)
         """
         if not email:
             print("Email é obrigatório.")
@@ -264,12 +333,12 @@ class AutenticacaoServico(Conexao):
             token = os.urandom(self.TOKEN_TAMANHO_BYTES).hex()
             expira_em = datetime.now(timezone.utc) + timedelta(minutes=self.TOKEN_EXPIRACAO_MINUTOS)
 
-            # Insere token no banco
+            # Insere só o hash do token no banco
             cur.execute("""
                 INSERT INTO tokenrecuperacao 
-                    (token, expiraem, utilizado, fk_usuario_idusuario)
+                    (token_hash, expiraem, utilizado, fk_usuario_idusuario)
                 VALUES (%s, %s, FALSE, %s);
-            """, (token, expira_em, usuario["idusuario"]))
+            """, (self._hash_token(token), expira_em, usuario["idusuario"]))
             
             conn.commit()
 
@@ -301,50 +370,59 @@ class AutenticacaoServico(Conexao):
             return False
 
         with self._get_conn() as conn, conn.cursor() as cur:
-            # Busca token
+            # Busca token pelo hash (índice único)
             cur.execute("""
-                SELECT t.idtoken, t.expiraem, t.utilizado, u.idusuario
+                SELECT t.idtoken, t.expiraem, t.utilizado, u.idusuario, u.email
                 FROM tokenrecuperacao t
                 JOIN usuario u ON u.idusuario = t.fk_usuario_idusuario
-                WHERE t.token = %s;
-            """, (token,))
+                WHERE t.token_hash = %s;
+            """, (self._hash_token(token),))
             
             meta = cur.fetchone()
+        # Gerar o hash (PBKDF2) sem conexão nem transação abertas
+        self._liberar_conexao_requisicao()
 
-            # Validações (mensagens genéricas por segurança)
-            if not meta:
-                print("Token inválido ou expirado.")
-                return False
-                
-            if meta["utilizado"]:
-                print("Token inválido ou expirado.")
-                return False
+        # Validações (mensagens genéricas por segurança)
+        if not meta:
+            print("Token inválido ou expirado.")
+            return False
+            
+        if meta["utilizado"]:
+            print("Token inválido ou expirado.")
+            return False
 
-            # Verifica expiração
-            expira_em = meta["expiraem"]
-            if expira_em.tzinfo is None:
-                expira_em = expira_em.replace(tzinfo=timezone.utc)
-                
-            if expira_em <= datetime.now(timezone.utc):
+        # Verifica expiração
+        expira_em = meta["expiraem"]
+        if expira_em.tzinfo is None:
+            expira_em = expira_em.replace(tzinfo=timezone.utc)
+            
+        if expira_em <= datetime.now(timezone.utc):
+            print("Token inválido ou expirado.")
+            return False
+
+        # Gera novo hash (PBKDF2 no executor de hash)
+        novo_hash = self.executor_hash.hash_senha(nova_senha)
+        
+        with self._get_conn() as conn, conn.cursor() as cur:
+            # Marca o token como utilizado primeiro: o filtro barra o mesmo
+            # token usado em outra requisição enquanto o hash era gerado
+            cur.execute(
+                "UPDATE tokenrecuperacao SET utilizado = TRUE WHERE idtoken = %s AND NOT utilizado RETURNING idtoken;",
+                (meta["idtoken"],)
+            )
+            if not cur.fetchone():
                 print("Token inválido ou expirado.")
                 return False
 
-            # Gera novo hash usando método do Usuario
-            novo_hash = Usuario.hash_senha(nova_senha)
-            
-            # Atualiza senha e marca token como utilizado
             cur.execute(
                 "UPDATE usuario SET senhahash = %s WHERE idusuario = %s;",
                 (novo_hash, meta["idusuario"])
             )
-            cur.execute(
-                "UPDATE tokenrecuperacao SET utilizado = TRUE WHERE idtoken = %s;",
-                (meta["idtoken"],)
-            )
             
+            self.barramento.publicar(cur, "usuario", [meta["email"]])
             conn.commit()
-            print("Senha redefinida com sucesso.")
-            return True
+        print("Senha redefinida com sucesso.")
+        return True
 
     def invalidar_tokens_usuario(self, usuario_id: int) -> int:
         """
@@ -374,27 +452,44 @@ class AutenticacaoServico(Conexao):
             print(f"{tokens_invalidados} token(s) invalidado(s) para usuário {usuario_id}.")
             return tokens_invalidados
 
-    def limpar_tokens_expirados(self) -> int:
+    def limpar_tokens_expirados(self, lote: int = 1000) -> int:
         """
         Remove tokens expirados do banco (manutenção).
         
+        Args:
+            lote: Tokens removidos por transação
+        
         Returns:
             Número de tokens removidos
             
         Notes:
-            Executar periodicamente (cron job, etc)
+            Agendado pelo AgendadorManutencao. Remove em lotes com commit
+            a cada lote, para não segurar locks em tokenrecuperacao; linhas
+            travadas por uma redefinição em andamento ficam para a próxima.
         """
+        agora = datetime.now(timezone.utc)
+        tokens_removidos = 0
+
         with self._get_conn() as conn, conn.cursor() as cur:
-            cur.execute("""
-                DELETE FROM tokenrecuperacao 
-                WHERE expiraem < %s;
-            """, (datetime.now(timezone.utc),))
-            
-            tokens_removidos = cur.rowcount
-            conn.commit()
+            while True:
+                cur.execute("""
+                    DELETE FROM tokenrecuperacao
+                    WHERE idtoken IN (
+                        SELECT idtoken FROM tokenrecuperacao
+                        WHERE expiraem < %s
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    );
+                """, (agora, lote))
+                
+                removidos = cur.rowcount
+                conn.commit()
+                tokens_removidos += removidos
+                if removidos < lote:
+                    break
             
-            print(f"{tokens_removidos} token(s) expirado(s) removido(s).")
-            return tokens_removidos
+        print(f"{tokens_removidos} token(s) expirado(s) removido(s).")
+        return tokens_removidos
 
     def verificar_email_disponivel(self, email: str) -> bool:
         """
@@ -416,19 +511,30 @@ class AutenticacaoServico(Conexao):
             )
             return cur.fetchone() is None
 
-    def listar_usuarios_ativos(self) -> list[Usuario]:
+    def listar_usuarios_ativos(self, permissao: str | None = None) -> list[Usuario]:
         """
         Lista todos os usuários ativos.
         
+        Args:
+            permissao: Se informada, só os usuários cujo perfil tem essa
+                permissão (filtrado no banco pelos perfis da máscara)
+        
         Returns:
             Lista de objetos Usuario ativos
         """
+        perfis = None
+        if permissao is not None:
+            perfis = [p.value for p in Usuario.perfis_com_permissao(permissao)]
+            if not perfis:
+                return []
+
         with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute("""
                 SELECT * FROM usuario 
                 WHERE status = %s 
+                  AND (%s::text[] IS NULL OR perfil = ANY(%s::text[]))
                 ORDER BY nome;
-            """, (StatusUsuario.ATIVO.value,))
+            """, (StatusUsuario.ATIVO.value, perfis, perfis))
             
             usuarios = []
             for row in cur.fetchall():
@@ -458,7 +564,7 @@ class AutenticacaoServico(Conexao):
 
         with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "UPDATE usuario SET perfil = %s WHERE email = %s;",
+                "UPDATE usuario SET perfil = %s, versao_permissoes = versao_permissoes + 1 WHERE email = %s;",
                 (novo_perfil.value, email.strip().lower())
             )
             
@@ -466,7 +572,9 @@ class AutenticacaoServico(Conexao):
                 print(f"Usuário {email} não encontrado.")
                 return False
             
+            self.barramento.publicar(cur, "usuario", [email.strip().lower()])
             conn.commit()
+            self.sessoes.invalidar([email.strip().lower()])
             print(f"Perfil de {email} atualizado para {novo_perfil.value}.")
             return True
 
@@ -482,7 +590,7 @@ class AutenticacaoServico(Conexao):
         """
         with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "UPDATE usuario SET status = %s WHERE email = %s;",
+                "UPDATE usuario SET status = %s, versao_permissoes = versao_permissoes + 1 WHERE email = %s;",
                 (StatusUsuario.INATIVO.value, email.strip().lower())
             )
             
@@ -490,7 +598,9 @@ class AutenticacaoServico(Conexao):
                 print(f"Usuário {email} não encontrado.")
                 return False
             
+            self.barramento.publicar(cur, "usuario", [email.strip().lower()])
             conn.commit()
+            self.sessoes.invalidar([email.strip().lower()])
             print(f"Usuário {email} desativado.")
             return True
 
@@ -506,7 +616,7 @@ class AutenticacaoServico(Conexao):
         """
         with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "UPDATE usuario SET status = %s WHERE email = %s;",
+                "UPDATE usuario SET status = %s, versao_permissoes = versao_permissoes + 1 WHERE email = %s;",
                 (StatusUsuario.ATIVO.value, email.strip().lower())
             )
             
@@ -514,6 +624,101 @@ class AutenticacaoServico(Conexao):
                 print(f"Usuário {email} não encontrado.")
                 return False
             
+            self.barramento.publicar(cur, "usuario", [email.strip().lower()])
             conn.commit()
+            self.sessoes.invalidar([email.strip().lower()])
             print(f"Usuário {email} reativado.")
-            return True
\ No newline at end of file
+            return True
+
+    # Operações em lote (equipe inteira entrando ou saindo da clínica)
+
+    def _alterar_usuarios_em_lote(self, usuarios: list, atribuicao: str, valor, descricao: str) -> dict:
+        """
+        Aplica `atribuicao` a vários usuários em um único UPDATE.
+
+        Args:
+            usuarios: Emails (str) e/ou idusuario (int)
+            atribuicao: Trecho SET fixo do código (ex.: "perfil = %s")
+            valor: Valor do parâmetro da atribuição
+            descricao: Texto do log (ex.: "desativado(s)")
+
+        Returns:
+            Dicionário item informado -> True se o usuário foi encontrado e alterado
+        """
+        emails = {u.strip().lower() for u in usuarios if isinstance(u, str) and u.strip()}
+        ids = {u for u in usuarios if isinstance(u, int) and not isinstance(u, bool)}
+
+        if not emails and not ids:
+            return {u: False for u in usuarios}
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE usuario
+                SET {atribuicao}, versao_permissoes = versao_permissoes + 1
+                WHERE email = ANY(%s::text[]) OR idusuario = ANY(%s::int[])
+                RETURNING idusuario, email;
+            """, (valor, sorted(emails), sorted(ids)))
+            alterados = cur.fetchall()
+
+            if alterados:
+                # Uma invalidação para o lote inteiro
+                self.barramento.publicar(cur, "usuario", sorted({r["email"] for r in alterados}))
+            conn.commit()
+
+        emails_alterados = {r["email"] for r in alterados}
+        ids_alterados = {r["idusuario"] for r in alterados}
+        if emails_alterados:
+            self.sessoes.invalidar(sorted(emails_alterados))
+
+        print(f"{len(alterados)} usuário(s) {descricao}.")
+        return {
+            u: (u.strip().lower() in emails_alterados) if isinstance(u, str) else (u in ids_alterados)
+            for u in usuarios
+        }
+
+    def atualizar_perfil_usuarios(self, usuarios: list, novo_perfil: PerfilUsuario) -> dict:
+        """
+        Atualiza o perfil de vários usuários em um único comando.
+        
+        Args:
+            usuarios: Emails (str) e/ou idusuario (int)
+            novo_perfil: Novo perfil
+            
+        Returns:
+            Dicionário item informado -> True se atualizado, False se não encontrado
+        """
+        if not isinstance(novo_perfil, PerfilUsuario):
+            print("Perfil inválido.")
+            return {u: False for u in usuarios}
+
+        return self._alterar_usuarios_em_lote(
+            usuarios, "perfil = %s", novo_perfil.value, f"com perfil {novo_perfil.value}"
+        )
+
+    def desativar_usuarios(self, usuarios: list) -> dict:
+        """
+        Desativa vários usuários (soft delete) em um único comando.
+        
+        Args:
+            usuarios: Emails (str) e/ou idusuario (int)
+            
+        Returns:
+            Dicionário item informado -> True se desativado, False se não encontrado
+        """
+        return self._alterar_usuarios_em_lote(
+            usuarios, "status = %s", StatusUsuario.INATIVO.value, "desativado(s)"
+        )
+
+    def reativar_usuarios(self, usuarios: list) -> dict:
+        """
+        Reativa vários usuários em um único comando.
+        
+        Args:
+            usuarios: Emails (str) e/ou idusuario (int)
+            
+        Returns:
+            Dicionário item informado -> True se reativado, False se não encontrado
+        """
+        return self._alterar_usuarios_em_lote(
+            usuarios, "status = %s", StatusUsuario.ATIVO.value, "reativado(s)"
+        )
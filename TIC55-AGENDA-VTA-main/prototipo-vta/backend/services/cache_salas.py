@@ -0,0 +1,185 @@
+import copy
+import os
+import threading
+import time
+from backend.DB.invalidacao import barramento_invalidacao
+from backend.models.sala import Sala
+
+
+class CacheSalas:
+    """
+    Cache do processo para objetos Sala, por UUID e por nome.
+
+    As salas quase nunca mudam, então SalaServico lê daqui antes de ir ao
+    banco. Escritas em sala invalidam as chaves (localmente e, pelo
+    barramento de invalidação, nos outros workers); o TTL é só uma rede de
+    segurança caso alguma invalidação se perca.
+
+    Os objetos são copiados na entrada e na saída: quem recebe uma Sala pode
+    alterá-la sem mexer no cache.
+    """
+
+    def __init__(self, ttl: float = 300.0, relogio=time.monotonic):
+        """
+        Inicializa o cache vazio.
+
+        Args:
+            ttl: Segundos até uma entrada ser considerada velha
+            relogio: Função de tempo (substituível nos testes)
+        """
+        self.ttl = ttl
+        self._relogio = relogio
+        self._lock = threading.Lock()
+
+        self._por_id: dict[str, tuple[Sala, float]] = {}
+        self._por_nome: dict[str, str] = {}
+        self._todas: tuple[list[str], float] | None = None
+
+        # Incrementada a cada invalidação: leituras iniciadas antes dela não
+        # podem repovoar o cache com dados possivelmente antigos
+        self._geracao = 0
+
+        # Estatísticas
+        self._acertos = 0
+        self._falhas = 0
+        self._invalidacoes = 0
+
+    @property
+    def geracao(self) -> int:
+        """Geração atual; passe-a para `guardar` ao terminar a consulta."""
+        return self._geracao
+
+    def _valida(self, expira_em: float) -> bool:
+        return self._relogio() < expira_em
+
+    def _contar(self, acerto: bool) -> None:
+        if acerto:
+            self._acertos += 1
+        else:
+            self._falhas += 1
+
+    def obter(self, sala_id: str) -> Sala | None:
+        """
+        Busca uma sala pelo UUID.
+
+        Returns:
+            Cópia da sala ou None se não estiver no cache (ou expirou)
+        """
+        with self._lock:
+            entrada = self._por_id.get(str(sala_id))
+            acerto = entrada is not None and self._valida(entrada[1])
+            self._contar(acerto)
+            return copy.copy(entrada[0]) if acerto else None
+
+    def obter_por_nome(self, nome: str) -> Sala | None:
+        """
+        Busca uma sala pelo nome exato.
+
+        Returns:
+            Cópia da sala ou None se não estiver no cache (ou expirou)
+        """
+        with self._lock:
+            sala_id = self._por_nome.get(nome)
+            entrada = self._por_id.get(sala_id) if sala_id is not None else None
+            acerto = entrada is not None and self._valida(entrada[1])
+            self._contar(acerto)
+            return copy.copy(entrada[0]) if acerto else None
+
+    def listar(self) -> list[Sala] | None:
+        """
+        Retorna todas as salas, ordenadas por nome.
+
+        Returns:
+            Cópias das salas ou None se a lista não estiver no cache
+        """
+        with self._lock:
+            acerto = self._todas is not None and self._valida(self._todas[1])
+            if acerto:
+                entradas = [self._por_id.get(sala_id) for sala_id in self._todas[0]]
+                acerto = all(entrada is not None for entrada in entradas)
+            self._contar(acerto)
+            return [copy.copy(sala) for sala, _ in entradas] if acerto else None
+
+    def _guardar(self, sala: Sala, expira_em: float) -> None:
+        """Guarda uma sala (chamado com o lock adquirido)."""
+        anterior = self._por_id.get(sala.sala_id)
+        if anterior is not None and self._por_nome.get(anterior[0].nome) == sala.sala_id:
+            del self._por_nome[anterior[0].nome]
+        self._por_id[sala.sala_id] = (copy.copy(sala), expira_em)
+        self._por_nome[sala.nome] = sala.sala_id
+
+    def guardar(self, sala: Sala, geracao: int) -> None:
+        """
+        Guarda uma sala lida do banco.
+
+        Args:
+            sala: Sala lida
+            geracao: Valor de `geracao` obtido antes da consulta
+        """
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            self._guardar(sala, self._relogio() + self.ttl)
+
+    def guardar_todas(self, salas: list[Sala], geracao: int) -> None:
+        """
+        Guarda a lista completa de salas lida do banco.
+
+        Args:
+            salas: Todas as salas, ordenadas por nome
+            geracao: Valor de `geracao` obtido antes da consulta
+        """
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            expira_em = self._relogio() + self.ttl
+            self._por_id.clear()
+            self._por_nome.clear()
+            for sala in salas:
+                self._guardar(sala, expira_em)
+            self._todas = ([sala.sala_id for sala in salas], expira_em)
+
+    def invalidar(self, chaves: list[str] | None = None) -> None:
+        """
+        Remove salas do cache (callback do barramento de invalidação).
+
+        Args:
+            chaves: UUIDs das salas alteradas (None para limpar tudo)
+        """
+        with self._lock:
+            self._geracao += 1
+            self._invalidacoes += 1
+            # Qualquer escrita muda a lista (nova sala, nome, ativa...)
+            self._todas = None
+
+            if chaves is None:
+                self._por_id.clear()
+                self._por_nome.clear()
+                return
+
+            for sala_id in chaves:
+                entrada = self._por_id.pop(str(sala_id), None)
+                if entrada is not None and self._por_nome.get(entrada[0].nome) == str(sala_id):
+                    del self._por_nome[entrada[0].nome]
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna contadores do cache.
+
+        Returns:
+            Dicionário com acertos, falhas, taxa_acerto, invalidacoes e tamanho
+        """
+        with self._lock:
+            consultas = self._acertos + self._falhas
+            return {
+                "acertos": self._acertos,
+                "falhas": self._falhas,
+                "taxa_acerto": self._acertos / consultas if consultas else 0.0,
+                "invalidacoes": self._invalidacoes,
+                "tamanho": len(self._por_id),
+            }
+
+
+# Cache do processo, invalidado também pelas escritas dos outros workers
+cache_salas = CacheSalas(ttl=float(os.getenv("CACHE_SALAS_TTL", "300")))
+barramento_invalidacao.registrar("sala", cache_salas.invalidar)
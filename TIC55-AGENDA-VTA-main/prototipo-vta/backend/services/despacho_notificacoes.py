@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from collections import deque
+from backend.models.notificacao import Notificacao
+from backend.services.eventos_servico import CanalEventos, canal_eventos
+from backend.services.notificacoes_postgres import RepositorioNotificacoesPostgres
+
+
+class FilaDespachoCheiaErro(Exception):
+    """Fila de despacho cheia além do tempo de espera (o chamador deve responder 503)."""
+
+
+class DespachoNotificacoes:
+    """
+    Grava e entrega notificações em segundo plano, em lotes.
+
+    `enfileirar` só coloca as notificações na fila e retorna: um aviso para
+    a clínica inteira não prende a requisição de quem enviou. Uma thread do
+    worker junta o que houver na fila (vários envios) em lotes de até
+    `max_lote`, grava cada lote com um `salvar_em_lote` (um INSERT) e só
+    depois publica no canal de eventos, para nenhuma aba receber uma
+    notificação que ainda não está no banco.
+
+    A fila guarda no máximo `max_pendentes` notificações: cheia, `enfileirar`
+    espera até `espera` segundos por espaço e então falha com
+    FilaDespachoCheiaErro. Se a gravação falhar, o lote volta para a frente
+    da fila e é tentado de novo após `espera_falha` segundos, até
+    `max_tentativas` vezes; depois é descartado (e registrado no log).
+    `parar` esvazia a fila antes de encerrar.
+
+    O preço: um worker morto sem encerramento limpo (kill -9) perde o que
+    ainda estava na fila.
+    """
+
+    def __init__(self, repositorio=None, canal: CanalEventos = None, max_lote: int = 500,
+                 max_pendentes: int = 10_000, espera: float = 0.0, janela: float = 0.02,
+                 espera_falha: float = 1.0, max_tentativas: int = 3):
+        """
+        Inicializa o despacho com a fila vazia (a thread sobe em `iniciar`).
+
+        Args:
+            repositorio: Repositório com salvar_em_lote (padrão: PostgreSQL)
+            canal: Canal de eventos ao vivo (padrão: canal do processo)
+            max_lote: Notificações gravadas por INSERT
+            max_pendentes: Notificações na fila antes de recusar envios
+            espera: Segundos que `enfileirar` aguarda espaço na fila cheia
+            janela: Segundos que a thread aguarda outros envios antes de
+                gravar um lote incompleto
+            espera_falha: Segundos entre tentativas de um lote que falhou
+            max_tentativas: Tentativas de um lote antes de descartá-lo
+        """
+        self.repositorio = repositorio if repositorio is not None else RepositorioNotificacoesPostgres()
+        self.canal = canal if canal is not None else canal_eventos
+        self.max_lote = max_lote
+        self.max_pendentes = max_pendentes
+        self.espera = espera
+        self.janela = janela
+        self.espera_falha = espera_falha
+        self.max_tentativas = max_tentativas
+
+        # (instante em que entrou na fila, notificação), na ordem de envio
+        self._fila: deque[tuple[float, Notificacao]] = deque()
+        self._lock = threading.Lock()
+        self._tem_itens = threading.Condition(self._lock)
+        self._tem_espaco = threading.Condition(self._lock)
+        self._parar = threading.Event()
+        self._thread = None
+        self._tentativas = 0  # falhas seguidas do lote da frente
+
+        # Estatísticas
+        self._enfileiradas = 0
+        self._despachadas = 0
+        self._lotes = 0
+        self._rejeitadas = 0
+        self._falhas = 0
+        self._descartadas = 0
+        self._atraso_total = 0.0
+        self._atraso_maximo = 0.0
+
+    def enfileirar(self, notificacoes: list[Notificacao], espera: float | None = None) -> int:
+        """
+        Coloca notificações na fila de despacho (não acessa o banco).
+
+        Um envio maior que a fila inteira é aceito quando ela estiver vazia.
+
+        Args:
+            notificacoes: Notificações novas de um envio
+            espera: Segundos de espera por espaço (None para `self.espera`)
+
+        Returns:
+            Número de notificações enfileiradas
+
+        Raises:
+            FilaDespachoCheiaErro: Se não houver espaço dentro da espera
+        """
+        if not notificacoes:
+            return 0
+
+        limite = time.monotonic() + (self.espera if espera is None else espera)
+        with self._lock:
+            while self._fila and len(self._fila) + len(notificacoes) > self.max_pendentes:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._rejeitadas += len(notificacoes)
+                    raise FilaDespachoCheiaErro(
+                        f"Fila de despacho cheia ({len(self._fila)} notificações pendentes)"
+                    )
+                self._tem_espaco.wait(restante)
+
+            agora = time.monotonic()
+            self._fila.extend((agora, n) for n in notificacoes)
+            self._enfileiradas += len(notificacoes)
+            self._tem_itens.notify()
+        return len(notificacoes)
+
+    def _despachar_lote(self) -> int | None:
+        """
+        Grava um lote da frente da fila e publica cada notificação.
+
+        Returns:
+            Tamanho do lote (0 se a fila estava vazia) ou None se a gravação falhou
+        """
+        with self._lock:
+            lote = [self._fila.popleft() for _ in range(min(self.max_lote, len(self._fila)))]
+            if lote:
+                self._tem_espaco.notify_all()
+
+        if not lote:
+            return 0
+
+        notificacoes = [n for _, n in lote]
+        try:
+            self.repositorio.salvar_em_lote(notificacoes)
+        except Exception as e:
+            with self._lock:
+                self._falhas += 1
+                self._tentativas += 1
+                if self._tentativas < self.max_tentativas:
+                    # Volta para a frente: a ordem de envio é mantida
+                    self._fila.extendleft(reversed(lote))
+                    print(f"Aviso: não foi possível gravar {len(lote)} notificações (tentativa {self._tentativas}): {e}")
+                else:
+                    self._tentativas = 0
+                    self._descartadas += len(lote)
+                    print(f"Erro: {len(lote)} notificações descartadas após {self.max_tentativas} tentativas: {e}")
+            return None
+
+        # Um lote, poucos NOTIFY: os outros workers recebem tudo agrupado
+        self.canal.publicar_lote("notificacao", [
+            (notificacao.to_dict(), notificacao.usuario_id, None) for notificacao in notificacoes
+        ])
+
+        agora = time.monotonic()
+        with self._lock:
+            self._tentativas = 0
+            self._lotes += 1
+            self._despachadas += len(lote)
+            self._atraso_total += sum(agora - instante for instante, _ in lote)
+            self._atraso_maximo = max(self._atraso_maximo, agora - lote[0][0])
+        return len(lote)
+
+    def descarregar(self) -> int:
+        """
+        Despacha, na thread de quem chama, tudo o que está na fila.
+
+        Para na primeira falha de gravação (o lote continua na fila).
+
+        Returns:
+            Número de notificações despachadas
+        """
+        total = 0
+        while True:
+            despachadas = self._despachar_lote()
+            if not despachadas:
+                return total
+            total += despachadas
+
+    def _executar(self) -> None:
+        """Laço da thread: despacha enquanto houver fila; no encerramento, esvazia."""
+        while True:
+            with self._lock:
+                while not self._fila and not self._parar.is_set():
+                    self._tem_itens.wait()
+                if not self._fila:
+                    return
+                incompleto = len(self._fila) < self.max_lote
+
+            # Dá tempo para envios simultâneos entrarem no mesmo INSERT
+            if incompleto and self.janela > 0:
+                self._parar.wait(self.janela)
+
+            if self._despachar_lote() is None:
+                self._parar.wait(self.espera_falha)
+
+    def iniciar(self) -> None:
+        """Inicia a thread de despacho deste worker (idempotente)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="vta-despacho-notificacoes", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 10.0) -> None:
+        """Encerra a thread depois de esvaziar a fila."""
+        with self._lock:
+            self._parar.set()
+            self._tem_itens.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Sem thread (nunca iniciada ou não terminou a tempo): tenta na hora
+        self.descarregar()
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do despacho.
+
+        Returns:
+            Dicionário com pendentes, atraso da fila (ms), enfileiradas,
+            despachadas, lotes, rejeitadas, falhas e descartadas
+        """
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                "pendentes": len(self._fila),
+                "atraso_atual_ms": (agora - self._fila[0][0]) * 1000 if self._fila else 0.0,
+                "atraso_medio_ms": (self._atraso_total / self._despachadas * 1000) if self._despachadas else 0.0,
+                "atraso_maximo_ms": self._atraso_maximo * 1000,
+                "enfileiradas": self._enfileiradas,
+                "despachadas": self._despachadas,
+                "lotes": self._lotes,
+                "rejeitadas": self._rejeitadas,
+                "falhas": self._falhas,
+                "descartadas": self._descartadas,
+            }
+
+
+# Despacho do processo, usado pelo NotificacaoServico das rotas
+despacho_notificacoes = DespachoNotificacoes(
+    max_pendentes=int(os.getenv("NOTIFICACOES_MAX_PENDENTES", "10000"))
+)
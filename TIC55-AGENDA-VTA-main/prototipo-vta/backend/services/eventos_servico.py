@@ -0,0 +1,314 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from backend.DB.invalidacao import BarramentoInvalidacao, barramento_invalidacao
+
+
+class Assinatura:
+    """
+    Assinatura de um navegador (aba) no canal de eventos.
+
+    Cada assinatura tem uma fila limitada. Se o cliente não consumir a tempo
+    e a fila encher, os eventos pendentes são descartados e substituídos por
+    um único evento "ressincronizar" (o navegador recarrega a agenda).
+
+    Attributes:
+        usuario_id: Usuário dono da aba (filtra eventos pessoais)
+        salas: Conjunto de salas de interesse (None para todas)
+    """
+
+    def __init__(self, usuario_id: str, salas: set | None = None, tamanho_fila: int = 100):
+        self.usuario_id = str(usuario_id)
+        self.salas = {str(s) for s in salas} if salas else None
+        self.criada_em = time.monotonic()
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+
+    def aceita(self, evento: dict) -> bool:
+        """Verifica se o evento interessa a esta assinatura."""
+        destinatario = evento.get("usuario_id")
+        if destinatario is not None and destinatario != self.usuario_id:
+            return False
+
+        sala_id = evento.get("sala_id")
+        if self.salas is not None and sala_id is not None and sala_id not in self.salas:
+            return False
+
+        return True
+
+    def entregar(self, evento: dict) -> bool:
+        """
+        Coloca o evento na fila sem bloquear quem publica.
+
+        Returns:
+            False se a fila estava cheia (cliente atrasado)
+        """
+        try:
+            self._fila.put_nowait(evento)
+            return True
+        except queue.Full:
+            # Cliente lento: troca o atraso por um pedido de recarga
+            with self._fila.mutex:
+                self._fila.queue.clear()
+            self._fila.put_nowait({"id": evento["id"], "tipo": "ressincronizar", "dados": {}})
+            return False
+
+    def proximo(self, timeout: float) -> dict | None:
+        """
+        Aguarda o próximo evento.
+
+        Args:
+            timeout: Segundos de espera (o chamador envia heartbeat se None)
+
+        Returns:
+            Evento ou None se o tempo acabou
+        """
+        try:
+            return self._fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class CanalEventos:
+    """
+    Canal publish/subscribe em memória para atualizações ao vivo (SSE).
+
+    Serviços publicam mudanças na agenda e novas notificações; cada aba
+    conectada em /api/eventos recebe só o que lhe diz respeito. Publicar
+    nunca bloqueia: cada assinatura tem fila própria.
+
+    Servido com um worker evented (gunicorn -k gevent), cada conexão aberta
+    é uma greenlet esperando na fila, não uma thread do SO.
+
+    Com vários workers, cada aba está ligada a um só deles. Com `barramento`,
+    todo evento publicado aqui também sai no canal "eventos" do LISTEN/NOTIFY
+    e os outros workers o repassam às suas abas. Mensagens perdidas
+    (barramento reconectando) ou grandes demais para o NOTIFY viram um
+    "ressincronizar" nas abas interessadas.
+    """
+
+    # Nome do canal no barramento de invalidação
+    CANAL_BARRAMENTO = "eventos"
+
+    def __init__(self, tamanho_fila: int = 100, barramento: BarramentoInvalidacao = None,
+                 origem: int = None):
+        """
+        Inicializa o canal.
+
+        Args:
+            tamanho_fila: Eventos pendentes por aba antes de ressincronizar
+            barramento: Barramento para repassar eventos entre workers
+                (None: só as abas deste processo)
+            origem: Identificador deste worker nas mensagens (padrão: o pid,
+                lido a cada uso, para valer também após o fork do --preload)
+        """
+        self.tamanho_fila = tamanho_fila
+        self.barramento = barramento
+        self.origem = origem
+        self._lock = threading.Lock()
+        self._assinaturas: set[Assinatura] = set()
+        self._ids = itertools.count(1)
+
+        # Estatísticas
+        self._publicados = 0
+        self._entregues = 0
+        self._descartados = 0
+        self._retransmitidos = 0
+        self._recebidos = 0
+        self._falhas_retransmissao = 0
+
+        if self.barramento is not None:
+            self.barramento.registrar(self.CANAL_BARRAMENTO, self._receber)
+
+    def assinar(self, usuario_id: str, salas: set | None = None) -> Assinatura:
+        """
+        Registra uma nova aba.
+
+        Args:
+            usuario_id: Usuário logado na aba
+            salas: Salas de interesse (None para todas)
+
+        Returns:
+            Assinatura para consumir com `proximo`
+        """
+        assinatura = Assinatura(usuario_id, salas, self.tamanho_fila)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        """Remove a assinatura (aba fechada ou conexão caiu)."""
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, tipo: str, dados: dict, usuario_id: str = None, sala_id: str = None) -> int:
+        """
+        Publica um evento para as assinaturas interessadas.
+
+        As abas deste worker recebem na hora; as dos outros workers, pelo
+        barramento (um NOTIFY em transação própria, se houver barramento).
+
+        Args:
+            tipo: Tipo do evento (ex.: "agendamento", "notificacao")
+            dados: Conteúdo serializável em JSON
+            usuario_id: Destinatário único (None para todos os usuários)
+            sala_id: Sala relacionada (para o filtro por sala)
+
+        Returns:
+            Número de assinaturas deste worker que receberam o evento
+        """
+        usuario_id = str(usuario_id) if usuario_id is not None else None
+        sala_id = str(sala_id) if sala_id is not None else None
+
+        entregues = self._entregar(tipo, dados, usuario_id, sala_id)
+        if self.barramento is not None:
+            self._retransmitir([(tipo, dados, usuario_id, sala_id)])
+        return entregues
+
+    def publicar_lote(self, tipo: str, eventos: list[tuple]) -> int:
+        """
+        Publica vários eventos do mesmo tipo de uma vez (ex.: um lote de notificações).
+
+        As abas deste worker recebem cada evento na hora; para os outros
+        workers os eventos seguem agrupados em poucos NOTIFY, em vez de uma
+        transação por evento.
+
+        Args:
+            tipo: Tipo dos eventos
+            eventos: Tuplas (dados, usuario_id, sala_id), como em `publicar`
+
+        Returns:
+            Número de entregas às assinaturas deste worker
+        """
+        normalizados = [
+            (tipo, dados,
+             str(usuario_id) if usuario_id is not None else None,
+             str(sala_id) if sala_id is not None else None)
+            for dados, usuario_id, sala_id in eventos
+        ]
+
+        entregues = sum(self._entregar(*evento) for evento in normalizados)
+        if self.barramento is not None and normalizados:
+            self._retransmitir(normalizados)
+        return entregues
+
+    def _entregar(self, tipo: str, dados: dict, usuario_id: str | None, sala_id: str | None) -> int:
+        """Entrega o evento às assinaturas interessadas deste worker."""
+        evento = {
+            "id": next(self._ids),
+            "tipo": tipo,
+            "dados": dados,
+            "usuario_id": usuario_id,
+            "sala_id": sala_id,
+        }
+
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+
+        entregues = descartados = 0
+        for assinatura in assinaturas:
+            if not assinatura.aceita(evento):
+                continue
+            if assinatura.entregar(evento):
+                entregues += 1
+            else:
+                descartados += 1
+
+        with self._lock:
+            self._publicados += 1
+            self._entregues += entregues
+            self._descartados += descartados
+
+        return entregues
+
+    def _id_origem(self) -> int:
+        return self.origem if self.origem is not None else os.getpid()
+
+    def _retransmitir(self, eventos: list[tuple]) -> None:
+        """
+        Envia eventos aos outros workers; falha só é registrada (as abas daqui já receberam).
+
+        Agrupa as mensagens em poucos NOTIFY: cada um leva o que couber no
+        payload, e só um evento que sozinho não cabe vira "ressincronizar".
+
+        Args:
+            eventos: Tuplas (tipo, dados, usuario_id, sala_id)
+        """
+        origem = self._id_origem()
+        grupos, grupo = [], []
+        for tipo, dados, usuario_id, sala_id in eventos:
+            mensagem = json.dumps({
+                "origem": origem, "tipo": tipo, "dados": dados,
+                "usuario_id": usuario_id, "sala_id": sala_id,
+            }, default=str)
+            # O NOTIFY tem limite de tamanho: só as abas interessadas recarregam
+            if not self.barramento.cabe(self.CANAL_BARRAMENTO, [mensagem]):
+                mensagem = json.dumps({
+                    "origem": origem, "tipo": "ressincronizar", "dados": {},
+                    "usuario_id": usuario_id, "sala_id": sala_id,
+                })
+            if grupo and not self.barramento.cabe(self.CANAL_BARRAMENTO, grupo + [mensagem]):
+                grupos.append(grupo)
+                grupo = []
+            grupo.append(mensagem)
+        if grupo:
+            grupos.append(grupo)
+
+        for grupo in grupos:
+            try:
+                self.barramento.publicar_agora(self.CANAL_BARRAMENTO, grupo)
+            except Exception as e:
+                with self._lock:
+                    self._falhas_retransmissao += len(grupo)
+                print(f"{len(grupo)} evento(s) não repassado(s) aos outros workers: {e}")
+                continue
+
+            with self._lock:
+                self._retransmitidos += len(grupo)
+
+    def _receber(self, mensagens: list | None) -> None:
+        """
+        Repassa às abas deste worker os eventos de outros workers (callback do barramento).
+
+        Args:
+            mensagens: Eventos em JSON, ou None se mensagens se perderam
+        """
+        if mensagens is None:
+            # Reconexão do barramento: o que mudou no meio não vai chegar
+            self._entregar("ressincronizar", {}, None, None)
+            return
+
+        for mensagem in mensagens:
+            evento = json.loads(mensagem)
+            # Os eventos deste worker já foram entregues em `publicar`
+            if evento["origem"] == self._id_origem():
+                continue
+            with self._lock:
+                self._recebidos += 1
+            self._entregar(evento["tipo"], evento["dados"], evento["usuario_id"], evento["sala_id"])
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna um retrato do canal.
+
+        Returns:
+            Dicionário com assinaturas, publicados, entregues, descartados
+            e a troca de eventos com os outros workers
+        """
+        with self._lock:
+            return {
+                "assinaturas": len(self._assinaturas),
+                "publicados": self._publicados,
+                "entregues": self._entregues,
+                "descartados": self._descartados,
+                "retransmitidos": self._retransmitidos,
+                "recebidos_de_outros_workers": self._recebidos,
+                "falhas_retransmissao": self._falhas_retransmissao,
+            }
+
+
+# Canal do processo, compartilhado pelos serviços e pela rota /api/eventos;
+# os eventos dos outros workers chegam pelo barramento
+canal_eventos = CanalEventos(barramento=barramento_invalidacao)
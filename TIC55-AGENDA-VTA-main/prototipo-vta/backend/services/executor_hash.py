@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturoTimeoutError
+from backend.models.usuario import Usuario
+
+
+class HashIndisponivelErro(Exception):
+    """Fila de hashing cheia ou tempo esgotado (o chamador deve responder 503)."""
+
+
+class ExecutorHash:
+    """
+    Executa o PBKDF2 de senhas em um pool de processos dedicado.
+
+    Uma rajada de logins na troca de turno ocupa os processos de hashing,
+    não as threads do Flask: as rotas da agenda continuam respondendo. A
+    fila é limitada: acima de `max_pendentes` pedidos a chamada falha na
+    hora em vez de empilhar requisições esperando.
+
+    Com processos=0 o hash roda na própria thread (útil em testes e scripts).
+    """
+
+    def __init__(self, processos: int = None, max_pendentes: int = None, timeout: float = 10.0):
+        """
+        Inicializa o executor (os processos só sobem no primeiro uso).
+
+        Args:
+            processos: Tamanho do pool (padrão: número de núcleos)
+            max_pendentes: Pedidos em execução + na fila (padrão: 4 por processo)
+            timeout: Segundos de espera por um resultado
+        """
+        self.processos = (os.cpu_count() or 1) if processos is None else processos
+        self.max_pendentes = max_pendentes or max(self.processos, 1) * 4
+        self.timeout = timeout
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+        # Estatísticas
+        self._pendentes = 0
+        self._executados = 0
+        self._rejeitados = 0
+        self._timeouts = 0
+        self._latencia_total = 0.0
+        self._latencia_maxima = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Cria o pool na primeira chamada."""
+        with self._lock:
+            if self._pool is None:
+                # spawn: o processo do Flask tem threads, fork não é seguro
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processos,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _liberar_vaga(self, _futuro=None) -> None:
+        with self._lock:
+            self._pendentes -= 1
+
+    def _executar(self, funcao, *args):
+        """
+        Executa `funcao(*args)` no pool respeitando a fila e o timeout.
+
+        Raises:
+            HashIndisponivelErro: Se a fila estiver cheia ou o tempo esgotar
+        """
+        with self._lock:
+            if self._pendentes >= self.max_pendentes:
+                self._rejeitados += 1
+                raise HashIndisponivelErro("Fila de hashing cheia")
+            self._pendentes += 1
+
+        inicio = time.monotonic()
+        try:
+            if self.processos == 0:
+                try:
+                    return funcao(*args)
+                finally:
+                    self._liberar_vaga()
+
+            # A vaga só é liberada quando o processo termina, mesmo após timeout
+            try:
+                futuro = self._get_pool().submit(funcao, *args)
+            except Exception:
+                self._liberar_vaga()
+                raise
+            futuro.add_done_callback(self._liberar_vaga)
+            try:
+                return futuro.result(timeout=self.timeout)
+            except FuturoTimeoutError:
+                futuro.cancel()
+                with self._lock:
+                    self._timeouts += 1
+                raise HashIndisponivelErro(f"Hash não concluído em {self.timeout}s") from None
+        finally:
+            latencia = time.monotonic() - inicio
+            with self._lock:
+                self._executados += 1
+                self._latencia_total += latencia
+                self._latencia_maxima = max(self._latencia_maxima, latencia)
+
+    def hash_senha(self, senha: str, iterations: int | None = None) -> str:
+        """Equivalente a Usuario.hash_senha, executado no pool."""
+        return self._executar(Usuario.hash_senha, senha, iterations)
+
+    def validar_senha(self, senha_hash: str, senha: str) -> bool:
+        """Equivalente a Usuario.validar_senha, executado no pool."""
+        return self._executar(Usuario.validar_senha, senha_hash, senha)
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do executor.
+
+        Returns:
+            Dicionário com processos, pendentes (profundidade da fila),
+            max_pendentes, executados, rejeitados, timeouts,
+            latencia_media_ms e latencia_maxima_ms
+        """
+        with self._lock:
+            return {
+                "processos": self.processos,
+                "pendentes": self._pendentes,
+                "max_pendentes": self.max_pendentes,
+                "executados": self._executados,
+                "rejeitados": self._rejeitados,
+                "timeouts": self._timeouts,
+                "latencia_media_ms": (self._latencia_total / self._executados * 1000) if self._executados else 0.0,
+                "latencia_maxima_ms": self._latencia_maxima * 1000,
+            }
+
+    def fechar(self) -> None:
+        """Encerra os processos do pool."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Executor do processo, usado pelo AutenticacaoServico
+executor_hash = ExecutorHash(
+    processos=int(os.environ["HASH_PROCESSOS"]) if os.getenv("HASH_PROCESSOS") else None,
+    timeout=float(os.getenv("HASH_TIMEOUT", "10")),
+)
@@ -0,0 +1,186 @@
+import heapq
+from datetime import datetime, time, timedelta
+from itertools import islice
+from backend.DB.conexao import Conexao
+from backend.models.sala import Sala
+
+
+class HorarioServico(Conexao):
+    """
+    Serviço de busca de horários livres.
+
+    Responde perguntas como "os próximos 5 horários livres de 30 minutos
+    nesta semana em qualquer sala de cirurgia" com duas consultas fixas
+    (salas + reservas da janela, e agenda do profissional) e uma única
+    varredura das reservas ordenadas, sem sondar horário por horário.
+    """
+
+    # Horário de funcionamento padrão da clínica
+    HORARIO_ABERTURA = time(8, 0)
+    HORARIO_FECHAMENTO = time(18, 0)
+
+    def buscar_horarios_livres(self, inicio: datetime, fim: datetime, duracao: timedelta,
+                               quantidade: int = 5, tipo_sala: str = None,
+                               profissional_id: str = None, passo: timedelta = None,
+                               abertura: time = None, fechamento: time = None) -> list[tuple[Sala, datetime, datetime]]:
+        """
+        Busca os primeiros horários livres com a duração pedida.
+
+        Args:
+            inicio: Início da busca (ex.: agora)
+            fim: Fim da busca (ex.: fim da semana)
+            duracao: Duração do atendimento
+            quantidade: Número máximo de horários retornados
+            tipo_sala: Filtra salas por tipo (ex.: "Cirurgia"); None para todas
+            profissional_id: UUID do profissional que também precisa estar livre
+            passo: Grade de início dos horários (padrão: a própria duração)
+            abertura: Horário de abertura (padrão: HORARIO_ABERTURA)
+            fechamento: Horário de fechamento (padrão: HORARIO_FECHAMENTO)
+
+        Returns:
+            Lista de (Sala, inicio, fim) em ordem cronológica (empates por
+            nome da sala), com no máximo `quantidade` itens
+
+        Raises:
+            ValueError: Se o período, a duração ou a quantidade forem inválidos
+        """
+        if inicio >= fim:
+            raise ValueError("O início da busca deve ser anterior ao fim")
+
+        if duracao <= timedelta(0):
+            raise ValueError("Duração deve ser positiva")
+
+        if quantidade < 1:
+            raise ValueError("Quantidade deve ser pelo menos 1")
+
+        passo = passo or duracao
+        if passo <= timedelta(0):
+            raise ValueError("Passo deve ser positivo")
+
+        abertura = abertura or self.HORARIO_ABERTURA
+        fechamento = fechamento or self.HORARIO_FECHAMENTO
+
+        salas, ocupados_por_sala = self._carregar_salas_e_reservas(inicio, fim, tipo_sala)
+        ocupados_profissional = (
+            self._carregar_reservas_profissional(profissional_id, inicio, fim)
+            if profissional_id else []
+        )
+
+        expediente = list(self._janelas_expediente(inicio, fim, abertura, fechamento))
+
+        # Um gerador (ordenado por início) por sala; heapq.merge intercala e
+        # islice para assim que encontrar a quantidade pedida
+        geradores = [
+            self._horarios_da_sala(
+                posicao, sala, expediente,
+                heapq.merge(ocupados_por_sala.get(sala.sala_id, []), ocupados_profissional),
+                duracao, passo
+            )
+            for posicao, sala in enumerate(salas)
+        ]
+
+        return [
+            (sala, slot_inicio, slot_fim)
+            for slot_inicio, _, sala, slot_fim in islice(heapq.merge(*geradores), quantidade)
+        ]
+
+    def _carregar_salas_e_reservas(self, inicio: datetime, fim: datetime,
+                                   tipo_sala: str = None) -> tuple[list[Sala], dict[str, list]]:
+        """
+        Carrega salas ativas e suas reservas da janela em uma consulta.
+
+        Returns:
+            (salas ordenadas por nome, {sala_id: [(inicio, fim), ...] ordenado})
+        """
+        filtro_tipo = "AND s.tipo ILIKE %(tipo)s" if tipo_sala else ""
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT s.uuid, s.nome, s.tipo, s.ativa,
+                       a.inicio AS reserva_inicio, a.fim AS reserva_fim
+                FROM sala s
+                LEFT JOIN agendamento a
+                       ON a.fk_sala_uuid = s.uuid
+                      AND a.status != 'CANCELADO'
+                      AND a.inicio < %(fim)s
+                      AND a.fim > %(inicio)s
+                WHERE s.ativa = TRUE
+                  {filtro_tipo}
+                ORDER BY s.nome, a.inicio;
+            """, {"inicio": inicio, "fim": fim, "tipo": tipo_sala})
+            rows = cur.fetchall()
+
+        salas = []
+        ocupados: dict[str, list] = {}
+        for row in rows:
+            sala_id = str(row["uuid"])
+            if sala_id not in ocupados:
+                salas.append(Sala(sala_id=sala_id, nome=row["nome"], tipo=row["tipo"], ativa=row["ativa"]))
+                ocupados[sala_id] = []
+            if row["reserva_inicio"] is not None:
+                ocupados[sala_id].append((row["reserva_inicio"], row["reserva_fim"]))
+
+        return salas, ocupados
+
+    def _carregar_reservas_profissional(self, profissional_id: str, inicio: datetime,
+                                        fim: datetime) -> list[tuple[datetime, datetime]]:
+        """Carrega os horários ocupados do profissional na janela, ordenados."""
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT inicio, fim
+                FROM agendamento
+                WHERE fk_profissional_uuid = %s
+                  AND status != 'CANCELADO'
+                  AND inicio < %s
+                  AND fim > %s
+                ORDER BY inicio;
+            """, (profissional_id, fim, inicio))
+            return [(row["inicio"], row["fim"]) for row in cur.fetchall()]
+
+    @staticmethod
+    def _janelas_expediente(inicio: datetime, fim: datetime, abertura: time, fechamento: time):
+        """Gera os intervalos de expediente de cada dia dentro de [inicio, fim)."""
+        dia = inicio.date()
+        while dia <= fim.date():
+            abre = datetime.combine(dia, abertura, tzinfo=inicio.tzinfo)
+            fecha = datetime.combine(dia, fechamento, tzinfo=inicio.tzinfo)
+            janela_inicio, janela_fim = max(abre, inicio), min(fecha, fim)
+            if janela_inicio < janela_fim:
+                yield abre, janela_inicio, janela_fim
+            dia += timedelta(days=1)
+
+    @staticmethod
+    def _horarios_da_sala(posicao: int, sala: Sala, expediente: list, ocupados,
+                          duracao: timedelta, passo: timedelta):
+        """
+        Varre reservas ordenadas e gera os horários livres de uma sala.
+
+        Gera tuplas (inicio, posicao, sala, fim); `posicao` desempata salas
+        no heapq.merge sem comparar objetos Sala.
+        """
+        ocupados = iter(ocupados)
+        atual = next(ocupados, None)
+
+        for abre, janela_inicio, janela_fim in expediente:
+            cursor = janela_inicio
+            while cursor < janela_fim:
+                # Descarta reservas que já terminaram
+                while atual is not None and atual[1] <= cursor:
+                    atual = next(ocupados, None)
+
+                # Alinha o início à grade do passo, contada a partir da abertura
+                desvio = (cursor - abre) % passo
+                if desvio:
+                    cursor += passo - desvio
+
+                slot_fim = cursor + duracao
+                if slot_fim > janela_fim:
+                    break
+
+                if atual is not None and atual[0] < slot_fim:
+                    # Conflito: pula para o fim da reserva
+                    cursor = max(cursor, atual[1])
+                    continue
+
+                yield cursor, posicao, sala, slot_fim
+                cursor += passo
@@ -0,0 +1,429 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from backend.DB.conexao import Conexao
+from backend.DB.invalidacao import BarramentoInvalidacao, barramento_invalidacao
+
+
+class IndiceReservasSala:
+    """
+    Índice de intervalos das reservas de uma sala.
+
+    Mantém as reservas ordenadas pelo início e, em paralelo, o maior fim
+    visto até cada posição (prefixo de máximos). Como esse prefixo é
+    não-decrescente, as consultas viram buscas binárias:
+
+    - ocupada_em(t): O(log n)
+    - sobrepoe(a, b): O(log n)
+    - reservas_na_janela(a, b): O(log n + k)
+
+    Inserções e remoções custam O(n) (deslocamento das listas), o que é
+    irrelevante para as dezenas de reservas de uma sala em uma semana.
+    """
+
+    def __init__(self, reservas: list = None):
+        """
+        Inicializa o índice.
+
+        Args:
+            reservas: Lista opcional de (agendamento_id, inicio, fim)
+        """
+        self._lock = threading.Lock()
+        self._entradas: list[tuple[datetime, datetime, str]] = []  # (inicio, fim, id)
+        self._inicios: list[datetime] = []
+        self._max_fim: list[datetime] = []
+        self._por_id: dict[str, tuple[datetime, datetime, str]] = {}
+
+        for agendamento_id, inicio, fim in reservas or []:
+            entrada = (inicio, fim, str(agendamento_id))
+            self._entradas.append(entrada)
+            self._por_id[entrada[2]] = entrada
+        self._entradas.sort()
+        self._inicios = [inicio for inicio, _, _ in self._entradas]
+        self._recalcular_max_fim(0)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _recalcular_max_fim(self, posicao: int) -> None:
+        """Reconstrói o prefixo de máximos a partir de `posicao`."""
+        del self._max_fim[posicao:]
+        maior = self._max_fim[-1] if self._max_fim else None
+        for _, fim, _ in self._entradas[posicao:]:
+            if maior is None or fim > maior:
+                maior = fim
+            self._max_fim.append(maior)
+
+    def adicionar(self, agendamento_id: str, inicio: datetime, fim: datetime) -> None:
+        """
+        Adiciona (ou substitui) uma reserva.
+
+        Args:
+            agendamento_id: ID do agendamento
+            inicio: Data/hora de início
+            fim: Data/hora de término
+
+        Raises:
+            ValueError: Se inicio >= fim
+        """
+        if inicio >= fim:
+            raise ValueError("A data de início deve ser anterior à data de término")
+
+        with self._lock:
+            self._remover_sem_lock(str(agendamento_id))
+            entrada = (inicio, fim, str(agendamento_id))
+            posicao = bisect_left(self._entradas, entrada)
+            self._entradas.insert(posicao, entrada)
+            self._inicios.insert(posicao, inicio)
+            self._por_id[entrada[2]] = entrada
+            self._recalcular_max_fim(posicao)
+
+    def remover(self, agendamento_id: str) -> bool:
+        """
+        Remove uma reserva (cancelamento ou mudança de sala).
+
+        Args:
+            agendamento_id: ID do agendamento
+
+        Returns:
+            True se a reserva existia, False caso contrário
+        """
+        with self._lock:
+            return self._remover_sem_lock(str(agendamento_id))
+
+    def _remover_sem_lock(self, agendamento_id: str) -> bool:
+        entrada = self._por_id.pop(agendamento_id, None)
+        if entrada is None:
+            return False
+
+        posicao = bisect_left(self._entradas, entrada)
+        del self._entradas[posicao]
+        del self._inicios[posicao]
+        self._recalcular_max_fim(posicao)
+        return True
+
+    def ocupada_em(self, dataHora: datetime) -> bool:
+        """
+        Verifica se alguma reserva cobre o instante (inicio <= dataHora <= fim).
+
+        Args:
+            dataHora: Data/hora para verificar
+
+        Returns:
+            True se a sala está ocupada
+        """
+        with self._lock:
+            # Reservas com início <= dataHora ocupam as posições [0, idx)
+            idx = bisect_right(self._inicios, dataHora)
+            return idx > 0 and self._max_fim[idx - 1] >= dataHora
+
+    def sobrepoe(self, inicio: datetime, fim: datetime) -> bool:
+        """
+        Verifica se alguma reserva sobrepõe o período [inicio, fim).
+
+        Args:
+            inicio: Início do período
+            fim: Fim do período (exclusivo)
+
+        Returns:
+            True se houver sobreposição
+        """
+        with self._lock:
+            idx = bisect_left(self._inicios, fim)
+            return idx > 0 and self._max_fim[idx - 1] > inicio
+
+    def reservas_na_janela(self, inicio: datetime, fim: datetime) -> list[tuple[str, datetime, datetime]]:
+        """
+        Lista as reservas que intersectam o período [inicio, fim).
+
+        Args:
+            inicio: Início da janela
+            fim: Fim da janela (exclusivo)
+
+        Returns:
+            Lista de (agendamento_id, inicio, fim) ordenada pelo início
+        """
+        with self._lock:
+            # Candidatas: começam antes do fim da janela
+            ate = bisect_left(self._inicios, fim)
+            # Antes de `desde`, nenhuma reserva termina depois do início da janela
+            desde = bisect_right(self._max_fim, inicio, 0, ate)
+            return [
+                (agendamento_id, r_inicio, r_fim)
+                for r_inicio, r_fim, agendamento_id in self._entradas[desde:ate]
+                if r_fim > inicio
+            ]
+
+
+class IndiceAgenda(Conexao):
+    """
+    Índices de reservas de todas as salas para uma janela de tempo (dia/semana).
+
+    Carregado do banco uma vez e mantido em dia pelo serviço de agendamentos
+    (registrar/cancelar), para que SalaServico e a grade da agenda consultem
+    disponibilidade sem ir ao banco.
+
+    Escritas de outros workers chegam pelo canal "agenda" do barramento de
+    invalidação (chaves = dias ISO). Um dia invalidado deixa de ser coberto
+    pelo índice (as consultas vão ao banco) até ser recarregado, o que
+    acontece na próxima chamada a `cobre`. Invalidação do cache inteiro
+    (reconexão do barramento) recarrega a janela toda.
+
+    Com `janela_dias`, a janela acompanha o relógio: [hoje, hoje + janela_dias).
+    """
+
+    def __init__(self, conn_str=None, barramento: BarramentoInvalidacao = None,
+                 janela_dias: int | None = None, relogio=datetime.now):
+        """
+        Inicializa o índice vazio (nada é coberto até a primeira carga).
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            barramento: Barramento de invalidação (padrão: o do processo)
+            janela_dias: Dias a partir de hoje mantidos em memória; None para
+                usar só a janela passada a `carregar`
+            relogio: Função de tempo (mesmo fuso dos horários da agenda)
+        """
+        super().__init__(conn_str)
+        self._lock = threading.Lock()
+        self._lock_recarga = threading.Lock()
+        self._salas: dict[str, IndiceReservasSala] = {}
+        self._sala_do_agendamento: dict[str, str] = {}
+        self.janela_inicio: datetime | None = None
+        self.janela_fim: datetime | None = None
+        self.janela_dias = janela_dias
+        self._relogio = relogio
+
+        # Invalidações pendentes, marcadas com a geração em que chegaram:
+        # uma recarga só limpa o que chegou antes de ela começar
+        self._geracao = 0
+        self._dias_sujos: dict[str, int] = {}
+        self._tudo_sujo: int | None = None
+
+        # Estatísticas
+        self._recargas_dia = 0
+        self._recargas_janela = 0
+
+        self.barramento = barramento if barramento is not None else barramento_invalidacao
+        self.barramento.registrar("agenda", self.invalidar)
+
+    def invalidar(self, dias: list | None) -> None:
+        """
+        Marca dias para recarga (callback do canal "agenda" do barramento).
+
+        Args:
+            dias: Datas ISO (YYYY-MM-DD) alteradas, ou None para a janela inteira
+        """
+        with self._lock:
+            self._geracao += 1
+            if dias is None:
+                self._tudo_sujo = self._geracao
+            else:
+                for dia in dias:
+                    self._dias_sujos[str(dia)] = self._geracao
+
+    def _limpar_invalidacoes(self, geracao: int, dias=None) -> None:
+        """Descarta as invalidações até `geracao` (dos `dias`, ou todas)."""
+        with self._lock:
+            if dias is None and self._tudo_sujo is not None and self._tudo_sujo <= geracao:
+                self._tudo_sujo = None
+            for dia in list(self._dias_sujos if dias is None else dias):
+                if self._dias_sujos.get(dia, geracao + 1) <= geracao:
+                    del self._dias_sujos[dia]
+
+    def _janela_atual(self) -> tuple[datetime, datetime]:
+        """Janela [hoje, hoje + janela_dias) pelo relógio."""
+        hoje = datetime.combine(self._relogio().date(), time.min)
+        return hoje, hoje + timedelta(days=self.janela_dias)
+
+    def carregar(self, inicio: datetime, fim: datetime) -> int:
+        """
+        Carrega do banco os agendamentos ativos que intersectam [inicio, fim).
+
+        Args:
+            inicio: Início da janela (ex.: 00:00 da segunda-feira)
+            fim: Fim da janela (ex.: 00:00 da segunda seguinte)
+
+        Returns:
+            Número de agendamentos carregados
+        """
+        with self._lock:
+            geracao = self._geracao
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT uuid, fk_sala_uuid, inicio, fim
+                FROM agendamento
+                WHERE status != 'CANCELADO'
+                  AND inicio < %s
+                  AND fim > %s;
+            """, (fim, inicio))
+            rows = cur.fetchall()
+
+        por_sala: dict[str, list] = {}
+        sala_do_agendamento = {}
+        for row in rows:
+            sala_id = str(row["fk_sala_uuid"])
+            por_sala.setdefault(sala_id, []).append((row["uuid"], row["inicio"], row["fim"]))
+            sala_do_agendamento[str(row["uuid"])] = sala_id
+
+        with self._lock:
+            self._salas = {
+                sala_id: IndiceReservasSala(reservas)
+                for sala_id, reservas in por_sala.items()
+            }
+            self._sala_do_agendamento = sala_do_agendamento
+            self.janela_inicio = inicio
+            self.janela_fim = fim
+            self._recargas_janela += 1
+
+        self._limpar_invalidacoes(geracao)
+        return len(rows)
+
+    def _recarregar_dias(self, dias: list[str]) -> None:
+        """Substitui as reservas dos dias informados pelas do banco."""
+        with self._lock:
+            geracao = self._geracao
+
+        periodos = []
+        for dia in dias:
+            inicio = datetime.combine(date.fromisoformat(dia), time.min)
+            periodos.append((inicio, inicio + timedelta(days=1)))
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            linhas = []
+            for inicio, fim in periodos:
+                cur.execute("""
+                    SELECT uuid, fk_sala_uuid, inicio, fim
+                    FROM agendamento
+                    WHERE status != 'CANCELADO'
+                      AND inicio < %s
+                      AND fim > %s;
+                """, (fim, inicio))
+                linhas.extend(cur.fetchall())
+
+        # Os dias continuam marcados (fora do índice) até o fim da troca
+        with self._lock:
+            salas = list(self._salas.values())
+        for inicio, fim in periodos:
+            for indice in salas:
+                for agendamento_id, _, _ in indice.reservas_na_janela(inicio, fim):
+                    self.cancelar(agendamento_id)
+        for row in linhas:
+            self.registrar(row["uuid"], row["fk_sala_uuid"], row["inicio"], row["fim"])
+
+        with self._lock:
+            self._recargas_dia += len(dias)
+        self._limpar_invalidacoes(geracao, dias)
+
+    def _sincronizar(self) -> None:
+        """Aplica as invalidações pendentes (e avança a janela, se houver relógio)."""
+        # Outra thread já está recarregando: quem consulta vai ao banco
+        if not self._lock_recarga.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                janela = (self.janela_inicio, self.janela_fim)
+                tudo = self._tudo_sujo is not None
+                dias = []
+                for dia in list(self._dias_sujos):
+                    if janela[0] is not None and janela[0].date() <= date.fromisoformat(dia) <= janela[1].date():
+                        dias.append(dia)
+                    else:
+                        # Fora da janela: não há nada do dia em memória
+                        del self._dias_sujos[dia]
+
+            if self.janela_dias is not None and janela[0] != self._janela_atual()[0]:
+                self.carregar(*self._janela_atual())
+            elif tudo and janela[0] is not None:
+                self.carregar(*janela)
+            elif dias:
+                self._recarregar_dias(dias)
+        except Exception as e:
+            print(f"Não foi possível atualizar o índice da agenda: {e}")
+        finally:
+            self._lock_recarga.release()
+
+    def cobre(self, inicio: datetime, fim: datetime = None) -> bool:
+        """
+        Indica se o instante (ou período) está na janela carregada e em dia.
+
+        Antes de responder, recarrega o que outros workers invalidaram.
+        """
+        self._sincronizar()
+        fim = fim if fim is not None else inicio
+        with self._lock:
+            if self.janela_inicio is None or self._tudo_sujo is not None:
+                return False
+            if not (self.janela_inicio <= inicio and fim <= self.janela_fim):
+                return False
+            dia = inicio.date()
+            while dia <= fim.date():
+                if dia.isoformat() in self._dias_sujos:
+                    return False
+                dia += timedelta(days=1)
+        return True
+
+    def sala(self, sala_id: str) -> IndiceReservasSala:
+        """
+        Retorna o índice de uma sala (vazio se ela não tiver reservas).
+
+        Args:
+            sala_id: UUID da sala
+        """
+        sala_id = str(sala_id)
+        with self._lock:
+            indice = self._salas.get(sala_id)
+            if indice is None:
+                indice = self._salas[sala_id] = IndiceReservasSala()
+            return indice
+
+    def registrar(self, agendamento_id: str, sala_id: str, inicio: datetime, fim: datetime) -> None:
+        """
+        Registra um agendamento criado ou movido (inclusive de sala).
+
+        Args:
+            agendamento_id: ID do agendamento
+            sala_id: UUID da sala
+            inicio: Data/hora de início
+            fim: Data/hora de término
+        """
+        agendamento_id = str(agendamento_id)
+        self.cancelar(agendamento_id)
+        self.sala(sala_id).adicionar(agendamento_id, inicio, fim)
+        with self._lock:
+            self._sala_do_agendamento[agendamento_id] = str(sala_id)
+
+    def cancelar(self, agendamento_id: str) -> bool:
+        """
+        Remove um agendamento cancelado ou excluído.
+
+        Args:
+            agendamento_id: ID do agendamento
+
+        Returns:
+            True se o agendamento estava no índice
+        """
+        agendamento_id = str(agendamento_id)
+        with self._lock:
+            sala_id = self._sala_do_agendamento.pop(agendamento_id, None)
+            indice = self._salas.get(sala_id) if sala_id else None
+        return indice.remover(agendamento_id) if indice else False
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do índice.
+
+        Returns:
+            Dicionário com a janela, agendamentos em memória, dias pendentes
+            de recarga e contadores de recarga
+        """
+        with self._lock:
+            return {
+                "janela_inicio": self.janela_inicio.isoformat() if self.janela_inicio else None,
+                "janela_fim": self.janela_fim.isoformat() if self.janela_fim else None,
+                "agendamentos": len(self._sala_do_agendamento),
+                "dias_pendentes": len(self._dias_sujos),
+                "recargas_dia": self._recargas_dia,
+                "recargas_janela": self._recargas_janela,
+            }
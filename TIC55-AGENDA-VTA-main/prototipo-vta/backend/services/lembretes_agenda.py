@@ -0,0 +1,429 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from backend.DB.conexao import Conexao
+from backend.enums.perfil_usuario import PerfilUsuario
+from backend.enums.status_Agendamento import statusAgendamento
+
+
+class LembretesAgenda(Conexao):
+    """
+    Dispara notificações "lembrete" antes de cada atendimento.
+
+    Cada agendamento ativo gera um lembrete por antecedência (ex.: 24h e 1h
+    antes do início) para o profissional responsável e para a recepção.
+    Os lembretes ficam em um heap ordenado pelo horário de disparo; a
+    thread acorda no próximo disparo (ou a cada `intervalo`).
+
+    A tabela de agendamentos não é varrida de novo:
+
+        - a janela [agora, agora + horizonte) é carregada uma vez e depois
+          só estendida, de `passo` em `passo`, pela borda
+        - criações, remarcações e cancelamentos (de qualquer worker) chegam
+          pelo feed incremental da agenda (listar_alteracoes desde a versão
+          já vista), lido antes de cada disparo
+
+    Remarcar ou cancelar não mexe no heap: o agendamento guarda o início
+    atual e entradas com outro início são descartadas ao sair do heap (o
+    heap é reconstruído quando as obsoletas passam da metade).
+
+    Todo worker tem o próprio heap; a tabela lembrete_enviado garante que
+    cada lembrete seja enviado por um só deles (quem grava primeiro envia).
+    Se o envio falhar, a linha é apagada e o lembrete volta ao heap.
+    """
+
+    TITULO = "Lembrete de atendimento"
+
+    def __init__(self, agendamento_servico, autenticacao_servico, notificacao_servico,
+                 conn_str=None, antecedencias: list[int] = None,
+                 horizonte: timedelta = timedelta(days=7), passo: timedelta = timedelta(hours=1),
+                 intervalo: float = 30.0, relogio=datetime.now):
+        """
+        Inicializa o motor sem agendamentos (carregados no primeiro `processar`).
+
+        Args:
+            agendamento_servico: AgendamentoServico (janela e feed da agenda)
+            autenticacao_servico: AutenticacaoServico (destinatários)
+            notificacao_servico: NotificacaoServico (envio dos lembretes)
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            antecedencias: Minutos antes do início (padrão: 24h e 1h)
+            horizonte: Até onde, a partir de agora, os agendamentos ficam em memória
+            passo: Quanto a janela precisa avançar para uma nova carga da borda
+            intervalo: Segundos máximos entre leituras do feed
+            relogio: Função de tempo (mesmo fuso dos horários da agenda)
+
+        Raises:
+            ValueError: Se alguma antecedência não for positiva
+        """
+        super().__init__(conn_str)
+        antecedencias = antecedencias if antecedencias is not None else [1440, 60]
+        if not antecedencias or any(m <= 0 for m in antecedencias):
+            raise ValueError("Antecedências devem ser minutos positivos")
+
+        self.agendamentos = agendamento_servico
+        self.autenticacao = autenticacao_servico
+        self.notificacoes = notificacao_servico
+        self.antecedencias = sorted(set(antecedencias), reverse=True)
+        self.horizonte = horizonte
+        self.passo = passo
+        self.intervalo = intervalo
+        self._relogio = relogio
+
+        # (dispara_em, seq, agendamento_id, antecedência, início)
+        self._heap: list[tuple] = []
+        self._seq = itertools.count()
+        # agendamento_id -> dados do agendamento (início atual, nomes)
+        self._agendados: dict[str, dict] = {}
+        self._obsoletas = 0
+        self._versao = None
+        self._carregado_ate: datetime | None = None
+
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+        # Estatísticas
+        self._disparados = 0
+        self._enviados_por_outro = 0
+        self._perdidos = 0
+        self._falhas = 0
+
+    # ------------------------------------------------------------------
+    # Heap
+    # ------------------------------------------------------------------
+
+    def _agendar(self, item: dict, agora: datetime) -> None:
+        """Coloca (ou recoloca, se o início mudou) os lembretes de um agendamento."""
+        inicio = datetime.fromisoformat(item["inicio"])
+        if inicio <= agora:
+            # Já começou: não há o que lembrar
+            self._remover(item["id"])
+            return
+
+        atual = self._agendados.get(item["id"])
+        self._agendados[item["id"]] = {**item, "inicio": inicio}
+        if atual is not None:
+            if atual["inicio"] == inicio:
+                return
+            self._obsoletas += len(self.antecedencias)
+
+        # Dos disparos que já passaram, só o mais recente: um agendamento
+        # marcado para daqui a 30 min recebe o aviso de 1h, não também o de 24h
+        atrasado = None
+        for minutos in self.antecedencias:
+            dispara_em = inicio - timedelta(minutes=minutos)
+            if dispara_em <= agora:
+                atrasado = (dispara_em, minutos)
+            else:
+                heapq.heappush(self._heap, (dispara_em, next(self._seq), item["id"], minutos, inicio))
+        if atrasado is not None:
+            heapq.heappush(self._heap, (atrasado[0], next(self._seq), item["id"], atrasado[1], inicio))
+
+    def _remover(self, agendamento_id: str) -> None:
+        """Esquece um agendamento (as entradas do heap viram obsoletas)."""
+        if self._agendados.pop(agendamento_id, None) is not None:
+            self._obsoletas += len(self.antecedencias)
+
+    def _valida(self, entrada: tuple) -> bool:
+        agendamento = self._agendados.get(entrada[2])
+        return agendamento is not None and agendamento["inicio"] == entrada[4]
+
+    def _compactar(self) -> None:
+        """Reconstrói o heap sem as entradas obsoletas."""
+        if self._obsoletas * 2 <= len(self._heap):
+            return
+        self._heap = [entrada for entrada in self._heap if self._valida(entrada)]
+        heapq.heapify(self._heap)
+        self._obsoletas = 0
+
+    # ------------------------------------------------------------------
+    # Sincronização com a agenda
+    # ------------------------------------------------------------------
+
+    def _carregar_janela(self, agora: datetime) -> None:
+        """Carrega a janela inicial ou estende a borda até agora + horizonte."""
+        ate = agora + self.horizonte
+        if self._carregado_ate is None:
+            # Versão lida antes da janela: o que mudar no meio vem pelo feed
+            self._versao = self.agendamentos.versao_atual()
+            desde = agora
+        elif ate - self._carregado_ate < self.passo:
+            return
+        else:
+            desde = self._carregado_ate
+
+        for item in self.agendamentos.listar_agenda(desde, ate):
+            # A consulta é por sobreposição: quem começou antes da borda já está aqui
+            if datetime.fromisoformat(item["inicio"]) >= desde:
+                self._agendar(item, agora)
+        self._carregado_ate = ate
+
+    def _aplicar_alteracoes(self, agora: datetime) -> None:
+        """Aplica o feed da agenda desde a última versão vista."""
+        alteracoes = self.agendamentos.listar_alteracoes(self._versao)
+        for item in alteracoes["alterados"]:
+            if item["status"] == statusAgendamento.CANCELADO.value:
+                self._remover(item["id"])
+            elif datetime.fromisoformat(item["inicio"]) >= self._carregado_ate:
+                # Foi para depois da janela: entra quando a borda chegar lá
+                self._remover(item["id"])
+            else:
+                self._agendar(item, agora)
+        for agendamento_id in alteracoes["removidos"]:
+            self._remover(agendamento_id)
+        self._versao = alteracoes["versao"]
+
+    def _vencidos(self, agora: datetime) -> tuple[list[tuple], list[str]]:
+        """
+        Retira do heap os lembretes válidos cujo disparo chegou.
+
+        Returns:
+            (entradas a disparar, agendamentos sem mais lembretes no heap)
+        """
+        vencidos = []
+        encerrados = []
+        while self._heap and self._heap[0][0] <= agora:
+            entrada = heapq.heappop(self._heap)
+            if not self._valida(entrada):
+                self._obsoletas = max(self._obsoletas - 1, 0)
+                continue
+            # A menor antecedência é sempre a última entrada do agendamento
+            if entrada[3] == self.antecedencias[-1]:
+                encerrados.append(entrada[2])
+            if entrada[4] <= agora:
+                # O atendimento já começou (ex.: worker parado na hora do disparo)
+                self._perdidos += 1
+                continue
+            vencidos.append(entrada)
+        return vencidos, encerrados
+
+    # ------------------------------------------------------------------
+    # Disparo
+    # ------------------------------------------------------------------
+
+    def _reivindicar(self, vencidos: list[tuple]) -> list[tuple]:
+        """
+        Grava os lembretes em lembrete_enviado; só os gravados aqui são enviados.
+
+        Returns:
+            Entradas que este worker deve enviar
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO lembrete_enviado (fk_agendamento_uuid, antecedencia_min, inicio)
+                SELECT * FROM unnest(%s::uuid[], %s::int[], %s::timestamp[])
+                ON CONFLICT DO NOTHING
+                RETURNING fk_agendamento_uuid, antecedencia_min;
+            """, (
+                [e[2] for e in vencidos],
+                [e[3] for e in vencidos],
+                [e[4] for e in vencidos],
+            ))
+            gravados = {(str(row["fk_agendamento_uuid"]), row["antecedencia_min"]) for row in cur.fetchall()}
+            conn.commit()
+
+        nossos = [e for e in vencidos if (e[2], e[3]) in gravados]
+        self._enviados_por_outro += len(vencidos) - len(nossos)
+        return nossos
+
+    def _mensagem(self, agendamento: dict) -> str:
+        """Texto do lembrete a partir da linha da agenda."""
+        quem = agendamento.get("pet") or "paciente"
+        if agendamento.get("cliente"):
+            quem += f" ({agendamento['cliente']})"
+        mensagem = f"{agendamento.get('tipo') or 'Atendimento'} de {quem} em {agendamento['inicio']:%d/%m às %H:%M}"
+        if agendamento.get("sala"):
+            mensagem += f", {agendamento['sala']}"
+        return mensagem + "."
+
+    def _enviar(self, entradas: list[tuple]) -> list[tuple]:
+        """
+        Envia cada lembrete ao profissional e à recepção.
+
+        Returns:
+            Entradas não enviadas (o envio para na primeira falha, ex.: fila
+            do despacho cheia)
+        """
+        try:
+            usuarios = self.autenticacao.listar_usuarios_ativos()
+        except Exception as e:
+            print(f"Lembretes não enviados: {e}")
+            return entradas
+        recepcao = [u for u in usuarios if u.perfil == PerfilUsuario.RECEPCIONISTA]
+        por_id = {u.usuario_id: u for u in usuarios}
+
+        for i, (_, _, agendamento_id, _, _) in enumerate(entradas):
+            agendamento = self._agendados[agendamento_id]
+            destinatarios = list(recepcao)
+            profissional = por_id.get(agendamento.get("profissional_id"))
+            if profissional is not None and profissional.perfil != PerfilUsuario.RECEPCIONISTA:
+                destinatarios.append(profissional)
+            if not destinatarios:
+                continue
+            try:
+                self.notificacoes.enviar_em_lote(destinatarios, self._mensagem(agendamento), "lembrete", self.TITULO)
+            except Exception as e:
+                print(f"{len(entradas) - i} lembrete(s) não enviado(s): {e}")
+                return entradas[i:]
+            self._disparados += 1
+        return []
+
+    def _devolver(self, entradas: list[tuple], agora: datetime) -> None:
+        """
+        Desfaz a reivindicação de lembretes que não saíram e os recoloca no heap.
+
+        Sem a linha em lembrete_enviado, a próxima tentativa (deste ou de
+        outro worker) pode enviá-los; aqui eles voltam depois de `intervalo`.
+        """
+        try:
+            with self._get_conn() as conn, conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM lembrete_enviado
+                    WHERE (fk_agendamento_uuid, antecedencia_min, inicio) IN (
+                        SELECT * FROM unnest(%s::uuid[], %s::int[], %s::timestamp[])
+                    );
+                """, (
+                    [e[2] for e in entradas],
+                    [e[3] for e in entradas],
+                    [e[4] for e in entradas],
+                ))
+                conn.commit()
+        except Exception as e:
+            # A reivindicação fica: ninguém mais envia esses lembretes
+            self._perdidos += len(entradas)
+            print(f"{len(entradas)} lembrete(s) perdido(s): reivindicação não desfeita: {e}")
+            return
+
+        tentar_em = agora + timedelta(seconds=self.intervalo)
+        for _, _, agendamento_id, minutos, inicio in entradas:
+            heapq.heappush(self._heap, (tentar_em, next(self._seq), agendamento_id, minutos, inicio))
+
+    def processar(self) -> int:
+        """
+        Sincroniza com a agenda e dispara os lembretes vencidos.
+
+        Returns:
+            Número de lembretes enviados por este worker
+        """
+        agora = self._relogio()
+        with self._lock:
+            self._carregar_janela(agora)
+            self._aplicar_alteracoes(agora)
+            vencidos, encerrados = self._vencidos(agora)
+            self._compactar()
+
+            # Mesmo lembrete duas vezes no heap (remarcado e desremarcado)
+            vencidos = list({(e[2], e[3]): e for e in vencidos}.values())
+            try:
+                nossos = self._reivindicar(vencidos) if vencidos else []
+            except Exception:
+                # Banco fora: os lembretes voltam para o heap e saem na próxima volta
+                for entrada in vencidos:
+                    heapq.heappush(self._heap, entrada)
+                raise
+
+            pendentes = self._enviar(nossos) if nossos else []
+            if pendentes:
+                self._falhas += 1
+                self._devolver(pendentes, agora)
+
+            # Quem ainda tem lembrete por enviar continua em memória
+            abertos = {e[2] for e in pendentes}
+            for agendamento_id in encerrados:
+                if agendamento_id not in abertos:
+                    self._agendados.pop(agendamento_id, None)
+            return len(nossos) - len(pendentes)
+
+    def limpar_enviados(self, dias: int = 7, lote: int = 1000) -> int:
+        """
+        Remove de lembrete_enviado os registros de atendimentos já passados.
+
+        Tarefa de manutenção (AgendadorManutencao), em lotes curtos como
+        limpar_tokens_expirados.
+
+        Args:
+            dias: Idade mínima (pelo início do atendimento) dos registros removidos
+            lote: Linhas removidas por transação
+
+        Returns:
+            Número de registros removidos
+        """
+        data_limite = self._relogio() - timedelta(days=dias)
+        total = 0
+        while True:
+            with self._get_conn() as conn, conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM lembrete_enviado
+                    WHERE (fk_agendamento_uuid, antecedencia_min, inicio) IN (
+                        SELECT fk_agendamento_uuid, antecedencia_min, inicio
+                        FROM lembrete_enviado
+                        WHERE inicio < %s
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    );
+                """, (data_limite, lote))
+                removidos = cur.rowcount
+                conn.commit()
+            total += removidos
+            if removidos < lote:
+                return total
+
+    # ------------------------------------------------------------------
+    # Thread
+    # ------------------------------------------------------------------
+
+    def _espera(self) -> float:
+        """Segundos até o próximo disparo, limitados a `intervalo`."""
+        with self._lock:
+            if not self._heap:
+                return self.intervalo
+            falta = (self._heap[0][0] - self._relogio()).total_seconds()
+        return min(max(falta, 0.0), self.intervalo)
+
+    def _executar(self) -> None:
+        """Laço da thread."""
+        while not self._parar.wait(self._espera()):
+            try:
+                self.processar()
+            except Exception as e:
+                # Banco fora: o feed e os vencidos ficam para a próxima volta
+                self._falhas += 1
+                print(f"Lembretes da agenda não processados: {e}")
+
+    def iniciar(self) -> None:
+        """Inicia a thread de lembretes deste worker (idempotente)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="vta-lembretes", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Encerra a thread."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do motor de lembretes.
+
+        Returns:
+            Dicionário com agendamentos em memória, tamanho do heap,
+            obsoletas, versão do feed, fim da janela e contadores de disparo
+        """
+        with self._lock:
+            return {
+                "agendamentos": len(self._agendados),
+                "heap": len(self._heap),
+                "obsoletas": self._obsoletas,
+                "versao": self._versao,
+                "carregado_ate": self._carregado_ate.isoformat() if self._carregado_ate else None,
+                "disparados": self._disparados,
+                "enviados_por_outro_worker": self._enviados_por_outro,
+                "perdidos": self._perdidos,
+                "falhas": self._falhas,
+            }
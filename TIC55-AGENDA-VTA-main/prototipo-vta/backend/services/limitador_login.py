@@ -0,0 +1,247 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class LimiteExcedidoErro(Exception):
+    """
+    Tentativas de login acima do limite (o chamador deve responder 429).
+
+    Attributes:
+        tentar_novamente_em: Segundos até a próxima tentativa ser aceita
+    """
+
+    def __init__(self, mensagem: str, tentar_novamente_em: float):
+        super().__init__(mensagem)
+        self.tentar_novamente_em = tentar_novamente_em
+
+
+class BaldesMemoria:
+    """
+    Baldes de fichas (token bucket) em memória, por processo.
+
+    Baldes que já se encheram de novo são descartados quando o número de
+    chaves passa de `max_chaves`, para um ataque com muitos IPs não crescer
+    a memória sem limite.
+    """
+
+    def __init__(self, max_chaves: int = 10_000):
+        self.max_chaves = max_chaves
+        self._baldes: dict[str, tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, capacidade: int, janela: float, agora: float) -> float:
+        """
+        Tenta consumir uma ficha do balde.
+
+        Args:
+            chave: Identificador do balde (ex.: "ip:10.0.0.1")
+            capacidade: Fichas do balde cheio
+            janela: Segundos para o balde encher de vazio a cheio
+            agora: Instante atual (segundos)
+
+        Returns:
+            0 se a ficha foi consumida; senão, segundos até haver uma ficha
+        """
+        taxa = capacidade / janela
+        with self._lock:
+            fichas, atualizado, _ = self._baldes.get(chave, (capacidade, agora, 0))
+            fichas = min(capacidade, fichas + (agora - atualizado) * taxa)
+
+            if fichas >= 1:
+                fichas -= 1
+                espera = 0.0
+            else:
+                espera = (1 - fichas) / taxa
+
+            # Instante em que o balde estará cheio de novo (pode ser descartado)
+            cheio_em = agora + (capacidade - fichas) / taxa
+            self._baldes[chave] = (fichas, agora, cheio_em)
+
+            if len(self._baldes) > self.max_chaves:
+                self._baldes = {c: b for c, b in self._baldes.items() if b[2] > agora}
+
+            return espera
+
+    def resetar(self, chave: str) -> None:
+        """Enche o balde de novo (ex.: após login bem-sucedido)."""
+        with self._lock:
+            self._baldes.pop(chave, None)
+
+
+class BaldesArquivo:
+    """
+    Baldes de fichas em um arquivo SQLite local, compartilhado pelos workers.
+
+    Cada consumo é uma transação BEGIN IMMEDIATE: workers na mesma máquina
+    enxergam os mesmos baldes sem depender do PostgreSQL.
+    """
+
+    def __init__(self, caminho: str, limpar_a_cada: int = 1_000):
+        self.caminho = caminho
+        self.limpar_a_cada = limpar_a_cada
+        self._lock = threading.Lock()
+        self._consumos = 0
+        self._conn = sqlite3.connect(caminho, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS balde (
+                chave      TEXT PRIMARY KEY,
+                fichas     REAL NOT NULL,
+                atualizado REAL NOT NULL,
+                cheio_em   REAL NOT NULL
+            );
+        """)
+
+    def consumir(self, chave: str, capacidade: int, janela: float, agora: float) -> float:
+        """Mesmo contrato de BaldesMemoria.consumir."""
+        taxa = capacidade / janela
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE;")
+            try:
+                cur.execute("SELECT fichas, atualizado FROM balde WHERE chave = ?;", (chave,))
+                row = cur.fetchone()
+                fichas, atualizado = row if row else (capacidade, agora)
+                fichas = min(capacidade, fichas + (agora - atualizado) * taxa)
+
+                if fichas >= 1:
+                    fichas -= 1
+                    espera = 0.0
+                else:
+                    espera = (1 - fichas) / taxa
+
+                cur.execute("""
+                    INSERT INTO balde (chave, fichas, atualizado, cheio_em)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (chave) DO UPDATE
+                        SET fichas = excluded.fichas,
+                            atualizado = excluded.atualizado,
+                            cheio_em = excluded.cheio_em;
+                """, (chave, fichas, agora, agora + (capacidade - fichas) / taxa))
+
+                self._consumos += 1
+                if self._consumos % self.limpar_a_cada == 0:
+                    cur.execute("DELETE FROM balde WHERE cheio_em <= ?;", (agora,))
+
+                cur.execute("COMMIT;")
+            except Exception:
+                cur.execute("ROLLBACK;")
+                raise
+
+            return espera
+
+    def resetar(self, chave: str) -> None:
+        """Enche o balde de novo (ex.: após login bem-sucedido)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM balde WHERE chave = ?;", (chave,))
+
+
+class LimitadorLogin:
+    """
+    Limita tentativas de login por IP e por email antes de qualquer hash.
+
+    Cada tentativa consome uma ficha do balde do IP e uma do balde do email.
+    O IP é verificado primeiro: um IP bloqueado não gasta as fichas do email.
+    Isso não impede que um ataque tranque a conta da vítima: o limite por IP
+    é maior que o por email, então um único IP ainda esgota as fichas do
+    email, e a vítima espera a janela do email repor. Login bem-sucedido
+    devolve as fichas do email.
+
+    O IP precisa ser o do cliente: atrás de um proxy reverso, configure
+    PROXY_CONFIAVEIS (app.py) ou todos dividem o balde do proxy.
+
+    Os limites são "capacidade/janela": 10/300 permite 10 tentativas
+    seguidas e repõe 10 fichas a cada 300 segundos.
+    """
+
+    def __init__(self, baldes=None, limite_ip: str = "30/60", limite_email: str = "10/300",
+                 relogio=time.time):
+        """
+        Inicializa o limitador.
+
+        Args:
+            baldes: BaldesMemoria (padrão) ou BaldesArquivo (compartilhado)
+            limite_ip: "capacidade/janela" por IP
+            limite_email: "capacidade/janela" por email
+            relogio: Função de tempo (substituível nos testes)
+        """
+        self.baldes = baldes if baldes is not None else BaldesMemoria()
+        self.limite_ip = self._ler_limite(limite_ip)
+        self.limite_email = self._ler_limite(limite_email)
+        self._relogio = relogio
+        self._lock = threading.Lock()
+
+        # Estatísticas
+        self._permitidas = 0
+        self._bloqueadas_ip = 0
+        self._bloqueadas_email = 0
+
+    @staticmethod
+    def _ler_limite(limite: str) -> tuple[int, float]:
+        """Converte "capacidade/janela" em (capacidade, janela)."""
+        capacidade, janela = limite.split("/")
+        capacidade, janela = int(capacidade), float(janela)
+        if capacidade < 1 or janela <= 0:
+            raise ValueError(f"Limite inválido: {limite}")
+        return capacidade, janela
+
+    @staticmethod
+    def _chave_email(email: str) -> str:
+        return f"email:{email.strip().lower()}"
+
+    def verificar(self, ip: str | None, email: str) -> None:
+        """
+        Registra uma tentativa de login.
+
+        Args:
+            ip: Endereço do cliente (None quando não houver requisição)
+            email: Email informado
+
+        Raises:
+            LimiteExcedidoErro: Se o IP ou o email passou do limite
+        """
+        agora = self._relogio()
+
+        if ip:
+            espera = self.baldes.consumir(f"ip:{ip}", *self.limite_ip, agora)
+            if espera:
+                with self._lock:
+                    self._bloqueadas_ip += 1
+                raise LimiteExcedidoErro("Muitas tentativas de login deste endereço.", espera)
+
+        espera = self.baldes.consumir(self._chave_email(email), *self.limite_email, agora)
+        if espera:
+            with self._lock:
+                self._bloqueadas_email += 1
+            raise LimiteExcedidoErro("Muitas tentativas de login para este email.", espera)
+
+        with self._lock:
+            self._permitidas += 1
+
+    def registrar_sucesso(self, email: str) -> None:
+        """Devolve as fichas do email após login bem-sucedido."""
+        self.baldes.resetar(self._chave_email(email))
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna contadores do limitador.
+
+        Returns:
+            Dicionário com permitidas, bloqueadas_ip e bloqueadas_email
+        """
+        with self._lock:
+            return {
+                "permitidas": self._permitidas,
+                "bloqueadas_ip": self._bloqueadas_ip,
+                "bloqueadas_email": self._bloqueadas_email,
+            }
+
+
+# Limitador do processo. Com LOGIN_LIMITE_ARQUIVO os workers da máquina
+# dividem os mesmos baldes.
+limitador_login = LimitadorLogin(
+    baldes=BaldesArquivo(os.environ["LOGIN_LIMITE_ARQUIVO"]) if os.getenv("LOGIN_LIMITE_ARQUIVO") else None,
+    limite_ip=os.getenv("LOGIN_LIMITE_IP", "30/60"),
+    limite_email=os.getenv("LOGIN_LIMITE_EMAIL", "10/300"),
+)
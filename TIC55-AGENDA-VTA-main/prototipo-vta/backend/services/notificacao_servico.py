@@ -1,8 +1,10 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 from typing import List, Optional
 from backend.models.notificacao import Notificacao
 from backend.models.usuario import Usuario
+from backend.services.eventos_servico import CanalEventos, canal_eventos
+from backend.services.notificacoes_memoria import RepositorioNotificacoesMemoria
 
 
 class NotificacaoServico:
@@ -16,16 +18,21 @@ class NotificacaoServico:
         - Interagir com a camada de persistência
     """
     
-    def __init__(self, repositorio=None):
+    def __init__(self, repositorio=None, canal: CanalEventos = None, despacho=None):
         """
         Inicializa o serviço de notificações.
         
         Args:
-            repositorio: Repositório para persistência (opcional, para testes pode ser None)
+            repositorio: Repositório para persistência (padrão: em memória,
+                indexado por usuário)
+            canal: Canal de eventos ao vivo (padrão: canal do processo)
+            despacho: DespachoNotificacoes (opcional). Com ele, `enviar` e
+                `enviar_em_lote` só enfileiram: gravação e publicação ficam
+                para a thread do despacho. Sem ele, tudo acontece na chamada.
         """
-        self.repositorio = repositorio
-        # Cache em memória para quando não houver repositório
-        self._notificacoes_cache: List[Notificacao] = []
+        self.repositorio = repositorio if repositorio is not None else RepositorioNotificacoesMemoria()
+        self.canal = canal if canal is not None else canal_eventos
+        self.despacho = despacho
     
     def enviar(self, usuario: Usuario, mensagem: str, tipo: str = "info", titulo: str = "Notificação") -> Notificacao:
         """
@@ -43,6 +50,7 @@ class NotificacaoServico:
         Raises:
             ValueError: Se usuário for None ou inválido
             ValueError: Se mensagem for vazia
+            FilaDespachoCheiaErro: Se houver despacho e a fila estiver cheia
             
         Example:
             >>> servico = NotificacaoServico()
@@ -63,20 +71,24 @@ class NotificacaoServico:
         
         # Cria a notificação
         notificacao = Notificacao(
-            usuarioId=usuario.uuid,
+            usuario_id=usuario.usuario_id,
             tipo=tipo,
             titulo=titulo,
             mensagem=mensagem,
-            criadaEm=datetime.now(timezone.utc),
+            criada_em=datetime.now(timezone.utc),
             lida=False
         )
         
+        # Em segundo plano: o despacho grava e publica depois
+        if self.despacho is not None:
+            self.despacho.enfileirar([notificacao])
+            return notificacao
+        
         # Persiste a notificação
-        if self.repositorio:
-            self.repositorio.salvar(notificacao)
-        else:
-            # Fallback para cache em memória (útil para testes)
-            self._notificacoes_cache.append(notificacao)
+        self.repositorio.salvar(notificacao)
+        
+        # Empurra para as abas abertas do destinatário
+        self.canal.publicar("notificacao", notificacao.to_dict(), usuario_id=notificacao.usuario_id)
         
         return notificacao
     
@@ -106,19 +118,12 @@ class NotificacaoServico:
             raise ValueError("usuario deve ser uma instância de Usuario")
         
         # Busca notificações
-        if self.repositorio:
-            notificacoes = self.repositorio.buscar_por_usuario(usuario.uuid, lida=False)
-        else:
-            # Fallback para cache em memória
-            notificacoes = [
-                n for n in self._notificacoes_cache 
-                if n.usuarioId == usuario.uuid and not n.lida
-            ]
+        notificacoes = self.repositorio.buscar_por_usuario(usuario.usuario_id, lida=False)
         
         # Ordena por data (mais recentes primeiro)
         notificacoes_ordenadas = sorted(
             notificacoes, 
-            key=lambda n: n.criadaEm, 
+            key=lambda n: n.criada_em, 
             reverse=True
         )
         
@@ -145,19 +150,12 @@ class NotificacaoServico:
             raise ValueError("usuario deve ser uma instância de Usuario")
         
         # Busca notificações
-        if self.repositorio:
-            notificacoes = self.repositorio.buscar_por_usuario(usuario.uuid)
-        else:
-            # Fallback para cache em memória
-            notificacoes = [
-                n for n in self._notificacoes_cache 
-                if n.usuarioId == usuario.uuid
-            ]
+        notificacoes = self.repositorio.buscar_por_usuario(usuario.usuario_id)
         
         # Ordena e limita
         notificacoes_ordenadas = sorted(
             notificacoes, 
-            key=lambda n: n.criadaEm, 
+            key=lambda n: n.criada_em, 
             reverse=True
         )
         
@@ -174,20 +172,13 @@ class NotificacaoServico:
             True se marcada com sucesso, False se não encontrada
             
         Example:
-            >>> servico.marcarComoLida(notificacao.id)
+            >>> servico.marcarComoLida(notificacao.notificacao_id)
         """
-        if self.repositorio:
-            notificacao = self.repositorio.buscar_por_id(str(notificacao_id))
-            if notificacao:
-                notificacao.marcarComoLida()
-                self.repositorio.atualizar(notificacao)
-                return True
-        else:
-            # Fallback para cache em memória
-            for notif in self._notificacoes_cache:
-                if notif.id == str(notificacao_id):
-                    notif.marcarComoLida()
-                    return True
+        notificacao = self.repositorio.buscar_por_id(str(notificacao_id))
+        if notificacao:
+            notificacao.marcar_como_lida()
+            self.repositorio.atualizar(notificacao)
+            return True
         
         return False
     
@@ -210,14 +201,8 @@ class NotificacaoServico:
         if not isinstance(usuario, Usuario):
             raise ValueError("usuario deve ser uma instância de Usuario")
         
-        nao_lidas = self.listarNaoLidas(usuario)
-        
-        for notificacao in nao_lidas:
-            notificacao.marcarComoLida()
-            if self.repositorio:
-                self.repositorio.atualizar(notificacao)
-        
-        return len(nao_lidas)
+        # Um único comando no repositório, em vez de um atualizar por notificação
+        return self.repositorio.marcar_todas_como_lidas(usuario.usuario_id)
     
     def excluir(self, notificacao_id: UUID | str) -> bool:
         """
@@ -229,16 +214,7 @@ class NotificacaoServico:
         Returns:
             True se excluída com sucesso, False se não encontrada
         """
-        if self.repositorio:
-            return self.repositorio.excluir(str(notificacao_id))
-        else:
-            # Fallback para cache em memória
-            for i, notif in enumerate(self._notificacoes_cache):
-                if notif.id == str(notificacao_id):
-                    self._notificacoes_cache.pop(i)
-                    return True
-        
-        return False
+        return self.repositorio.excluir(str(notificacao_id))
     
     def excluirAntigas(self, usuario: Usuario, dias: int = 30) -> int:
         """
@@ -260,20 +236,38 @@ class NotificacaoServico:
         if not isinstance(usuario, Usuario):
             raise ValueError("usuario deve ser uma instância de Usuario")
         
-        todas = self.listarTodas(usuario, limite=1000)
-        agora = datetime.now(timezone.utc)
-        contador = 0
-        
-        for notificacao in todas:
-            # Só exclui notificações lidas
-            if notificacao.lida:
-                idade_em_dias = (agora - notificacao.criadaEm).days
-                if idade_em_dias > dias:
-                    if self.excluir(notificacao.id):
-                        contador += 1
-        
-        return contador
-    
+        # Idade em dias completos maior que `dias`
+        data_limite = datetime.now(timezone.utc) - timedelta(days=dias + 1)
+        return self._excluir_lidas_em_lotes(data_limite, 1000, usuario.usuario_id)
+
+    def aplicar_retencao(self, dias: int = 30, lote: int = 1000) -> int:
+        """
+        Exclui as notificações lidas mais antigas que `dias`, de todos os usuários.
+
+        Tarefa de manutenção (AgendadorManutencao): em vez de um excluirAntigas
+        por usuário, remove em lotes de até `lote` com
+        `repositorio.excluir_lidas_antes(data_limite, limite)`, que retorna
+        quantas removeu.
+
+        Args:
+            dias: Idade mínima (em dias) das notificações lidas removidas
+            lote: Notificações removidas por chamada ao repositório
+
+        Returns:
+            Número de notificações excluídas
+        """
+        data_limite = datetime.now(timezone.utc) - timedelta(days=dias)
+        return self._excluir_lidas_em_lotes(data_limite, lote)
+
+    def _excluir_lidas_em_lotes(self, data_limite: datetime, lote: int, usuario_id: str | None = None) -> int:
+        """Chama repositorio.excluir_lidas_antes até um lote vir incompleto."""
+        total = 0
+        while True:
+            removidas = self.repositorio.excluir_lidas_antes(data_limite, lote, usuario_id=usuario_id)
+            total += removidas
+            if removidas < lote:
+                return total
+
     def contar_nao_lidas(self, usuario: Usuario) -> int:
         """
         Conta o número de notificações não lidas de um usuário.
@@ -293,7 +287,30 @@ class NotificacaoServico:
         if not isinstance(usuario, Usuario):
             raise ValueError("usuario deve ser uma instância de Usuario")
         
-        return len(self.listarNaoLidas(usuario))
+        # Contador do repositório em vez de listar e ordenar
+        return self.repositorio.contar_nao_lidas(usuario.usuario_id)
+    
+    def contador(self, usuario_id: UUID | str) -> dict:
+        """
+        Contador de não lidas para o sino da barra de navegação.
+        
+        Recebe só o id (o retrato da sessão basta) e lê o contador mantido
+        pelo repositório, sem listar notificações.
+        
+        Args:
+            usuario_id: UUID do usuário
+            
+        Returns:
+            Dicionário com nao_lidas e versao (muda sempre que nao_lidas muda;
+            usada como ETag)
+            
+        Raises:
+            ValueError: Se usuario_id for vazio
+        """
+        if not usuario_id:
+            raise ValueError("usuario_id não pode ser vazio")
+        
+        return self.repositorio.contador(str(usuario_id))
     
     def enviar_em_lote(self, usuarios: List[Usuario], mensagem: str, tipo: str = "info", titulo: str = "Notificação") -> List[Notificacao]:
         """
@@ -310,6 +327,7 @@ class NotificacaoServico:
             
         Raises:
             ValueError: Se lista de usuários for vazia
+            FilaDespachoCheiaErro: Se houver despacho e a fila estiver cheia
             
         Example:
             >>> usuarios_ativos = [u1, u2, u3]
@@ -318,15 +336,36 @@ class NotificacaoServico:
         if not usuarios:
             raise ValueError("Lista de usuários não pode ser vazia")
         
+        agora = datetime.now(timezone.utc)
         notificacoes = []
         for usuario in usuarios:
             try:
-                notif = self.enviar(usuario, mensagem, tipo, titulo)
-                notificacoes.append(notif)
+                if not isinstance(usuario, Usuario) or not usuario.is_ativo():
+                    raise ValueError("Usuário inválido ou inativo")
+                notificacoes.append(Notificacao(
+                    usuario_id=usuario.usuario_id,
+                    tipo=tipo,
+                    titulo=titulo,
+                    mensagem=mensagem,
+                    criada_em=agora,
+                    lida=False
+                ))
             except ValueError:
                 # Ignora usuários inválidos ou inativos
                 continue
         
+        # Em segundo plano: um único item na fila, gravado em lote pelo despacho
+        if self.despacho is not None:
+            self.despacho.enfileirar(notificacoes)
+            return notificacoes
+        
+        # Persiste o envio inteiro de uma vez (um INSERT no PostgreSQL)
+        self.repositorio.salvar_em_lote(notificacoes)
+        
+        self.canal.publicar_lote("notificacao", [
+            (notificacao.to_dict(), notificacao.usuario_id, None) for notificacao in notificacoes
+        ])
+        
         return notificacoes
     
     def buscar_por_tipo(self, usuario: Usuario, tipo: str) -> List[Notificacao]:
@@ -0,0 +1,216 @@
+import threading
+from datetime import datetime
+from backend.models.notificacao import Notificacao
+
+
+class _CaixaUsuario:
+    """Notificações de um usuário, em dicionários que preservam a ordem de inserção."""
+
+    __slots__ = ("todas", "nao_lidas", "lidas", "versao")
+
+    def __init__(self):
+        self.todas: dict[str, Notificacao] = {}      # ordem de criação
+        self.nao_lidas: dict[str, Notificacao] = {}  # ordem de criação
+        self.lidas: dict[str, Notificacao] = {}      # ordem em que foram lidas
+        self.versao = 0                              # muda com o contador de não lidas
+
+
+class RepositorioNotificacoesMemoria:
+    """
+    Repositório de notificações em memória, indexado por id e por usuário.
+
+    Usado pelo NotificacaoServico quando não há repositório persistente.
+    Cada usuário tem a própria caixa: listar, contar não lidas, marcar como
+    lida e excluir custam O(1) ou O(k) nas notificações daquele usuário, não
+    no total do processo.
+
+    Cada caixa guarda no máximo `max_por_usuario` notificações; ao passar do
+    limite saem primeiro as lidas há mais tempo e, só se todas estiverem não
+    lidas, a mais antiga.
+
+    O estado de leitura é lido do objeto em `salvar` e `atualizar`: quem
+    altera `lida` deve chamar `atualizar` em seguida (como o serviço faz).
+    """
+
+    def __init__(self, max_por_usuario: int = 200):
+        """
+        Inicializa o repositório vazio.
+
+        Args:
+            max_por_usuario: Notificações guardadas por usuário
+        """
+        self.max_por_usuario = max_por_usuario
+        self._caixas: dict[str, _CaixaUsuario] = {}
+        self._por_id: dict[str, Notificacao] = {}
+        self._lock = threading.Lock()
+
+        # Estatísticas
+        self._descartadas = 0
+
+    def _remover(self, caixa: _CaixaUsuario, notificacao_id: str) -> None:
+        caixa.todas.pop(notificacao_id, None)
+        caixa.nao_lidas.pop(notificacao_id, None)
+        caixa.lidas.pop(notificacao_id, None)
+        self._por_id.pop(notificacao_id, None)
+
+    def salvar(self, notificacao: Notificacao) -> None:
+        """Guarda uma notificação nova, descartando excedentes da caixa."""
+        with self._lock:
+            caixa = self._caixas.setdefault(notificacao.usuario_id, _CaixaUsuario())
+            caixa.todas[notificacao.notificacao_id] = notificacao
+            if notificacao.lida:
+                caixa.lidas[notificacao.notificacao_id] = notificacao
+            else:
+                caixa.nao_lidas[notificacao.notificacao_id] = notificacao
+            self._por_id[notificacao.notificacao_id] = notificacao
+            caixa.versao += 1
+
+            while len(caixa.todas) > self.max_por_usuario:
+                fila = caixa.lidas if caixa.lidas else caixa.todas
+                self._remover(caixa, next(iter(fila)))
+                self._descartadas += 1
+
+    def salvar_em_lote(self, notificacoes: list[Notificacao]) -> int:
+        """Guarda várias notificações novas; retorna quantas."""
+        for notificacao in notificacoes:
+            self.salvar(notificacao)
+        return len(notificacoes)
+
+    def buscar_por_id(self, notificacao_id: str) -> Notificacao | None:
+        """Busca uma notificação pelo id (O(1))."""
+        return self._por_id.get(str(notificacao_id))
+
+    def buscar_por_usuario(self, usuario_id: str, lida: bool | None = None) -> list[Notificacao]:
+        """
+        Lista as notificações de um usuário, mais recentes primeiro.
+
+        Args:
+            usuario_id: UUID do usuário
+            lida: False só não lidas, True só lidas, None todas
+        """
+        with self._lock:
+            caixa = self._caixas.get(str(usuario_id))
+            if caixa is None:
+                return []
+            if lida is False:
+                itens = caixa.nao_lidas.values()
+            elif lida is True:
+                itens = [n for n in caixa.todas.values() if n.notificacao_id in caixa.lidas]
+            else:
+                itens = caixa.todas.values()
+            return list(reversed(list(itens)))
+
+    def contar_nao_lidas(self, usuario_id: str) -> int:
+        """Número de não lidas do usuário (O(1))."""
+        caixa = self._caixas.get(str(usuario_id))
+        return len(caixa.nao_lidas) if caixa is not None else 0
+
+    def contador(self, usuario_id: str) -> dict:
+        """
+        Lê o contador de não lidas do usuário (O(1)).
+
+        Returns:
+            Dicionário com nao_lidas e versao (muda a cada alteração do contador)
+        """
+        with self._lock:
+            caixa = self._caixas.get(str(usuario_id))
+            if caixa is None:
+                return {"nao_lidas": 0, "versao": 0}
+            return {"nao_lidas": len(caixa.nao_lidas), "versao": caixa.versao}
+
+    def atualizar(self, notificacao: Notificacao) -> bool:
+        """
+        Reflete a mudança de `lida` nos índices do usuário (O(1)).
+
+        Returns:
+            True se a notificação existe no repositório
+        """
+        with self._lock:
+            caixa = self._caixas.get(notificacao.usuario_id)
+            if caixa is None or notificacao.notificacao_id not in caixa.todas:
+                return False
+
+            if notificacao.lida and caixa.nao_lidas.pop(notificacao.notificacao_id, None) is not None:
+                caixa.lidas[notificacao.notificacao_id] = notificacao
+                caixa.versao += 1
+            elif not notificacao.lida and caixa.lidas.pop(notificacao.notificacao_id, None) is not None:
+                # Volta para a posição de criação entre as não lidas (O(k), raro)
+                caixa.nao_lidas = {
+                    i: n for i, n in caixa.todas.items()
+                    if i in caixa.nao_lidas or i == notificacao.notificacao_id
+                }
+                caixa.versao += 1
+            return True
+
+    def marcar_todas_como_lidas(self, usuario_id: str) -> int:
+        """
+        Marca todas as não lidas do usuário.
+
+        Returns:
+            Número de notificações marcadas
+        """
+        with self._lock:
+            caixa = self._caixas.get(str(usuario_id))
+            if caixa is None:
+                return 0
+            marcadas = caixa.nao_lidas
+            caixa.nao_lidas = {}
+            for notificacao_id, notificacao in marcadas.items():
+                notificacao.marcar_como_lida()
+                caixa.lidas[notificacao_id] = notificacao
+            if marcadas:
+                caixa.versao += 1
+            return len(marcadas)
+
+    def excluir(self, notificacao_id: str) -> bool:
+        """Exclui uma notificação (O(1))."""
+        with self._lock:
+            notificacao = self._por_id.get(str(notificacao_id))
+            if notificacao is None:
+                return False
+            caixa = self._caixas[notificacao.usuario_id]
+            if notificacao.notificacao_id in caixa.nao_lidas:
+                caixa.versao += 1
+            self._remover(caixa, notificacao.notificacao_id)
+            return True
+
+    def excluir_lidas_antes(self, data_limite: datetime, limite: int, usuario_id: str | None = None) -> int:
+        """
+        Exclui até `limite` notificações lidas criadas antes de `data_limite`.
+
+        Args:
+            data_limite: Notificações criadas antes deste instante
+            limite: Máximo de notificações removidas nesta chamada
+            usuario_id: Restringe a um usuário (None para todos)
+
+        Returns:
+            Quantas foram excluídas
+        """
+        with self._lock:
+            if usuario_id is None:
+                caixas = list(self._caixas.values())
+            else:
+                caixas = [self._caixas[str(usuario_id)]] if str(usuario_id) in self._caixas else []
+            removidas = 0
+            for caixa in caixas:
+                for notificacao in [n for n in caixa.lidas.values() if n.criada_em < data_limite]:
+                    if removidas >= limite:
+                        return removidas
+                    self._remover(caixa, notificacao.notificacao_id)
+                    removidas += 1
+            return removidas
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do repositório.
+
+        Returns:
+            Dicionário com usuarios, notificacoes, nao_lidas e descartadas
+        """
+        with self._lock:
+            return {
+                "usuarios": len(self._caixas),
+                "notificacoes": len(self._por_id),
+                "nao_lidas": sum(len(c.nao_lidas) for c in self._caixas.values()),
+                "descartadas": self._descartadas,
+            }
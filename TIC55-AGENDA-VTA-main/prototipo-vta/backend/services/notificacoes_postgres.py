@@ -0,0 +1,215 @@
+import threading
+from datetime import datetime
+from backend.DB.conexao import Conexao
+from backend.models.notificacao import Notificacao
+
+
+class RepositorioNotificacoesPostgres(Conexao):
+    """
+    Repositório de notificações na tabela `notificacao` (migração 009).
+
+    Mesma interface do RepositorioNotificacoesMemoria. Operações sobre
+    muitas linhas são um único comando por chamada:
+
+        - salvar_em_lote: um INSERT com unnest de arrays para todo o envio
+        - marcar_todas_como_lidas: um UPDATE por usuário
+        - excluir_lidas_antes: um DELETE por lote
+
+    "Não lidas do usuário, mais recentes primeiro" sai do índice parcial
+    idx_notificacao_usuario_nao_lidas; o número de não lidas vem de
+    notificacao_contador (migração 010), mantido por triggers.
+    """
+
+    COLUNAS = "uuid, fk_usuario_uuid, tipo, titulo, mensagem, criada_em, lida"
+
+    def __init__(self, conn_str=None):
+        """
+        Inicializa o repositório.
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+        """
+        super().__init__(conn_str)
+        self._lock = threading.Lock()
+
+        # Estatísticas
+        self._lotes = 0
+        self._inseridas = 0
+
+    @staticmethod
+    def _de_linha(row: dict) -> Notificacao:
+        return Notificacao(
+            usuario_id=row["fk_usuario_uuid"],
+            tipo=row["tipo"],
+            titulo=row["titulo"],
+            mensagem=row["mensagem"],
+            notificacao_id=row["uuid"],
+            criada_em=row["criada_em"],
+            lida=row["lida"],
+        )
+
+    def salvar(self, notificacao: Notificacao) -> None:
+        """Grava uma notificação nova."""
+        self.salvar_em_lote([notificacao])
+
+    def salvar_em_lote(self, notificacoes: list[Notificacao]) -> int:
+        """
+        Grava várias notificações em um único INSERT.
+
+        Args:
+            notificacoes: Notificações novas (ex.: um envio para vários usuários)
+
+        Returns:
+            Número de notificações gravadas
+        """
+        if not notificacoes:
+            return 0
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO notificacao ({self.COLUNAS})
+                SELECT * FROM unnest(
+                    %s::uuid[], %s::uuid[], %s::text[], %s::text[],
+                    %s::text[], %s::timestamptz[], %s::boolean[]
+                );
+            """, (
+                [n.notificacao_id for n in notificacoes],
+                [n.usuario_id for n in notificacoes],
+                [n.tipo for n in notificacoes],
+                [n.titulo for n in notificacoes],
+                [n.mensagem for n in notificacoes],
+                [n.criada_em for n in notificacoes],
+                [n.lida for n in notificacoes],
+            ))
+            conn.commit()
+
+        with self._lock:
+            self._lotes += 1
+            self._inseridas += len(notificacoes)
+        return len(notificacoes)
+
+    def buscar_por_id(self, notificacao_id: str) -> Notificacao | None:
+        """Busca uma notificação pelo UUID."""
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {self.COLUNAS} FROM notificacao WHERE uuid = %s;",
+                (str(notificacao_id),)
+            )
+            row = cur.fetchone()
+        return self._de_linha(row) if row else None
+
+    def buscar_por_usuario(self, usuario_id: str, lida: bool | None = None) -> list[Notificacao]:
+        """
+        Lista as notificações de um usuário, mais recentes primeiro.
+
+        Args:
+            usuario_id: UUID do usuário
+            lida: False só não lidas, True só lidas, None todas
+        """
+        filtro = "" if lida is None else ("AND lida" if lida else "AND NOT lida")
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {self.COLUNAS} FROM notificacao
+                WHERE fk_usuario_uuid = %s {filtro}
+                ORDER BY criada_em DESC;
+            """, (str(usuario_id),))
+            rows = cur.fetchall()
+        return [self._de_linha(row) for row in rows]
+
+    def contar_nao_lidas(self, usuario_id: str) -> int:
+        """Número de não lidas do usuário (uma linha de notificacao_contador)."""
+        return self.contador(usuario_id)["nao_lidas"]
+
+    def contador(self, usuario_id: str) -> dict:
+        """
+        Lê o contador de não lidas do usuário, sem tocar em notificacao.
+
+        Returns:
+            Dicionário com nao_lidas e versao (muda a cada alteração do contador)
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT nao_lidas, versao FROM notificacao_contador
+                WHERE fk_usuario_uuid = %s;
+            """, (str(usuario_id),))
+            row = cur.fetchone()
+        if row is None:
+            return {"nao_lidas": 0, "versao": 0}
+        return {"nao_lidas": row["nao_lidas"], "versao": row["versao"]}
+
+    def atualizar(self, notificacao: Notificacao) -> bool:
+        """
+        Grava o estado de leitura da notificação.
+
+        Returns:
+            True se a notificação existe no banco
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE notificacao SET lida = %s WHERE uuid = %s;",
+                (notificacao.lida, notificacao.notificacao_id)
+            )
+            conn.commit()
+            return cur.rowcount > 0
+
+    def marcar_todas_como_lidas(self, usuario_id: str) -> int:
+        """
+        Marca todas as não lidas do usuário em um único UPDATE.
+
+        Returns:
+            Número de notificações marcadas
+        """
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE notificacao SET lida = TRUE
+                WHERE fk_usuario_uuid = %s AND NOT lida;
+            """, (str(usuario_id),))
+            conn.commit()
+            return cur.rowcount
+
+    def excluir(self, notificacao_id: str) -> bool:
+        """Exclui uma notificação."""
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM notificacao WHERE uuid = %s;", (str(notificacao_id),))
+            conn.commit()
+            return cur.rowcount > 0
+
+    def excluir_lidas_antes(self, data_limite: datetime, limite: int, usuario_id: str | None = None) -> int:
+        """
+        Exclui até `limite` notificações lidas criadas antes de `data_limite`.
+
+        Cada chamada é um DELETE curto; SKIP LOCKED deixa dois workers
+        apagarem lotes diferentes ao mesmo tempo.
+
+        Args:
+            data_limite: Notificações criadas antes deste instante
+            limite: Máximo de linhas removidas nesta chamada
+            usuario_id: Restringe a um usuário (None para todos)
+
+        Returns:
+            Quantas foram excluídas
+        """
+        filtro = "" if usuario_id is None else "AND fk_usuario_uuid = %s"
+        params = (data_limite,) + (() if usuario_id is None else (str(usuario_id),)) + (limite,)
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                DELETE FROM notificacao
+                WHERE uuid IN (
+                    SELECT uuid FROM notificacao
+                    WHERE lida AND criada_em < %s {filtro}
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                );
+            """, params)
+            conn.commit()
+            return cur.rowcount
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas de gravação deste worker.
+
+        Returns:
+            Dicionário com lotes (INSERTs) e inseridas (linhas)
+        """
+        with self._lock:
+            return {"lotes": self._lotes, "inseridas": self._inseridas}
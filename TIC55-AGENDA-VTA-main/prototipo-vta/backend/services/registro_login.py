@@ -0,0 +1,150 @@
+import os
+import threading
+from datetime import datetime, timezone
+from backend.DB.conexao import Conexao
+
+
+class RegistroLogin(Conexao):
+    """
+    Grava usuario.ultimo_login em lote, fora do caminho do login (write-behind).
+
+    O login só anota o instante em memória; uma thread do worker descarrega
+    as anotações a cada `intervalo` segundos em um único UPDATE (ou antes,
+    se passar de `max_pendentes`). No encerramento, `parar` descarrega o que
+    sobrou. Se o banco falhar, as anotações voltam para a memória e vão no
+    próximo lote.
+
+    O preço: ultimo_login pode ficar até `intervalo` segundos atrasado, e um
+    worker morto sem encerramento limpo (kill -9) perde o último lote.
+    """
+
+    def __init__(self, conn_str=None, intervalo: float = 30.0, max_pendentes: int = 1_000):
+        """
+        Inicializa o registro com o buffer vazio (a thread sobe em `iniciar`).
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            intervalo: Segundos entre descargas
+            max_pendentes: Usuários no buffer que antecipam a descarga
+        """
+        super().__init__(conn_str)
+        self.intervalo = intervalo
+        self.max_pendentes = max_pendentes
+
+        # idusuario -> instante do login mais recente
+        self._pendentes: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+        # Estatísticas
+        self._descargas = 0
+        self._gravados = 0
+        self._falhas = 0
+
+    def registrar(self, usuario_id: int, quando: datetime | None = None) -> None:
+        """
+        Anota um login (não acessa o banco).
+
+        Args:
+            usuario_id: idusuario da linha do usuário
+            quando: Instante do login (UTC atual se None)
+        """
+        if quando is None:
+            quando = datetime.now(timezone.utc)
+
+        with self._lock:
+            anterior = self._pendentes.get(usuario_id)
+            if anterior is None or quando > anterior:
+                self._pendentes[usuario_id] = quando
+            cheio = len(self._pendentes) >= self.max_pendentes
+
+        if cheio:
+            self._acordar.set()
+
+    def descarregar(self) -> int:
+        """
+        Grava as anotações pendentes em um único UPDATE.
+
+        Returns:
+            Número de usuários enviados no lote (0 se vazio ou se falhou)
+        """
+        with self._lock:
+            lote, self._pendentes = self._pendentes, {}
+
+        if not lote:
+            return 0
+
+        ids = list(lote)
+        instantes = [lote[i] for i in ids]
+        try:
+            with self._get_conn() as conn, conn.cursor() as cur:
+                # GREATEST: um lote atrasado nunca volta o relógio de um login mais novo
+                cur.execute("""
+                    UPDATE usuario AS u
+                    SET ultimo_login = GREATEST(u.ultimo_login, d.quando)
+                    FROM unnest(%s::int[], %s::timestamptz[]) AS d(idusuario, quando)
+                    WHERE u.idusuario = d.idusuario;
+                """, (ids, instantes))
+                conn.commit()
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar último login ({len(lote)} usuários): {e}")
+            with self._lock:
+                self._falhas += 1
+                for usuario_id, quando in lote.items():
+                    atual = self._pendentes.get(usuario_id)
+                    if atual is None or quando > atual:
+                        self._pendentes[usuario_id] = quando
+            return 0
+
+        with self._lock:
+            self._descargas += 1
+            self._gravados += len(lote)
+        return len(lote)
+
+    def _executar(self) -> None:
+        """Laço da thread: descarrega a cada intervalo ou quando o buffer enche."""
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            if self._parar.is_set():
+                break
+            self.descarregar()
+
+    def iniciar(self) -> None:
+        """Inicia a thread de descarga deste worker (idempotente)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="vta-registro-login", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Encerra a thread e descarrega o que ainda estiver no buffer."""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.descarregar()
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do registro.
+
+        Returns:
+            Dicionário com pendentes, descargas, gravados e falhas
+        """
+        with self._lock:
+            return {
+                "pendentes": len(self._pendentes),
+                "descargas": self._descargas,
+                "gravados": self._gravados,
+                "falhas": self._falhas,
+            }
+
+
+# Registro do processo, usado pelo AutenticacaoServico
+registro_login = RegistroLogin(intervalo=float(os.getenv("ULTIMO_LOGIN_INTERVALO", "30")))
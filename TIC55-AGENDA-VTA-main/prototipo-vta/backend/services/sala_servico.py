@@ -1,5 +1,7 @@
 from backend.DB.conexao import Conexao
+from backend.DB.invalidacao import BarramentoInvalidacao, barramento_invalidacao
 from backend.models.sala import Sala
+from backend.services.cache_salas import CacheSalas, cache_salas
 from datetime import datetime
 
 class SalaServico(Conexao):
@@ -13,6 +15,25 @@ class SalaServico(Conexao):
     - Integração com agendamentos
     """
     
+    def __init__(self, conn_str=None, indice_agenda=None, barramento: BarramentoInvalidacao = None,
+                 cache: CacheSalas = None):
+        """
+        Inicializa o serviço.
+        
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            indice_agenda: IndiceAgenda (opcional). Quando o horário
+                consultado estiver na janela do índice (e o dia em dia com
+                o barramento), a ocupação é respondida em memória, sem
+                consultar agendamentos no banco.
+            barramento: Barramento de invalidação (padrão: o do processo)
+            cache: Cache de salas (padrão: o do processo)
+        """
+        super().__init__(conn_str)
+        self.indice_agenda = indice_agenda
+        self.barramento = barramento if barramento is not None else barramento_invalidacao
+        self.cache = cache if cache is not None else cache_salas
+    
     def criar_sala(self, nome: str, tipo: str, ativa: bool = True) -> Sala | None:
         """
         Cria uma nova sala no sistema.
@@ -42,11 +63,14 @@ class SalaServico(Conexao):
             cur.execute("""
                 INSERT INTO sala (uuid, nome, tipo, ativa)
                 VALUES (%s, %s, %s, %s);
-            """, (sala.uuid, sala.nome, sala.tipo, sala.ativa))
+            """, (sala.sala_id, sala.nome, sala.tipo, sala.ativa))
             
+            self.barramento.publicar(cur, "sala", [sala.sala_id])
             conn.commit()
-            print(f"✓ Sala '{sala.nome}' criada com sucesso!")
-            return sala
+        
+        self.cache.invalidar([sala.sala_id])
+        print(f"✓ Sala '{sala.nome}' criada com sucesso!")
+        return sala
     
     def buscar_sala(self, sala_uuid: str) -> Sala | None:
         """
@@ -58,19 +82,21 @@ class SalaServico(Conexao):
         Returns:
             Sala encontrada ou None
         """
+        sala = self.cache.obter(sala_uuid)
+        if sala is not None:
+            return sala
+        
+        geracao = self.cache.geracao
         with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute("SELECT * FROM sala WHERE uuid = %s;", (sala_uuid,))
             row = cur.fetchone()
             
-            if not row:
-                return None
-            
-            return Sala(
-                uuid=row["uuid"],
-                nome=row["nome"],
-                tipo=row["tipo"],
-                ativa=row["ativa"]
-            )
+        if not row:
+            return None
+        
+        sala = self._criar_sala_from_row(row)
+        self.cache.guardar(sala, geracao)
+        return sala
     
     def buscar_sala_por_nome(self, nome: str) -> Sala | None:
         """
@@ -82,19 +108,21 @@ class SalaServico(Conexao):
         Returns:
             Sala encontrada ou None
         """
+        sala = self.cache.obter_por_nome(nome)
+        if sala is not None:
+            return sala
+        
+        geracao = self.cache.geracao
         with self._get_conn() as conn, conn.cursor() as cur:
             cur.execute("SELECT * FROM sala WHERE nome = %s;", (nome,))
             row = cur.fetchone()
             
-            if not row:
-                return None
-            
-            return Sala(
-                uuid=row["uuid"],
-                nome=row["nome"],
-                tipo=row["tipo"],
-                ativa=row["ativa"]
-            )
+        if not row:
+            return None
+        
+        sala = self._criar_sala_from_row(row)
+        self.cache.guardar(sala, geracao)
+        return sala
     
     def listar_salas(self, apenas_ativas: bool = False) -> list[Sala]:
         """
@@ -105,24 +133,21 @@ class SalaServico(Conexao):
             
         Returns:
             Lista de salas
+            
+        Notes:
+            A lista completa fica no cache; o filtro de ativas é feito em memória.
         """
-        with self._get_conn() as conn, conn.cursor() as cur:
-            if apenas_ativas:
-                cur.execute("SELECT * FROM sala WHERE ativa = TRUE ORDER BY nome;")
-            else:
+        salas = self.cache.listar()
+        if salas is None:
+            geracao = self.cache.geracao
+            with self._get_conn() as conn, conn.cursor() as cur:
                 cur.execute("SELECT * FROM sala ORDER BY nome;")
-            
-            salas = []
-            for row in cur.fetchall():
-                sala = Sala(
-                    uuid=row["uuid"],
-                    nome=row["nome"],
-                    tipo=row["tipo"],
-                    ativa=row["ativa"]
-                )
-                salas.append(sala)
-            
-            return salas
+                salas = [self._criar_sala_from_row(row) for row in cur.fetchall()]
+            self.cache.guardar_todas(salas, geracao)
+        
+        if apenas_ativas:
+            return [sala for sala in salas if sala.ativa]
+        return salas
     
     def atualizar_sala(self, sala_uuid: str, nome: str = None, 
                        tipo: str = None) -> bool:
@@ -162,9 +187,12 @@ class SalaServico(Conexao):
                 print(f"Sala {sala_uuid} não encontrada")
                 return False
             
+            self.barramento.publicar(cur, "sala", [sala_uuid])
             conn.commit()
-            print(f"✓ Sala atualizada com sucesso!")
-            return True
+        
+        self.cache.invalidar([sala_uuid])
+        print(f"✓ Sala atualizada com sucesso!")
+        return True
     
     def ativar_sala(self, sala_uuid: str) -> bool:
         """
@@ -186,9 +214,12 @@ class SalaServico(Conexao):
                 print(f"Sala {sala_uuid} não encontrada")
                 return False
             
+            self.barramento.publicar(cur, "sala", [sala_uuid])
             conn.commit()
-            print(f"✓ Sala ativada com sucesso!")
-            return True
+        
+        self.cache.invalidar([sala_uuid])
+        print(f"✓ Sala ativada com sucesso!")
+        return True
     
     def desativar_sala(self, sala_uuid: str) -> bool:
         """
@@ -210,9 +241,12 @@ class SalaServico(Conexao):
                 print(f"Sala {sala_uuid} não encontrada")
                 return False
             
+            self.barramento.publicar(cur, "sala", [sala_uuid])
             conn.commit()
-            print(f"✓ Sala desativada com sucesso!")
-            return True
+        
+        self.cache.invalidar([sala_uuid])
+        print(f"✓ Sala desativada com sucesso!")
+        return True
     
     def excluir_sala(self, sala_uuid: str) -> bool:
         """
@@ -247,9 +281,96 @@ class SalaServico(Conexao):
                 print(f"Sala {sala_uuid} não encontrada")
                 return False
             
+            self.barramento.publicar(cur, "sala", [sala_uuid])
             conn.commit()
-            print(f"✓ Sala excluída com sucesso!")
-            return True
+        
+        self.cache.invalidar([sala_uuid])
+        print(f"✓ Sala excluída com sucesso!")
+        return True
+    
+    def _criar_sala_from_row(self, row: dict) -> Sala:
+        """
+        Cria objeto Sala a partir de uma linha do banco.
+        
+        Args:
+            row: Dicionário com dados do banco (fetchone())
+            
+        Returns:
+            Instância de Sala
+        """
+        return Sala(
+            sala_id=str(row["uuid"]),
+            nome=row["nome"],
+            tipo=row["tipo"],
+            ativa=row["ativa"]
+        )
+    
+    def consultar_status_salas(self, inicio: datetime, fim: datetime = None,
+                               sala_uuid: str = None,
+                               apenas_ativas: bool = False) -> list[tuple[Sala, str]]:
+        """
+        Consulta o status de todas as salas em uma única ida ao banco.
+        
+        Args:
+            inicio: Instante a verificar (ou início do período)
+            fim: Fim do período (None para consultar só o instante `inicio`)
+            sala_uuid: Restringe a consulta a uma sala (None para todas)
+            apenas_ativas: Se True, ignora salas desativadas
+            
+        Returns:
+            Lista de (Sala, status) ordenada por nome, com status
+            'bloqueada', 'ocupada' ou 'livre'
+            
+        Notes:
+            - Instante: ocupada se algum agendamento cobre o horário
+              (inicio <= dataHora <= fim, igual ao Sala.statusEm)
+            - Período: ocupada se algum agendamento sobrepõe [inicio, fim)
+            - Agendamentos CANCELADOS são ignorados
+        """
+        if fim is None:
+            condicao_horario = "%(inicio)s BETWEEN a.inicio AND a.fim"
+        else:
+            if inicio >= fim:
+                raise ValueError("O início do período deve ser anterior ao fim")
+            condicao_horario = "a.inicio < %(fim)s AND a.fim > %(inicio)s"
+        
+        filtros = []
+        if sala_uuid is not None:
+            filtros.append("s.uuid = %(sala_uuid)s")
+        if apenas_ativas:
+            filtros.append("s.ativa = TRUE")
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        
+        query = f"""
+            SELECT s.uuid, s.nome, s.tipo, s.ativa,
+                   EXISTS (
+                       SELECT 1
+                       FROM agendamento a
+                       WHERE a.fk_sala_uuid = s.uuid
+                         AND a.status != 'CANCELADO'
+                         AND {condicao_horario}
+                   ) AS ocupada
+            FROM sala s
+            {where}
+            ORDER BY s.nome;
+        """
+        
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(query, {"inicio": inicio, "fim": fim, "sala_uuid": sala_uuid})
+            rows = cur.fetchall()
+        
+        resultado = []
+        for row in rows:
+            sala = self._criar_sala_from_row(row)
+            if not sala.ativa:
+                status = "bloqueada"
+            elif row["ocupada"]:
+                status = "ocupada"
+            else:
+                status = "livre"
+            resultado.append((sala, status))
+        
+        return resultado
     
     def consultar_disponibilidade(self, sala_uuid: str, 
                                   dataHora: datetime) -> str:
@@ -263,23 +384,17 @@ class SalaServico(Conexao):
         Returns:
             'bloqueada', 'ocupada', 'livre' ou 'sala_nao_encontrada'
         """
-        sala = self.buscar_sala(sala_uuid)
-        if not sala:
-            return "sala_nao_encontrada"
+        if self.indice_agenda is not None and self.indice_agenda.cobre(dataHora):
+            sala = self.buscar_sala(sala_uuid)
+            if not sala:
+                return "sala_nao_encontrada"
+            return sala.statusEm(dataHora, self.indice_agenda.sala(sala.sala_id))
         
-        # Busca reservas/agendamentos da sala nesse horário
-        with self._get_conn() as conn, conn.cursor() as cur:
-            cur.execute("""
-                SELECT inicio, fim 
-                FROM agendamento 
-                WHERE fk_sala_uuid = %s 
-                  AND status != 'CANCELADO'
-                  AND %s BETWEEN inicio AND fim;
-            """, (sala_uuid, dataHora))
-            
-            reservas = cur.fetchall()
+        resultado = self.consultar_status_salas(dataHora, sala_uuid=sala_uuid)
+        if not resultado:
+            return "sala_nao_encontrada"
         
-        return sala.statusEm(dataHora, reservas)
+        return resultado[0][1]
     
     def listar_salas_disponiveis(self, dataHora: datetime) -> list[Sala]:
         """
@@ -290,13 +405,17 @@ class SalaServico(Conexao):
             
         Returns:
             Lista de salas livres
+            
+        Notes:
+            Uma única consulta, independente do número de salas.
         """
-        salas_ativas = self.listar_salas(apenas_ativas=True)
-        salas_livres = []
-        
-        for sala in salas_ativas:
-            status = self.consultar_disponibilidade(sala.uuid, dataHora)
-            if status == "livre":
-                salas_livres.append(sala)
+        if self.indice_agenda is not None and self.indice_agenda.cobre(dataHora):
+            return [
+                sala for sala in self.listar_salas(apenas_ativas=True)
+                if sala.statusEm(dataHora, self.indice_agenda.sala(sala.sala_id)) == "livre"
+            ]
         
-        return salas_livres
+        return [
+            sala for sala, status in self.consultar_status_salas(dataHora, apenas_ativas=True)
+            if status == "livre"
+        ]
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from backend.DB.conexao import Conexao
+from backend.DB.invalidacao import BarramentoInvalidacao, barramento_invalidacao
+from backend.enums.status_usuario import StatusUsuario
+from backend.models.usuario import Usuario
+
+# Chave do retrato na sessão do Flask
+CHAVE_SESSAO = "usuario"
+
+
+class SessaoPermissoes(Conexao):
+    """
+    Retrato (snapshot) do perfil e do status do usuário guardado na sessão.
+
+    A sessão do Flask é um cookie assinado com SECRET_KEY: o retrato não pode
+    ser alterado pelo navegador, então as rotas autorizam a partir dele sem
+    buscar o usuário. O retrato carrega a versao_permissoes da linha do
+    usuário; atualizar_perfil_usuario e desativar_usuario incrementam essa
+    versão, e a próxima requisição com o retrato antigo faz uma única
+    consulta para renová-lo (ou encerrar a sessão, se o usuário foi
+    desativado).
+
+    A versão atual de cada usuário fica em memória, por email. Escritas em
+    usuário invalidam a entrada (localmente e, pelo barramento de
+    invalidação, nos outros workers); o TTL é só uma rede de segurança caso
+    alguma invalidação se perca.
+    """
+
+    def __init__(self, conn_str=None, barramento: BarramentoInvalidacao = None,
+                 ttl: float = 300.0, relogio=time.monotonic):
+        """
+        Inicializa o serviço com o cache de versões vazio.
+
+        Args:
+            conn_str: String de conexão (None para usar variáveis de ambiente)
+            barramento: Barramento de invalidação (padrão: o do processo)
+            ttl: Segundos até uma versão em memória ser consultada de novo
+            relogio: Função de tempo (substituível nos testes)
+        """
+        super().__init__(conn_str)
+        self.barramento = barramento if barramento is not None else barramento_invalidacao
+        self.ttl = ttl
+        self._relogio = relogio
+        self._lock = threading.Lock()
+
+        # email -> (versao_permissoes, expira_em)
+        self._versoes: dict[str, tuple[int, float]] = {}
+
+        # Incrementada a cada invalidação: consultas iniciadas antes dela não
+        # podem repovoar o cache com uma versão possivelmente antiga
+        self._geracao = 0
+
+        # Estatísticas
+        self._acertos = 0
+        self._consultas = 0
+        self._renovadas = 0
+        self._encerradas = 0
+
+        self.barramento.registrar("usuario", self.invalidar)
+
+    @staticmethod
+    def criar_snapshot(usuario: Usuario, versao: int) -> dict:
+        """
+        Monta o retrato guardado na sessão.
+
+        Args:
+            usuario: Usuário autenticado
+            versao: versao_permissoes lida do banco
+
+        Returns:
+            Dicionário serializável com id, email, perfil, status e versao
+        """
+        return {
+            "id": usuario.usuario_id,
+            "email": usuario.email,
+            "perfil": usuario.perfil.value,
+            "status": usuario.status.value,
+            "versao": versao,
+        }
+
+    @staticmethod
+    def pode(snapshot: dict | None, acao: str) -> bool:
+        """
+        Mesma regra de Usuario.pode (máscara do perfil AND bit da ação),
+        aplicada ao retrato da sessão.
+
+        Args:
+            snapshot: Retrato da sessão (None se não autenticado)
+            acao: Nome da ação (visualizar, criar, editar, excluir)
+
+        Returns:
+            True se o perfil do retrato permite a ação
+        """
+        if not snapshot or snapshot.get("status") != StatusUsuario.ATIVO.value:
+            return False
+
+        return bool(Usuario.MASCARA_POR_VALOR.get(snapshot.get("perfil"), 0) & Usuario.bit_permissao(acao))
+
+    def _consultar(self, email: str) -> dict | None:
+        """Lê perfil, status e versão do usuário, guardando a versão em memória."""
+        geracao = self._geracao
+
+        with self._get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT perfil, status, versao_permissoes FROM usuario WHERE email = %s;",
+                (email,)
+            )
+            row = cur.fetchone()
+
+        with self._lock:
+            self._consultas += 1
+            if row and geracao == self._geracao:
+                self._versoes[email] = (row["versao_permissoes"], self._relogio() + self.ttl)
+        return row
+
+    def iniciar(self, usuario: Usuario) -> dict | None:
+        """
+        Cria o retrato no login.
+
+        Args:
+            usuario: Usuário recém-autenticado
+
+        Returns:
+            Retrato para guardar em session[CHAVE_SESSAO], ou None se o
+            usuário não existir mais
+        """
+        row = self._consultar(usuario.email)
+        if not row:
+            return None
+        return self.criar_snapshot(usuario, row["versao_permissoes"])
+
+    def validar(self, snapshot: dict | None) -> dict | None:
+        """
+        Confere o retrato da sessão com a versão atual do usuário.
+
+        Args:
+            snapshot: Retrato guardado na sessão
+
+        Returns:
+            O próprio retrato se estiver em dia; um retrato novo se a versão
+            mudou; None se o usuário não existe mais ou foi desativado
+        """
+        if not snapshot or "email" not in snapshot or "versao" not in snapshot:
+            return None
+
+        email = snapshot["email"]
+        with self._lock:
+            entrada = self._versoes.get(email)
+            if entrada is not None and self._relogio() < entrada[1] and entrada[0] == snapshot["versao"]:
+                self._acertos += 1
+                return snapshot
+
+        row = self._consultar(email)
+        if not row or row["status"] != StatusUsuario.ATIVO.value:
+            with self._lock:
+                self._encerradas += 1
+            return None
+
+        if row["versao_permissoes"] == snapshot["versao"]:
+            return snapshot
+
+        with self._lock:
+            self._renovadas += 1
+        return {
+            **snapshot,
+            "perfil": row["perfil"],
+            "status": row["status"],
+            "versao": row["versao_permissoes"],
+        }
+
+    def invalidar(self, chaves: list | None = None) -> None:
+        """
+        Descarta versões em memória.
+
+        Args:
+            chaves: Emails alterados (None para limpar tudo)
+        """
+        with self._lock:
+            self._geracao += 1
+            if chaves is None:
+                self._versoes.clear()
+            else:
+                for email in chaves:
+                    self._versoes.pop(str(email).strip().lower(), None)
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna métricas do cache de versões.
+
+        Returns:
+            Dicionário com acertos, consultas (idas ao banco), renovadas
+            (retratos atualizados), encerradas (sessões invalidadas) e tamanho
+        """
+        with self._lock:
+            return {
+                "acertos": self._acertos,
+                "consultas": self._consultas,
+                "renovadas": self._renovadas,
+                "encerradas": self._encerradas,
+                "tamanho": len(self._versoes),
+            }
+
+
+# Serviço do processo, usado pelas rotas e pelo AutenticacaoServico
+sessao_permissoes = SessaoPermissoes(ttl=float(os.getenv("SESSAO_VERSAO_TTL", "300")))
@@ -0,0 +1,190 @@
+"""
+Testes para o agendador de manutenção (services.agendador_manutencao)
+pytest test_agendador_manutencao.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.models.notificacao import Notificacao
+from backend.services.agendador_manutencao import AgendadorManutencao
+from backend.services.autenticacao_servico import AutenticacaoServico
+from backend.services.notificacao_servico import NotificacaoServico
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+
+    conn.cursor.return_value = cursor
+
+    return conn, cursor
+
+
+@pytest.fixture
+def agendador():
+    return AgendadorManutencao()
+
+
+def sqls(cursor):
+    return [c[0][0] for c in cursor.execute.call_args_list]
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestEleicao:
+    """Um worker por execução, via advisory lock."""
+
+    def test_sem_lock_nao_executa(self, agendador, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"lider": False}
+        tarefa = Mock(return_value=0)
+        agendador.registrar("limpeza", tarefa, intervalo=60)
+
+        with patch.object(agendador, '_abrir_conexao', return_value=conn):
+            assert agendador.executar("limpeza") is False
+
+        tarefa.assert_not_called()
+        conn.close.assert_called_once()
+        assert agendador.estatisticas()["limpeza"]["puladas"] == 1
+
+    def test_executada_por_outro_worker_no_intervalo(self, agendador, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [{"lider": True}, {"recente": True}]
+        tarefa = Mock(return_value=0)
+        agendador.registrar("limpeza", tarefa, intervalo=60)
+
+        with patch.object(agendador, '_abrir_conexao', return_value=conn):
+            assert agendador.executar("limpeza") is False
+
+        tarefa.assert_not_called()
+        conn.close.assert_called_once()
+
+    def test_lider_executa_e_registra(self, agendador, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [{"lider": True}, None]
+        agendador.registrar("limpeza", Mock(return_value=42), intervalo=60)
+
+        with patch.object(agendador, '_abrir_conexao', return_value=conn):
+            assert agendador.executar("limpeza") is True
+
+        executados = sqls(cursor)
+        assert any("INSERT INTO tarefa_manutencao" in sql for sql in executados)
+        conn.close.assert_called_once()
+
+        estatisticas = agendador.estatisticas()["limpeza"]
+        assert estatisticas["execucoes"] == 1
+        assert estatisticas["ultimo_resultado"] == 42
+
+    def test_falha_da_tarefa_solta_o_lock(self, agendador, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [{"lider": True}, None]
+        agendador.registrar("limpeza", Mock(side_effect=Exception("erro")), intervalo=60)
+
+        with patch.object(agendador, '_abrir_conexao', return_value=conn):
+            agendador.executar("limpeza")
+
+        conn.close.assert_called_once()
+        assert agendador.estatisticas()["limpeza"]["falhas"] == 1
+
+    def test_lock_em_conexao_fora_do_pool(self, agendador, mock_conn):
+        """A conexão do lock não sai do pool: a tarefa pode usar todas as do pool."""
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [{"lider": True}, None]
+        agendador.registrar("limpeza", Mock(return_value=0), intervalo=60)
+
+        with patch.object(agendador, '_abrir_conexao', return_value=conn), \
+             patch.object(agendador, '_get_conn') as do_pool:
+            assert agendador.executar("limpeza") is True
+
+        do_pool.assert_not_called()
+        assert "pg_try_advisory_lock" in sqls(cursor)[0]
+
+    def test_erro_no_banco_fecha_a_conexao(self, agendador, mock_conn):
+        """Fechar a conexão dedicada solta o lock mesmo se o registro falhar."""
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [{"lider": True}, None]
+        conn.commit.side_effect = [None, Exception("conexão perdida")]
+        agendador.registrar("limpeza", Mock(return_value=0), intervalo=60)
+
+        with patch.object(agendador, '_abrir_conexao', return_value=conn):
+            with pytest.raises(Exception):
+                agendador.executar("limpeza")
+
+        conn.close.assert_called_once()
+
+
+class TestIntervalo:
+    """Tarefas vencidas conforme o relógio."""
+
+    def test_respeita_intervalo(self):
+        agora = [0.0]
+        agendador = AgendadorManutencao(relogio=lambda: agora[0])
+        agendador.registrar("rapida", Mock(), intervalo=60)
+        agendador.registrar("lenta", Mock(), intervalo=3600)
+
+        with patch.object(agendador, 'executar') as executar:
+            agendador.executar_vencidas()
+            agora[0] = 120
+            agendador.executar_vencidas()
+
+        assert [c[0][0] for c in executar.call_args_list] == ["rapida", "lenta", "rapida"]
+
+    def test_intervalo_invalido(self, agendador):
+        with pytest.raises(ValueError):
+            agendador.registrar("x", Mock(), intervalo=0)
+
+
+class TestTarefas:
+    """Tarefas registradas em routes.py."""
+
+    def test_limpeza_de_tokens_em_lotes(self, mock_conn):
+        conn, cursor = mock_conn
+        removidos = iter([2, 2, 1])
+
+        def executar(sql, params):
+            cursor.rowcount = next(removidos)
+        cursor.execute.side_effect = executar
+        servico = AutenticacaoServico()
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.limpar_tokens_expirados(lote=2) == 5
+
+        assert cursor.execute.call_count == 3
+        assert conn.commit.call_count == 3
+        assert "LIMIT" in sqls(cursor)[0]
+
+    def test_retencao_no_repositorio_em_lotes(self):
+        repositorio = Mock()
+        repositorio.excluir_lidas_antes.side_effect = [10, 10, 4]
+        servico = NotificacaoServico(repositorio=repositorio, canal=Mock())
+
+        assert servico.aplicar_retencao(dias=30, lote=10) == 24
+        assert repositorio.excluir_lidas_antes.call_count == 3
+
+    def test_retencao_em_memoria(self):
+        servico = NotificacaoServico(canal=Mock())
+        antiga = datetime.now(timezone.utc) - timedelta(days=40)
+        for notificacao in [
+            Notificacao("u1", "info", "t", "m", criada_em=antiga, lida=True),
+            Notificacao("u1", "info", "t", "m", criada_em=antiga, lida=False),
+            Notificacao("u1", "info", "t", "m", lida=True),
+        ]:
+            servico.repositorio.salvar(notificacao)
+
+        assert servico.aplicar_retencao(dias=30) == 1
+        assert len(servico.repositorio.buscar_por_usuario("u1")) == 2
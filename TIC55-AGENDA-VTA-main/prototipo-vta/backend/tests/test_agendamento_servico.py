@@ -0,0 +1,492 @@
+"""
+Testes para o AgendamentoServico
+pytest test_agendamento_servico.py -v
+
+O teste de concorrência usa um PostgreSQL real e só roda com a variável
+VTA_TEST_DSN definida, por exemplo:
+    VTA_TEST_DSN="dbname=agendavta_teste user=postgres" pytest -m database
+"""
+
+import os
+import threading
+import pytest
+import psycopg2.errors
+from datetime import datetime, timedelta
+from uuid import uuid4
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.DB.conexao import Conexao
+from backend.DB.invalidacao import BarramentoInvalidacao
+from backend.services.agendamento_servico import AgendamentoServico
+from backend.services.eventos_servico import CanalEventos
+from backend.services.indice_agenda import IndiceAgenda
+
+
+INICIO = datetime(2025, 1, 6, 9, 0)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def barramento():
+    """Barramento de invalidação falso (não executa pg_notify no cursor)."""
+    return Mock()
+
+
+@pytest.fixture
+def servico(barramento):
+    """Cria instância do serviço para testes."""
+    return AgendamentoServico(barramento=barramento)
+
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+
+    conn.cursor.return_value = cursor
+
+    return conn, cursor
+
+
+def linha_escrita(sala_id: str = "s1") -> dict:
+    """Simula o RETURNING de mover/cancelar/check-in."""
+    return {
+        "fk_sala_uuid": sala_id,
+        "inicio": INICIO, "fim": INICIO + timedelta(minutes=30),
+        "inicio_anterior": INICIO - timedelta(days=1),
+        "fim_anterior": INICIO - timedelta(days=1) + timedelta(minutes=30),
+    }
+
+
+def conflito(constraint: str) -> psycopg2.errors.ExclusionViolation:
+    """Simula o erro do PostgreSQL ao violar uma exclusion constraint."""
+    class _Diag:
+        constraint_name = constraint
+
+    class _Conflito(psycopg2.errors.ExclusionViolation):
+        diag = _Diag()
+
+    return _Conflito("conflicting key value violates exclusion constraint")
+
+
+def dados_agendamento(**extra):
+    dados = {
+        "sala_id": str(uuid4()),
+        "profissional_id": str(uuid4()),
+        "cliente_id": str(uuid4()),
+        "pet_id": str(uuid4()),
+        "inicio": INICIO,
+        "fim": INICIO + timedelta(minutes=30),
+        "tipo_atendimento": "Consulta",
+    }
+    dados.update(extra)
+    return dados
+
+
+# ============================================================================
+# TESTES COM BANCO SIMULADO
+# ============================================================================
+
+class TestCriarAgendamento:
+    """Testes do método criar_agendamento."""
+
+    def test_criar_sucesso(self, servico, mock_conn):
+        """Deve inserir sem consultar conflitos antes (sem read-then-insert)."""
+        conn, cursor = mock_conn
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            agendamento = servico.criar_agendamento(**dados_agendamento())
+
+        assert agendamento is not None
+        assert agendamento.status == "AGENDADO"
+        assert cursor.execute.call_count == 1
+        assert "INSERT" in cursor.execute.call_args[0][0].upper()
+
+    @pytest.mark.parametrize("constraint,recurso", [
+        ("agendamento_sala_sem_sobreposicao", "sala"),
+        ("agendamento_profissional_sem_sobreposicao", "profissional"),
+    ])
+    def test_conflito_retorna_none(self, servico, mock_conn, capsys, constraint, recurso):
+        """Violação da constraint deve virar None com mensagem do recurso."""
+        conn, cursor = mock_conn
+        cursor.execute.side_effect = conflito(constraint)
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            agendamento = servico.criar_agendamento(**dados_agendamento())
+
+        assert agendamento is None
+        assert conn.rollback.called
+        assert recurso in capsys.readouterr().out
+
+    def test_periodo_invalido(self, servico):
+        """Deve rejeitar início após o fim (validação do modelo)."""
+        with pytest.raises(ValueError):
+            servico.criar_agendamento(**dados_agendamento(fim=INICIO - timedelta(hours=1)))
+
+    def test_atualiza_indice(self, mock_conn):
+        """Deve registrar o novo agendamento no IndiceAgenda."""
+        conn, cursor = mock_conn
+        indice = IndiceAgenda()
+        servico = AgendamentoServico(indice_agenda=indice, barramento=Mock())
+        dados = dados_agendamento()
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.criar_agendamento(**dados)
+
+        assert indice.sala(dados["sala_id"]).ocupada_em(INICIO + timedelta(minutes=10))
+
+
+class TestMoverCancelar:
+    """Testes de mover_agendamento e cancelar_agendamento."""
+
+    def test_mover_conflito(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.execute.side_effect = conflito("agendamento_sala_sem_sobreposicao")
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            movido = servico.mover_agendamento("a1", INICIO, INICIO + timedelta(hours=1))
+
+        assert movido is False
+
+    def test_mover_nao_encontrado(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = None
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            movido = servico.mover_agendamento("a1", INICIO, INICIO + timedelta(hours=1))
+
+        assert movido is False
+
+    def test_mover_sucesso(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            movido = servico.mover_agendamento("a1", INICIO, INICIO + timedelta(hours=1))
+
+        assert movido is True
+        assert conn.commit.called
+
+    def test_cancelar(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.cancelar_agendamento("a1", cancelado_por="recepcao") is True
+
+        cursor.fetchone.return_value = None
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.cancelar_agendamento("a1") is False
+
+    def test_mover_invalida_dia_antigo_e_novo(self, servico, barramento, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.mover_agendamento("a1", INICIO, INICIO + timedelta(minutes=30))
+
+        barramento.publicar.assert_called_once_with(cursor, "agenda", ["2025-01-05", "2025-01-06"])
+
+    def test_checkin(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.registrar_checkin("a1") is True
+            assert cursor.execute.call_args[0][1][0] is not None
+
+            assert servico.registrar_checkin("a1", realizado=False) is True
+            assert cursor.execute.call_args[0][1][0] is None
+
+    def test_cancelamento_chega_ao_indice_de_outro_worker(self, mock_conn):
+        """O "agenda" publicado no cancelamento deve tirar a reserva do índice do outro worker."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+        servico = AgendamentoServico(barramento=BarramentoInvalidacao(), canal=Mock())
+
+        barramento_outro = BarramentoInvalidacao()
+        indice_outro = IndiceAgenda(barramento=barramento_outro)
+        with patch.object(indice_outro, '_get_conn', return_value=mock_conn[0]):
+            indice_outro.carregar(INICIO - timedelta(hours=9), INICIO + timedelta(hours=15))
+        indice_outro.registrar("a1", "s1", INICIO, INICIO + timedelta(minutes=30))
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.cancelar_agendamento("a1")
+        notify = next(c for c in cursor.execute.call_args_list if "pg_notify" in c[0][0])
+
+        # Entregue pela thread de escuta do outro worker
+        barramento_outro._processar(notify[0][1][1])
+        cursor.fetchall.return_value = []
+        with patch.object(indice_outro, '_get_conn', return_value=conn):
+            assert indice_outro.cobre(INICIO)
+
+        assert not indice_outro.sala("s1").ocupada_em(INICIO + timedelta(minutes=10))
+
+
+class TestEventosAoVivo:
+    """Escritas na agenda são publicadas no canal de eventos."""
+
+    @pytest.fixture
+    def canal(self):
+        return CanalEventos()
+
+    def test_mover_publica_evento(self, canal, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+        servico = AgendamentoServico(canal=canal, barramento=Mock())
+        aba = canal.assinar("u1")
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.mover_agendamento("a1", INICIO, INICIO + timedelta(hours=1))
+
+        evento = aba.proximo(timeout=0)
+        assert evento["tipo"] == "agendamento"
+        assert evento["dados"]["acao"] == "movido"
+        assert evento["dados"]["id"] == "a1"
+        assert evento["sala_id"] == "s1"
+
+    def test_conflito_nao_publica(self, canal, mock_conn):
+        conn, cursor = mock_conn
+        cursor.execute.side_effect = conflito("agendamento_sala_sem_sobreposicao")
+        servico = AgendamentoServico(canal=canal, barramento=Mock())
+        aba = canal.assinar("u1")
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.mover_agendamento("a1", INICIO, INICIO + timedelta(hours=1))
+
+        assert aba.proximo(timeout=0) is None
+
+    def test_checkin_publica_evento(self, canal, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha_escrita()
+        servico = AgendamentoServico(canal=canal, barramento=Mock())
+        aba = canal.assinar("u1", salas={"s1"})
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.registrar_checkin("a1")
+
+        assert aba.proximo(timeout=0)["dados"]["acao"] == "checkin"
+
+
+class TestListarAgenda:
+    """Testes do método listar_agenda (grade semanal desnormalizada)."""
+
+    @staticmethod
+    def linha(inicio):
+        return {
+            "uuid": uuid4(), "inicio": inicio, "fim": inicio + timedelta(minutes=30),
+            "status": "AGENDADO", "tipo_atendimento": "Consulta", "observacoes": None,
+            "fk_sala_uuid": "s1", "fk_profissional_uuid": "p1",
+            "fk_cliente_uuid": "c1", "fk_pet_uuid": "pet1",
+            "sala_nome": "Sala 1", "profissional_nome": "Dra. Ana",
+            "cliente_nome": "João", "pet_nome": "Rex",
+        }
+
+    def test_semana_em_uma_consulta(self, servico, mock_conn):
+        """A semana inteira deve vir em uma consulta, já com os nomes."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [self.linha(INICIO + timedelta(hours=i)) for i in range(40)]
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            agenda = servico.listar_agenda(INICIO, INICIO + timedelta(days=7))
+
+        assert len(agenda) == 40
+        assert cursor.execute.call_count == 1
+        assert agenda[0]["data"] == "2025-01-06"
+        assert agenda[0]["horario"] == "09:00"
+        assert (agenda[0]["sala"], agenda[0]["cliente"], agenda[0]["pet"]) == ("Sala 1", "João", "Rex")
+        assert agenda[0]["profissional"] == "Dra. Ana"
+
+    def test_filtro_por_sala(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = []
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.listar_agenda(INICIO, INICIO + timedelta(days=7), sala_id="s1")
+
+        query, params = cursor.execute.call_args[0]
+        assert "a.fk_sala_uuid = %(sala_id)s" in query
+        assert params["sala_id"] == "s1"
+
+    def test_periodo_invalido(self, servico):
+        with pytest.raises(ValueError):
+            servico.listar_agenda(INICIO, INICIO)
+
+
+class TestListarAlteracoes:
+    """Testes do feed incremental listar_alteracoes."""
+
+    def test_sem_alteracoes(self, servico, mock_conn):
+        """Cursor em dia: só lê a versão, sem buscar linhas."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"valor": 42}
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            delta = servico.listar_alteracoes(42)
+
+        assert delta == {"versao": 42, "alterados": [], "removidos": []}
+        assert cursor.execute.call_count == 1
+
+    def test_alterados_e_removidos(self, servico, mock_conn):
+        """Deve retornar linhas alteradas, tombstones e o novo cursor."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"valor": 50}
+        cancelado = TestListarAgenda.linha(INICIO)
+        cancelado["status"] = "CANCELADO"
+        cursor.fetchall.side_effect = [
+            [TestListarAgenda.linha(INICIO), cancelado],
+            [{"uuid": "r1"}],
+        ]
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            delta = servico.listar_alteracoes(40)
+
+        assert delta["versao"] == 50
+        assert [a["status"] for a in delta["alterados"]] == ["AGENDADO", "CANCELADO"]
+        assert delta["removidos"] == ["r1"]
+        params = cursor.execute.call_args_list[1][0][1]
+        assert (params["desde"], params["atual"]) == (40, 50)
+
+    def test_filtro_sala_inclui_saidas_da_sala(self, servico, mock_conn):
+        """Com sala, quem foi movido para outra sala volta em removidos."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"valor": 50}
+        cursor.fetchall.side_effect = [[], [{"uuid": "movido"}]]
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            delta = servico.listar_alteracoes(40, sala_id="sala-a")
+
+        assert delta["removidos"] == ["movido"]
+        sql, params = cursor.execute.call_args_list[2][0]
+        assert "agendamento_saida_sala" in sql
+        assert params["sala_id"] == "sala-a"
+
+    def test_sem_filtro_sala_ignora_saidas(self, servico, mock_conn):
+        """Sem sala, o agendamento movido já vem em alterados."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"valor": 50}
+        cursor.fetchall.side_effect = [[], []]
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.listar_alteracoes(40)
+
+        assert "agendamento_saida_sala" not in cursor.execute.call_args_list[2][0][0]
+
+    def test_versao_negativa(self, servico):
+        with pytest.raises(ValueError):
+            servico.listar_alteracoes(-1)
+
+
+# ============================================================================
+# TESTE DE CONCORRÊNCIA (POSTGRESQL REAL)
+# ============================================================================
+
+@pytest.mark.database
+@pytest.mark.skipif(not os.getenv("VTA_TEST_DSN"), reason="VTA_TEST_DSN não definido")
+class TestConcorrenciaBanco:
+    """Várias recepções agendando o mesmo horário ao mesmo tempo."""
+
+    THREADS = 12
+
+    @pytest.fixture
+    def dsn(self, monkeypatch):
+        from backend.DB.migracoes import Migrador
+
+        monkeypatch.setenv("DB_POOL_MAX", str(self.THREADS + 2))
+        Conexao.fechar_pools()
+        dsn = os.environ["VTA_TEST_DSN"]
+        Migrador(dsn).aplicar()
+        yield dsn
+        Conexao.fechar_pools()
+
+    def test_insercoes_paralelas_conflitantes(self, dsn):
+        """Exatamente uma das inserções simultâneas na mesma sala deve vencer."""
+        sala_id = str(uuid4())
+        inicio = datetime(2030, 1, 1, 9, 0) + timedelta(minutes=uuid4().int % 10_000)
+        barreira = threading.Barrier(self.THREADS)
+        resultados = []
+
+        def reservar(deslocamento):
+            servico = AgendamentoServico(dsn)
+            barreira.wait()
+            # Períodos diferentes, mas todos se sobrepõem a [inicio, inicio+30min)
+            resultados.append(servico.criar_agendamento(**dados_agendamento(
+                sala_id=sala_id,
+                inicio=inicio + timedelta(minutes=deslocamento),
+                fim=inicio + timedelta(minutes=30 + deslocamento),
+            )))
+
+        threads = [threading.Thread(target=reservar, args=(i % 3,)) for i in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(r is not None for r in resultados) == 1
+
+        with AgendamentoServico(dsn)._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS total FROM agendamento WHERE fk_sala_uuid = %s;", (sala_id,))
+            assert cur.fetchone()["total"] == 1
+
+    def test_cancelado_libera_horario(self, dsn):
+        """Após cancelar, o mesmo horário pode ser reservado de novo."""
+        servico = AgendamentoServico(dsn)
+        dados = dados_agendamento(inicio=datetime(2031, 1, 1, 9), fim=datetime(2031, 1, 1, 10))
+
+        primeiro = servico.criar_agendamento(**dados)
+        assert servico.criar_agendamento(**dados) is None
+
+        assert servico.cancelar_agendamento(primeiro.id)
+        assert servico.criar_agendamento(**dados) is not None
+
+    def test_feed_incremental(self, dsn):
+        """Criar, cancelar e excluir devem aparecer a partir do cursor."""
+        servico = AgendamentoServico(dsn)
+        cursor = servico.versao_atual()
+
+        criado = servico.criar_agendamento(**dados_agendamento(
+            inicio=datetime(2032, 1, 1, 9), fim=datetime(2032, 1, 1, 10)
+        ))
+        servico.cancelar_agendamento(criado.id)
+        with servico._get_conn() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM agendamento WHERE uuid = %s;", (criado.id,))
+
+        delta = servico.listar_alteracoes(cursor)
+
+        assert delta["versao"] > cursor
+        assert criado.id in delta["removidos"]
+        assert servico.listar_alteracoes(delta["versao"])["removidos"] == []
+
+    def test_feed_da_sala_antiga_apos_mover(self, dsn):
+        """Movido de A para B: sai do feed de A e entra no de B."""
+        servico = AgendamentoServico(dsn)
+        sala_a, sala_b = str(uuid4()), str(uuid4())
+        criado = servico.criar_agendamento(**dados_agendamento(
+            sala_id=sala_a, inicio=datetime(2033, 1, 1, 9), fim=datetime(2033, 1, 1, 10)
+        ))
+        cursor = servico.versao_atual()
+
+        assert servico.mover_agendamento(criado.id, datetime(2033, 1, 1, 9),
+                                         datetime(2033, 1, 1, 10), sala_id=sala_b)
+
+        delta_a = servico.listar_alteracoes(cursor, sala_id=sala_a)
+        delta_b = servico.listar_alteracoes(cursor, sala_id=sala_b)
+        assert criado.id in delta_a["removidos"]
+        assert [a["id"] for a in delta_b["alterados"]] == [criado.id]
+        assert delta_b["removidos"] == []
+
+        # De volta para A: reaparece em A e sai de B
+        cursor = delta_a["versao"]
+        servico.mover_agendamento(criado.id, datetime(2033, 1, 1, 9),
+                                  datetime(2033, 1, 1, 10), sala_id=sala_a)
+        assert servico.listar_alteracoes(cursor, sala_id=sala_a)["removidos"] == []
+        assert criado.id in servico.listar_alteracoes(cursor, sala_id=sala_b)["removidos"]
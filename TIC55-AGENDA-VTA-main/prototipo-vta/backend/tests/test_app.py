@@ -0,0 +1,132 @@
+"""
+Testes da inicialização da aplicação (app.py)
+pytest test_app.py -v
+
+Cada teste importa app.py em um processo novo: a configuração e os
+singletons do backend são lidos na importação.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def rodar(codigo: str, cwd: Path) -> str:
+    """Executa `codigo` em um interpretador novo e retorna a última linha impressa."""
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=cwd, capture_output=True, text=True, timeout=60,
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    return resultado.stdout.strip().splitlines()[-1]
+
+
+class TestConfiguracao:
+    """O .env vale para todos os serviços, inclusive os criados na importação."""
+
+    def test_env_lido_antes_do_backend(self, tmp_path):
+        (tmp_path / ".env").write_text("DB_NAME=clinica_prod\nHASH_ITERACOES=900000\n")
+
+        saida = rodar(
+            f"import sys; sys.path.insert(0, {str(BACKEND)!r}); import app\n"
+            "from backend.DB.invalidacao import barramento_invalidacao\n"
+            "from backend.models.usuario import Usuario\n"
+            "print(barramento_invalidacao.db_config['dbname'], app.db.db_config['dbname'], Usuario.ITERACOES_PBKDF2)",
+            cwd=tmp_path,
+        )
+
+        assert saida == "clinica_prod clinica_prod 900000"
+
+
+class TestEfeitosDaImportacao:
+    """Importar app.py não sobe threads; os processos de hashing nem montam a aplicação."""
+
+    def test_importar_nao_sobe_threads(self, tmp_path):
+        saida = rodar(
+            f"import sys, threading; sys.path.insert(0, {str(BACKEND)!r}); import app\n"
+            "print(threading.active_count(), callable(app.iniciar_servicos))",
+            cwd=tmp_path,
+        )
+
+        assert saida == "1 True"
+
+    def test_processo_de_hashing_so_importa_usuario(self, tmp_path):
+        """Com app.py como __main__, o processo spawn não importa Flask, rotas nem serviços."""
+        saida = rodar(
+            f"import sys; sys.path.insert(0, {str(BACKEND)!r}); sys.path.insert(0, {str(BACKEND.parent)!r})\n"
+            # Como em `python app.py`: o spawn reimporta o arquivo do __main__
+            f"sys.modules['__main__'].__file__ = {str(BACKEND / 'app.py')!r}\n"
+            "from backend.services.executor_hash import ExecutorHash\n"
+            "executor = ExecutorHash(processos=1)\n"
+            "pool = executor._get_pool()\n"
+            "carregados = pool.submit(eval, \"sorted(m for m in __import__('sys').modules"
+            " if m in ('flask', 'routes', 'app') or m.startswith('backend.services'))\").result(30)\n"
+            "threads = pool.submit(eval, \"__import__('threading').active_count()\").result(30)\n"
+            "hash_ok = executor.validar_senha(executor.hash_senha('senha123'), 'senha123')\n"
+            "executor.fechar()\n"
+            "print(carregados, threads, hash_ok)",
+            cwd=tmp_path,
+        )
+
+        assert saida == "[] 1 True"
+
+
+class TestProxy:
+    """O limite de login por IP precisa do IP do cliente, não do proxy."""
+
+    CODIGO = (
+        "import sys; sys.path.insert(0, {backend!r}); import app\n"
+        "from flask import request\n"
+        "ambiente = {{'REMOTE_ADDR': '10.0.0.1', 'HTTP_X_FORWARDED_FOR': '203.0.113.7, 198.51.100.2'}}\n"
+        "@app.app.route('/_ip')\n"
+        "def _ip():\n"
+        "    return request.remote_addr\n"
+        "print(app.app.test_client().get('/_ip', environ_base=ambiente).get_data(as_text=True))"
+    )
+
+    def test_sem_proxy_usa_conexao(self, tmp_path):
+        saida = rodar(self.CODIGO.format(backend=str(BACKEND)), cwd=tmp_path)
+
+        assert saida == "10.0.0.1"
+
+    def test_proxy_confiavel_usa_x_forwarded_for(self, tmp_path):
+        # Só o salto adicionado pelo proxy conta; o resto do cabeçalho é do cliente
+        (tmp_path / ".env").write_text("PROXY_CONFIAVEIS=1\n")
+
+        saida = rodar(self.CODIGO.format(backend=str(BACKEND)), cwd=tmp_path)
+
+        assert saida == "198.51.100.2"
+
+
+class TestMigracoes:
+    """Os workers aplicam as migrações pendentes antes de subir as threads."""
+
+    CODIGO = (
+        "import sys, contextlib; sys.path.insert(0, {backend!r}); import app\n"
+        "from unittest.mock import patch\n"
+        "from backend.DB.migracoes import Migrador\n"
+        "ordem = []\n"
+        "servicos = [app.barramento_invalidacao, app.registro_login, app.agendador_manutencao,\n"
+        "            app.despacho_notificacoes, app.lembretes_agenda]\n"
+        "with contextlib.ExitStack() as pilha:\n"
+        "    pilha.enter_context(patch.object(Migrador, 'aplicar', lambda self: ordem.append('migrar')))\n"
+        "    for s in servicos:\n"
+        "        pilha.enter_context(patch.object(s, 'iniciar', lambda: ordem.append('iniciar')))\n"
+        "    app.iniciar_servicos()\n"
+        "print(ordem[0], ordem.count('migrar'), ordem.count('iniciar'))"
+    )
+
+    def test_migra_antes_das_threads(self, tmp_path):
+        saida = rodar(self.CODIGO.format(backend=str(BACKEND)), cwd=tmp_path)
+
+        assert saida == "migrar 1 5"
+
+    def test_desligado_por_variavel(self, tmp_path):
+        (tmp_path / ".env").write_text("MIGRAR_NA_INICIALIZACAO=0\n")
+
+        saida = rodar(self.CODIGO.format(backend=str(BACKEND)), cwd=tmp_path)
+
+        assert saida == "iniciar 0 5"
+
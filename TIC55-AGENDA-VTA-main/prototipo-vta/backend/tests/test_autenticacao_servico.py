@@ -1,3 +1,4 @@
+import hashlib
 import pytest
 from datetime import datetime, timezone, timedelta
 from uuid import uuid4
@@ -104,19 +105,66 @@ class TestSessaoLogin:
         
         assert usuario is None
     
-    def test_login_atualiza_ultimo_login(self, servico, mock_conn, usuario_dict):
-        """Deve tentar atualizar último login."""
+    def test_login_atualiza_ultimo_login(self, mock_conn, usuario_dict):
+        """Deve anotar o último login no buffer, sem escrever no login."""
         conn, cursor = mock_conn
         cursor.fetchone.return_value = usuario_dict
+        registro = Mock()
+        servico = AutenticacaoServico(registro_login=registro)
         
         with patch.object(servico, '_get_conn', return_value=conn):
             usuario = servico.sessao_login("joao@example.com", "senha123")
         
         execute_calls = cursor.execute.call_args_list
-        assert len(execute_calls) >= 2
+        assert all("UPDATE" not in c[0][0].upper() for c in execute_calls)
         
-        update_call = execute_calls[1][0][0]
-        assert "UPDATE" in update_call.upper()
+        registro.registrar.assert_called_once()
+        assert registro.registrar.call_args[0][0] == usuario_dict["idusuario"]
+    
+    def test_login_regrava_hash_legado(self, servico, mock_conn, usuario_dict):
+        """Login com hash SHA256 antigo deve regravar em PBKDF2 (transação curta após o hash)."""
+        conn, cursor = mock_conn
+        legado = hashlib.sha256(b"senha123").hexdigest()
+        usuario_dict["senhahash"] = legado
+        cursor.fetchone.return_value = usuario_dict
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            usuario = servico.sessao_login("joao@example.com", "senha123")
+        
+        assert usuario is not None
+        assert not Usuario.precisa_rehash(usuario.senha_hash)
+        
+        rehash = [c for c in cursor.execute.call_args_list if "SET senhahash" in c[0][0]]
+        assert len(rehash) == 1
+        novo_hash, _, hash_antigo = rehash[0][0][1]
+        assert hash_antigo == legado
+        assert Usuario.validar_senha(novo_hash, "senha123")
+        assert conn.commit.call_count == 1
+    
+    def test_login_hash_fora_da_transacao(self, servico, mock_conn, usuario_dict):
+        """O PBKDF2 deve rodar depois que a leitura devolveu a conexão."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = usuario_dict
+        conexao_aberta = []
+        servico.executor_hash = Mock()
+        servico.executor_hash.validar_senha.side_effect = lambda *a: conexao_aberta.append(
+            conn.__enter__.call_count > conn.__exit__.call_count
+        ) or True
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.sessao_login("joao@example.com", "senha123") is not None
+        
+        assert conexao_aberta == [False]
+    
+    def test_login_hash_atual_nao_regrava(self, servico, mock_conn, usuario_dict):
+        """Hash já no custo atual não é regravado."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = usuario_dict
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.sessao_login("joao@example.com", "senha123")
+        
+        assert not [c for c in cursor.execute.call_args_list if "SET senhahash" in c[0][0]]
     
     def test_login_email_vazio(self, servico):
         """Deve retornar None para email vazio."""
@@ -238,6 +286,21 @@ class TestAlterarSenha:
         update_call = [c for c in execute_calls if "UPDATE" in c[0][0].upper()]
         assert len(update_call) == 1
     
+    def test_alterar_senha_troca_concorrente(self, servico, mock_conn):
+        """Se a senha mudou enquanto o hash era gerado, não sobrescreve."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {
+            "idusuario": 1,
+            "senhahash": Usuario.hash_senha("senha_antiga")
+        }
+        cursor.rowcount = 0
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            sucesso = servico.alterar_senha("joao@example.com", "senha_antiga", "senha_nova_123")
+        
+        assert sucesso is False
+        assert conn.commit.call_count == 0
+    
     def test_alterar_senha_usuario_nao_encontrado(self, servico, mock_conn):
         """Deve falhar se usuário não existe."""
         conn, cursor = mock_conn
@@ -319,6 +382,31 @@ class TestRecuperacaoSenha:
         
         assert token is None
     
+    def test_solicitar_recuperacao_guarda_so_hash(self, servico, mock_conn):
+        """O banco deve receber o SHA-256 do token, nunca o token."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"idusuario": 1}
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            token = servico.solicitar_recuperacao_senha("joao@example.com")
+        
+        insert_call = [c for c in cursor.execute.call_args_list if "INSERT" in c[0][0].upper()][0]
+        assert "token_hash" in insert_call[0][0]
+        assert token not in insert_call[0][1]
+        assert hashlib.sha256(token.encode()).hexdigest() in insert_call[0][1]
+    
+    def test_redefinir_senha_busca_pelo_hash(self, servico, mock_conn):
+        """Deve buscar o token pelo hash (índice único)."""
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = None
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.redefinir_senha(token="abc123", nova_senha="nova_senha_segura_123")
+        
+        sql, params = cursor.execute.call_args_list[0][0]
+        assert "t.token_hash = %s" in sql
+        assert params == (hashlib.sha256(b"abc123").hexdigest(),)
+    
     def test_redefinir_senha_token_valido(self, servico, mock_conn):
         """Deve redefinir senha com token válido."""
         conn, cursor = mock_conn
@@ -327,7 +415,8 @@ class TestRecuperacaoSenha:
             "idtoken": 1,
             "expiraem": datetime.now(timezone.utc) + timedelta(minutes=10),
             "utilizado": False,
-            "idusuario": 1
+            "idusuario": 1,
+            "email": "joao@example.com"
         }
         
         with patch.object(servico, '_get_conn', return_value=conn):
@@ -342,6 +431,26 @@ class TestRecuperacaoSenha:
         update_calls = [c for c in execute_calls if "UPDATE" in c[0][0].upper()]
         assert len(update_calls) == 2
     
+    def test_redefinir_senha_token_usado_durante_hash(self, servico, mock_conn):
+        """Token consumido por outra requisição durante o hash não redefine a senha."""
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [
+            {
+                "idtoken": 1,
+                "expiraem": datetime.now(timezone.utc) + timedelta(minutes=10),
+                "utilizado": False,
+                "idusuario": 1,
+                "email": "joao@example.com"
+            },
+            None,  # UPDATE ... AND NOT utilizado RETURNING
+        ]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            sucesso = servico.redefinir_senha("token_valido_123", "nova_senha_segura_123")
+        
+        assert sucesso is False
+        assert not [c for c in cursor.execute.call_args_list if "SET senhahash" in c[0][0]]
+    
     def test_redefinir_senha_token_invalido(self, servico, mock_conn):
         """Deve falhar com token inválido."""
         conn, cursor = mock_conn
@@ -485,6 +594,17 @@ class TestGerenciamentoUsuarios:
         assert all(isinstance(u, Usuario) for u in usuarios)
         assert all(u.status == StatusUsuario.ATIVO for u in usuarios)
     
+    def test_listar_usuarios_por_permissao(self, servico, mock_conn):
+        """Deve filtrar no banco pelos perfis que têm a permissão."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = []
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.listar_usuarios_ativos(permissao="criar")
+        
+        perfis = cursor.execute.call_args[0][1][1]
+        assert sorted(perfis) == [PerfilUsuario.ADMIN.value, PerfilUsuario.RECEPCIONISTA.value]
+    
     def test_atualizar_perfil_sucesso(self, servico, mock_conn):
         """Deve atualizar perfil do usuário."""
         conn, cursor = mock_conn
@@ -532,6 +652,49 @@ class TestGerenciamentoUsuarios:
         assert sucesso is True
 
 
+class TestGerenciamentoEmLote:
+    """Testes das operações administrativas em lote."""
+    
+    def test_desativar_em_um_comando(self, mock_conn):
+        """Deve desativar o lote em um UPDATE e invalidar uma vez."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [
+            {"idusuario": 1, "email": "ana@vta.com"},
+            {"idusuario": 7, "email": "bia@vta.com"},
+        ]
+        barramento = Mock()
+        sessoes = Mock()
+        servico = AutenticacaoServico(barramento=barramento, sessoes=sessoes)
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            resultado = servico.desativar_usuarios([" Ana@vta.com", 7, "nao@vta.com"])
+        
+        assert resultado == {" Ana@vta.com": True, 7: True, "nao@vta.com": False}
+        
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args[0]
+        assert "ANY" in sql
+        assert params == (StatusUsuario.INATIVO.value, ["ana@vta.com", "nao@vta.com"], [7])
+        
+        barramento.publicar.assert_called_once_with(cursor, "usuario", ["ana@vta.com", "bia@vta.com"])
+        sessoes.invalidar.assert_called_once_with(["ana@vta.com", "bia@vta.com"])
+    
+    def test_perfil_invalido_nao_acessa_banco(self, servico):
+        """Deve recusar perfil inválido sem consultar o banco."""
+        with patch.object(servico, '_get_conn') as get_conn:
+            resultado = servico.atualizar_perfil_usuarios(["ana@vta.com"], "admin")
+        
+        assert resultado == {"ana@vta.com": False}
+        get_conn.assert_not_called()
+    
+    def test_lote_vazio_nao_acessa_banco(self, servico):
+        """Lista vazia não deve abrir conexão."""
+        with patch.object(servico, '_get_conn') as get_conn:
+            assert servico.reativar_usuarios([]) == {}
+        
+        get_conn.assert_not_called()
+
+
 # ============================================================================
 # TESTES DE INVALIDAÇÃO DE TOKENS
 # ============================================================================
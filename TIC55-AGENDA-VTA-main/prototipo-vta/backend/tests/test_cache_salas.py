@@ -0,0 +1,115 @@
+"""
+Testes para o cache de salas (services.cache_salas.CacheSalas)
+pytest test_cache_salas.py -v
+"""
+
+import pytest
+
+from backend.models.sala import Sala
+from backend.services.cache_salas import CacheSalas
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+class Relogio:
+    """Relógio controlado pelo teste."""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+@pytest.fixture
+def cache(relogio):
+    return CacheSalas(ttl=60, relogio=relogio)
+
+
+def sala(nome="Sala 1", sala_id="s1", ativa=True):
+    return Sala(nome=nome, tipo="Consulta", ativa=ativa, sala_id=sala_id)
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestLeitura:
+    """Acertos, falhas e cópias."""
+
+    def test_por_id_e_por_nome(self, cache):
+        cache.guardar(sala(), cache.geracao)
+
+        assert cache.obter("s1").nome == "Sala 1"
+        assert cache.obter_por_nome("Sala 1").sala_id == "s1"
+        assert cache.obter("s2") is None
+
+        estatisticas = cache.estatisticas()
+        assert (estatisticas["acertos"], estatisticas["falhas"]) == (2, 1)
+
+    def test_retorna_copia(self, cache):
+        cache.guardar(sala(), cache.geracao)
+
+        cache.obter("s1").ativa = False
+
+        assert cache.obter("s1").ativa is True
+
+    def test_lista_completa(self, cache):
+        assert cache.listar() is None
+
+        cache.guardar_todas([sala(), sala("Sala 2", "s2")], cache.geracao)
+
+        assert [s.sala_id for s in cache.listar()] == ["s1", "s2"]
+        assert cache.obter_por_nome("Sala 2").sala_id == "s2"
+
+    def test_ttl(self, cache, relogio):
+        cache.guardar(sala(), cache.geracao)
+
+        relogio.agora = 61
+
+        assert cache.obter("s1") is None
+
+
+class TestInvalidacao:
+    """Escritas removem as salas alteradas e a lista."""
+
+    def test_invalida_chave_e_nome(self, cache):
+        cache.guardar_todas([sala(), sala("Sala 2", "s2")], cache.geracao)
+
+        cache.invalidar(["s1"])
+
+        assert cache.obter("s1") is None
+        assert cache.obter_por_nome("Sala 1") is None
+        assert cache.obter("s2") is not None
+        assert cache.listar() is None
+
+    def test_invalidar_tudo(self, cache):
+        cache.guardar(sala(), cache.geracao)
+
+        cache.invalidar(None)
+
+        assert cache.estatisticas()["tamanho"] == 0
+
+    def test_leitura_anterior_a_invalidacao_nao_repovoa(self, cache):
+        """Consulta que começou antes de uma escrita pode ter dado antigo."""
+        geracao = cache.geracao
+        cache.invalidar(["s1"])
+
+        cache.guardar(sala(), geracao)
+
+        assert cache.obter("s1") is None
+
+    def test_renomear_atualiza_indice_por_nome(self, cache):
+        cache.guardar(sala(), cache.geracao)
+
+        cache.guardar(sala("Sala Nova"), cache.geracao)
+
+        assert cache.obter_por_nome("Sala 1") is None
+        assert cache.obter_por_nome("Sala Nova").sala_id == "s1"
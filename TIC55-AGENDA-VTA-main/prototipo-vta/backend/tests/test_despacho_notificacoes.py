@@ -0,0 +1,154 @@
+"""
+Testes para o despacho de notificações em segundo plano (services.despacho_notificacoes)
+pytest test_despacho_notificacoes.py -v
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from backend.models.notificacao import Notificacao
+from backend.models.usuario import Usuario
+from backend.services.despacho_notificacoes import DespachoNotificacoes, FilaDespachoCheiaErro
+from backend.services.notificacao_servico import NotificacaoServico
+from backend.services.notificacoes_memoria import RepositorioNotificacoesMemoria
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def repositorio():
+    return Mock()
+
+
+@pytest.fixture
+def canal():
+    return Mock()
+
+
+@pytest.fixture
+def despacho(repositorio, canal):
+    return DespachoNotificacoes(repositorio=repositorio, canal=canal, max_lote=2, max_pendentes=4,
+                                espera_falha=0, max_tentativas=2)
+
+
+def novas(quantidade, usuario_id="u1"):
+    return [Notificacao(usuario_id, "info", "Aviso", f"Mensagem {i}") for i in range(quantidade)]
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestFila:
+    """Enfileirar não acessa o banco; o despacho grava em lotes."""
+
+    def test_enfileirar_retorna_sem_gravar(self, despacho, repositorio, canal):
+        assert despacho.enfileirar(novas(3)) == 3
+
+        repositorio.salvar_em_lote.assert_not_called()
+        canal.publicar_lote.assert_not_called()
+        assert despacho.estatisticas()["pendentes"] == 3
+
+    def test_envios_juntos_no_mesmo_lote(self, despacho, repositorio):
+        primeiro, segundo = novas(1), novas(1, "u2")
+        despacho.enfileirar(primeiro)
+        despacho.enfileirar(segundo)
+
+        assert despacho.descarregar() == 2
+        repositorio.salvar_em_lote.assert_called_once_with(primeiro + segundo)
+
+    def test_lotes_limitados_e_publicacao_depois_de_gravar(self, despacho, repositorio, canal):
+        ordem = []
+        repositorio.salvar_em_lote.side_effect = lambda lote: ordem.append("gravar")
+        canal.publicar_lote.side_effect = lambda *a, **k: ordem.append("publicar")
+        despacho.enfileirar(novas(3))
+
+        assert despacho.descarregar() == 3
+
+        assert [len(c[0][0]) for c in repositorio.salvar_em_lote.call_args_list] == [2, 1]
+        assert ordem == ["gravar", "publicar", "gravar", "publicar"]
+        assert [len(c[0][1]) for c in canal.publicar_lote.call_args_list] == [2, 1]
+        estatisticas = despacho.estatisticas()
+        assert estatisticas["lotes"] == 2
+        assert estatisticas["despachadas"] == 3
+        assert estatisticas["pendentes"] == 0
+
+
+class TestContrapressao:
+    """Fila limitada: recusa em vez de crescer sem fim."""
+
+    def test_fila_cheia_recusa(self, despacho):
+        despacho.enfileirar(novas(3))
+
+        with pytest.raises(FilaDespachoCheiaErro):
+            despacho.enfileirar(novas(2), espera=0)
+
+        assert despacho.estatisticas()["rejeitadas"] == 2
+        assert despacho.estatisticas()["pendentes"] == 3
+
+    def test_envio_maior_que_a_fila_entra_com_ela_vazia(self, despacho):
+        assert despacho.enfileirar(novas(10)) == 10
+
+
+class TestFalhas:
+    """Lote que falha volta para a fila e, depois do limite, é descartado."""
+
+    def test_lote_volta_para_a_frente(self, despacho, repositorio, canal):
+        repositorio.salvar_em_lote.side_effect = Exception("banco fora")
+        notificacoes = novas(2)
+        despacho.enfileirar(notificacoes)
+
+        assert despacho.descarregar() == 0
+
+        assert [n for _, n in despacho._fila] == notificacoes
+        canal.publicar_lote.assert_not_called()
+        assert despacho.estatisticas()["falhas"] == 1
+
+    def test_descarta_apos_max_tentativas(self, despacho, repositorio):
+        repositorio.salvar_em_lote.side_effect = Exception("banco fora")
+        despacho.enfileirar(novas(2))
+
+        despacho.descarregar()
+        despacho.descarregar()
+
+        estatisticas = despacho.estatisticas()
+        assert estatisticas["descartadas"] == 2
+        assert estatisticas["pendentes"] == 0
+
+
+class TestThread:
+    """A thread despacha sozinha e `parar` esvazia a fila."""
+
+    def test_parar_esvazia_a_fila(self, canal):
+        repositorio = RepositorioNotificacoesMemoria()
+        despacho = DespachoNotificacoes(repositorio=repositorio, canal=canal, max_lote=50)
+        despacho.iniciar()
+
+        despacho.enfileirar(novas(120))
+        despacho.parar()
+
+        assert repositorio.contar_nao_lidas("u1") == 120
+        assert sum(len(c[0][1]) for c in canal.publicar_lote.call_args_list) == 120
+        assert canal.publicar_lote.call_count < 120
+        assert despacho.estatisticas()["pendentes"] == 0
+
+
+class TestServico:
+    """NotificacaoServico com despacho só enfileira."""
+
+    def test_enviar_enfileira(self, repositorio):
+        despacho = Mock()
+        canal = Mock()
+        servico = NotificacaoServico(repositorio=repositorio, canal=canal, despacho=despacho)
+        usuarios = [Usuario("Ana", "ana@vta.com", "hash"), Usuario("Bia", "bia@vta.com", "hash")]
+
+        notificacao = servico.enviar(usuarios[0], "Consulta confirmada")
+        lote = servico.enviar_em_lote(usuarios, "Manutenção programada", "aviso")
+
+        assert despacho.enfileirar.call_args_list[0][0][0] == [notificacao]
+        assert despacho.enfileirar.call_args_list[1][0][0] == lote
+        repositorio.salvar.assert_not_called()
+        repositorio.salvar_em_lote.assert_not_called()
+        canal.publicar_lote.assert_not_called()
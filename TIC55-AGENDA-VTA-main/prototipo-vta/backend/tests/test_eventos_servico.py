@@ -0,0 +1,219 @@
+"""
+Testes para o canal de eventos ao vivo (services.eventos_servico)
+pytest test_eventos_servico.py -v
+"""
+
+import threading
+import pytest
+from unittest.mock import Mock
+
+from backend.DB.invalidacao import BarramentoInvalidacao
+from backend.models.usuario import Usuario
+from backend.services.eventos_servico import CanalEventos
+from backend.services.notificacao_servico import NotificacaoServico
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def canal():
+    """Canal isolado (não o do processo)."""
+    return CanalEventos(tamanho_fila=3)
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestFiltros:
+    """Cada aba recebe só o que lhe diz respeito."""
+
+    def test_evento_geral_vai_para_todos(self, canal):
+        a, b = canal.assinar("u1"), canal.assinar("u2")
+
+        assert canal.publicar("agendamento", {"acao": "criado"}) == 2
+        assert a.proximo(timeout=0)["dados"] == {"acao": "criado"}
+        assert b.proximo(timeout=0)["dados"] == {"acao": "criado"}
+
+    def test_evento_pessoal_so_para_o_destinatario(self, canal):
+        a, b = canal.assinar("u1"), canal.assinar("u2")
+
+        assert canal.publicar("notificacao", {}, usuario_id="u2") == 1
+        assert a.proximo(timeout=0) is None
+        assert b.proximo(timeout=0)["tipo"] == "notificacao"
+
+    def test_filtro_por_sala(self, canal):
+        aba = canal.assinar("u1", salas={"s1"})
+
+        canal.publicar("agendamento", {"n": 1}, sala_id="s2")
+        canal.publicar("agendamento", {"n": 2}, sala_id="s1")
+
+        assert aba.proximo(timeout=0)["dados"] == {"n": 2}
+        assert aba.proximo(timeout=0) is None
+
+    def test_cancelar_para_de_receber(self, canal):
+        aba = canal.assinar("u1")
+        canal.cancelar(aba)
+
+        assert canal.publicar("agendamento", {}) == 0
+        assert canal.estatisticas()["assinaturas"] == 0
+
+
+class TestFilaLimitada:
+    """Cliente lento não segura quem publica nem acumula memória."""
+
+    def test_fila_cheia_vira_ressincronizar(self, canal):
+        aba = canal.assinar("u1")
+
+        for i in range(5):
+            canal.publicar("agendamento", {"n": i})
+
+        assert aba.proximo(timeout=0)["tipo"] == "ressincronizar"
+        assert canal.estatisticas()["descartados"] > 0
+
+    def test_proximo_acorda_com_publicacao(self, canal):
+        aba = canal.assinar("u1")
+        recebidos = []
+
+        leitor = threading.Thread(target=lambda: recebidos.append(aba.proximo(timeout=2)))
+        leitor.start()
+        canal.publicar("agendamento", {"acao": "movido"})
+        leitor.join()
+
+        assert recebidos[0]["dados"] == {"acao": "movido"}
+
+    def test_proximo_sem_evento_retorna_none(self, canal):
+        aba = canal.assinar("u1")
+        assert aba.proximo(timeout=0.01) is None
+
+
+class TestNotificacoes:
+    """NotificacaoServico empurra novas notificações para o destinatário."""
+
+    def test_enviar_publica_para_o_usuario(self, canal):
+        usuario = Usuario("Ana", "ana@vta.com", "hash")
+        outro = canal.assinar("outro-usuario")
+        aba = canal.assinar(usuario.usuario_id)
+
+        NotificacaoServico(canal=canal).enviar(usuario, "Consulta confirmada", "sucesso", "Agenda")
+
+        evento = aba.proximo(timeout=0)
+        assert evento["tipo"] == "notificacao"
+        assert evento["dados"]["mensagem"] == "Consulta confirmada"
+        assert outro.proximo(timeout=0) is None
+
+
+# ============================================================================
+# VÁRIOS WORKERS
+# ============================================================================
+
+def worker(pid: int) -> CanalEventos:
+    """Canal de um worker com barramento próprio (o pid distingue a origem)."""
+    return CanalEventos(barramento=BarramentoInvalidacao(), origem=pid)
+
+
+def ligar(*canais: CanalEventos) -> None:
+    """Simula o PostgreSQL: cada NOTIFY chega a todos os barramentos, inclusive ao de origem."""
+    def notify(barramento, cache, chaves):
+        cur = Mock()
+        barramento.publicar(cur, cache, chaves)
+        payload = cur.execute.call_args[0][1][1]
+        for canal in canais:
+            canal.barramento._processar(payload)
+
+    for canal in canais:
+        canal.barramento.publicar_agora = lambda cache, chaves=None, b=canal.barramento: notify(b, cache, chaves)
+
+
+class TestEntreWorkers:
+    """Abas ligadas a outro worker também recebem os eventos."""
+
+    def test_evento_chega_ao_outro_worker_uma_vez(self):
+        a, b = worker(1001), worker(1002)
+        ligar(a, b)
+        aba_a, aba_b = a.assinar("u1"), b.assinar("u1")
+
+        a.publicar("agendamento", {"acao": "criado"}, sala_id="s1")
+
+        assert aba_a.proximo(timeout=0)["dados"] == {"acao": "criado"}
+        assert aba_a.proximo(timeout=0) is None
+        evento = aba_b.proximo(timeout=0)
+        assert (evento["tipo"], evento["sala_id"]) == ("agendamento", "s1")
+        assert aba_b.proximo(timeout=0) is None
+        assert b.estatisticas()["recebidos_de_outros_workers"] == 1
+
+    def test_filtro_vale_no_outro_worker(self):
+        a, b = worker(1001), worker(1002)
+        ligar(a, b)
+        outro_usuario = b.assinar("u2")
+
+        a.publicar("notificacao", {"titulo": "Aviso"}, usuario_id="u1")
+
+        assert outro_usuario.proximo(timeout=0) is None
+
+    def test_evento_grande_vira_ressincronizar(self):
+        a, b = worker(1001), worker(1002)
+        ligar(a, b)
+        aba_b = b.assinar("u1")
+
+        a.publicar("notificacao", {"mensagem": "x" * 10_000}, usuario_id="u1")
+
+        assert aba_b.proximo(timeout=0)["tipo"] == "ressincronizar"
+
+    def test_evento_com_escapes_nao_ressincroniza_todos(self):
+        """Aspas dobram no payload do barramento: mede o NOTIFY final, não o evento."""
+        a, b = worker(1001), worker(1002)
+        ligar(a, b)
+        aba_u1, aba_u2 = b.assinar("u1"), b.assinar("u2")
+
+        a.publicar("notificacao", {"mensagem": '"' * 3_000}, usuario_id="u1")
+
+        assert aba_u1.proximo(timeout=0)["tipo"] == "ressincronizar"
+        assert aba_u2.proximo(timeout=0) is None
+
+    def test_lote_vai_em_um_notify(self):
+        a, b = worker(1001), worker(1002)
+        ligar(a, b)
+        notify = a.barramento.publicar_agora
+        a.barramento.publicar_agora = Mock(side_effect=notify)
+        aba_a, aba_b = a.assinar("u1"), b.assinar("u1")
+
+        a.publicar_lote("notificacao", [({"n": i}, "u1", None) for i in range(5)])
+
+        assert a.barramento.publicar_agora.call_count == 1
+        assert [aba_b.proximo(timeout=0)["dados"]["n"] for _ in range(5)] == list(range(5))
+        assert aba_a.proximo(timeout=0)["dados"] == {"n": 0}
+        assert a.estatisticas()["retransmitidos"] == 5
+
+    def test_lote_grande_dividido_no_limite_do_payload(self):
+        a, b = worker(1001), worker(1002)
+        ligar(a, b)
+        notify = a.barramento.publicar_agora
+        a.barramento.publicar_agora = Mock(side_effect=notify)
+        aba_b = b.assinar("u1")
+
+        a.publicar_lote("notificacao", [({"mensagem": "x" * 1_000}, "u1", None) for _ in range(20)])
+
+        assert 1 < a.barramento.publicar_agora.call_count < 20
+        recebidos = [aba_b.proximo(timeout=0) for _ in range(20)]
+        assert all(e["tipo"] == "notificacao" for e in recebidos)
+        assert aba_b.proximo(timeout=0) is None
+
+    def test_reconexao_do_barramento_ressincroniza(self):
+        b = worker(1002)
+        aba = b.assinar("u1")
+
+        b.barramento.invalidar_tudo()
+
+        assert aba.proximo(timeout=0)["tipo"] == "ressincronizar"
+
+    def test_banco_fora_entrega_local(self):
+        a = worker(1001)
+        a.barramento.publicar_agora = Mock(side_effect=Exception("banco fora"))
+        aba = a.assinar("u1")
+
+        assert a.publicar("agendamento", {"acao": "criado"}) == 1
+        assert aba.proximo(timeout=0)["dados"] == {"acao": "criado"}
+        assert a.estatisticas()["falhas_retransmissao"] == 1
@@ -0,0 +1,78 @@
+"""
+Testes para o executor de hashing (services.executor_hash.ExecutorHash)
+pytest test_executor_hash.py -v
+"""
+
+import threading
+import time
+import pytest
+
+from backend.models.usuario import Usuario
+from backend.services.executor_hash import ExecutorHash, HashIndisponivelErro
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def executor():
+    """Pool com um processo real."""
+    e = ExecutorHash(processos=1, max_pendentes=1, timeout=5)
+    yield e
+    e.fechar()
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestResultados:
+    """Mesmo resultado do Usuario, fora da thread chamadora."""
+
+    def test_hash_e_validacao_no_pool(self, executor):
+        senha_hash = executor.hash_senha("senha_segura", iterations=100_000)
+
+        assert senha_hash.startswith("100000$")
+        assert executor.validar_senha(senha_hash, "senha_segura") is True
+        assert executor.validar_senha(senha_hash, "errada") is False
+
+    def test_modo_sem_processos(self):
+        executor = ExecutorHash(processos=0)
+        senha_hash = Usuario.hash_senha("senha_segura", iterations=100_000)
+
+        assert executor.validar_senha(senha_hash, "senha_segura") is True
+        assert executor.estatisticas()["pendentes"] == 0
+
+    def test_erro_de_validacao_propaga(self, executor):
+        with pytest.raises(ValueError):
+            executor.hash_senha("")
+        assert executor.estatisticas()["pendentes"] == 0
+
+
+class TestSobrecarga:
+    """Fila limitada e timeout."""
+
+    def test_fila_cheia_rejeita_na_hora(self, executor):
+        ocupado = threading.Thread(target=executor._executar, args=(time.sleep, 0.5))
+        ocupado.start()
+        time.sleep(0.05)
+
+        with pytest.raises(HashIndisponivelErro):
+            executor.validar_senha("x", "y")
+
+        ocupado.join()
+        assert executor.estatisticas()["rejeitados"] == 1
+        assert executor.estatisticas()["pendentes"] == 0
+
+    def test_timeout(self):
+        executor = ExecutorHash(processos=1, timeout=0.1)
+        try:
+            with pytest.raises(HashIndisponivelErro):
+                executor._executar(time.sleep, 1)
+
+            estatisticas = executor.estatisticas()
+            assert estatisticas["timeouts"] == 1
+            assert estatisticas["latencia_maxima_ms"] >= 100
+        finally:
+            executor.fechar()
@@ -0,0 +1,168 @@
+"""
+Testes para o HorarioServico (busca de próximos horários livres)
+pytest test_horario_servico.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta, time
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.services.horario_servico import HorarioServico
+
+
+SEG = datetime(2025, 1, 6)  # segunda-feira
+
+
+def t(dia: int, hora: int, minuto: int = 0) -> datetime:
+    """Data/hora relativa à segunda-feira de teste."""
+    return SEG + timedelta(days=dia, hours=hora, minutes=minuto)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def servico():
+    """Cria instância do serviço para testes."""
+    return HorarioServico()
+
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+    
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+    
+    conn.cursor.return_value = cursor
+    
+    return conn, cursor
+
+
+def linha(sala_id, nome, inicio=None, fim=None):
+    """Simula uma linha do LEFT JOIN sala x agendamento."""
+    return {
+        "uuid": sala_id, "nome": nome, "tipo": "Cirurgia", "ativa": True,
+        "reserva_inicio": inicio, "reserva_fim": fim,
+    }
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestBuscarHorariosLivres:
+    """Testes do método buscar_horarios_livres."""
+    
+    def test_sala_vazia_comeca_na_abertura(self, servico, mock_conn):
+        """Sem reservas, os horários começam na abertura, em sequência."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha("s1", "Cirurgia 1")]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 0), t(5, 0), timedelta(minutes=30), quantidade=3
+            )
+        
+        assert [h[1] for h in horarios] == [t(0, 8), t(0, 8, 30), t(0, 9)]
+        assert all(h[2] - h[1] == timedelta(minutes=30) for h in horarios)
+    
+    def test_pula_reservas(self, servico, mock_conn):
+        """Deve pular os horários ocupados e realinhar na grade."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [
+            linha("s1", "Cirurgia 1", t(0, 8), t(0, 9, 10)),
+            linha("s1", "Cirurgia 1", t(0, 9, 30), t(0, 10)),
+        ]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 0), t(5, 0), timedelta(minutes=30), quantidade=2
+            )
+        
+        assert [h[1] for h in horarios] == [t(0, 10), t(0, 10, 30)]
+    
+    def test_intercala_salas_por_horario(self, servico, mock_conn):
+        """Deve retornar o horário mais cedo entre todas as salas."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [
+            linha("s1", "Cirurgia 1", t(0, 8), t(0, 12)),
+            linha("s2", "Cirurgia 2", t(0, 8), t(0, 9)),
+        ]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 0), t(5, 0), timedelta(hours=1), quantidade=4
+            )
+        
+        assert [(h[0].nome, h[1].hour) for h in horarios] == [
+            ("Cirurgia 2", 9), ("Cirurgia 2", 10), ("Cirurgia 2", 11),
+            ("Cirurgia 1", 12),
+        ]
+    
+    def test_respeita_fechamento_e_proximo_dia(self, servico, mock_conn):
+        """Horário que ultrapassa o fechamento vai para o dia seguinte."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha("s1", "Cirurgia 1")]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 17), t(5, 0), timedelta(hours=2), quantidade=1
+            )
+        
+        assert horarios[0][1] == t(1, 8)
+    
+    def test_agenda_do_profissional(self, servico, mock_conn):
+        """Horários do profissional ocupado devem ser excluídos em todas as salas."""
+        conn, cursor = mock_conn
+        cursor.fetchall.side_effect = [
+            [linha("s1", "Cirurgia 1"), linha("s2", "Cirurgia 2")],
+            [{"inicio": t(0, 8), "fim": t(0, 10)}],
+        ]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 0), t(5, 0), timedelta(minutes=30), quantidade=2,
+                profissional_id="p1"
+            )
+        
+        assert [h[1] for h in horarios] == [t(0, 10), t(0, 10)]
+        assert cursor.execute.call_count == 2
+    
+    def test_consultas_constantes(self, servico, mock_conn):
+        """Uma consulta, independente de salas e horários pedidos."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha(f"s{i}", f"Sala {i:03}") for i in range(50)]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 0), t(5, 0), timedelta(minutes=30), quantidade=100
+            )
+        
+        assert len(horarios) == 100
+        assert cursor.execute.call_count == 1
+    
+    def test_horario_de_funcionamento_customizado(self, servico, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha("s1", "Cirurgia 1")]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            horarios = servico.buscar_horarios_livres(
+                t(0, 0), t(5, 0), timedelta(minutes=30), quantidade=1,
+                abertura=time(7, 0)
+            )
+        
+        assert horarios[0][1] == t(0, 7)
+    
+    def test_parametros_invalidos(self, servico):
+        with pytest.raises(ValueError):
+            servico.buscar_horarios_livres(t(1, 0), t(0, 0), timedelta(minutes=30))
+        with pytest.raises(ValueError):
+            servico.buscar_horarios_livres(t(0, 0), t(1, 0), timedelta(0))
+        with pytest.raises(ValueError):
+            servico.buscar_horarios_livres(t(0, 0), t(1, 0), timedelta(minutes=30), quantidade=0)
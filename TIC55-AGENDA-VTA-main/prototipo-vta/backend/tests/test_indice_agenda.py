@@ -0,0 +1,288 @@
+"""
+Testes para o índice de intervalos das reservas (services.indice_agenda)
+pytest test_indice_agenda.py -v
+"""
+
+import random
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.DB.invalidacao import BarramentoInvalidacao
+from backend.models.sala import Sala
+from backend.services.agendamento_servico import AgendamentoServico
+from backend.services.indice_agenda import IndiceReservasSala, IndiceAgenda
+from backend.services.sala_servico import SalaServico
+
+
+BASE = datetime(2025, 1, 6, 8, 0)
+
+
+def h(horas: float) -> datetime:
+    """Data/hora relativa ao início do dia de teste."""
+    return BASE + timedelta(hours=horas)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def indice():
+    """Sala com três reservas: 8h-9h, 10h-11h30 e 14h-15h."""
+    return IndiceReservasSala([
+        ("a1", h(0), h(1)),
+        ("a2", h(2), h(3.5)),
+        ("a3", h(6), h(7)),
+    ])
+
+
+# ============================================================================
+# TESTES DO ÍNDICE DE UMA SALA
+# ============================================================================
+
+class TestIndiceReservasSala:
+    """Testes do IndiceReservasSala."""
+
+    def test_ocupada_em(self, indice):
+        """Deve considerar início e fim inclusivos, como Sala.statusEm."""
+        assert indice.ocupada_em(h(0))
+        assert indice.ocupada_em(h(1))
+        assert not indice.ocupada_em(h(1.5))
+        assert indice.ocupada_em(h(3))
+        assert not indice.ocupada_em(h(-1))
+
+    def test_sobrepoe_meio_aberto(self, indice):
+        """Períodos encostados não devem ser considerados sobrepostos."""
+        assert not indice.sobrepoe(h(1), h(2))
+        assert indice.sobrepoe(h(1), h(2.5))
+        assert not indice.sobrepoe(h(3.5), h(6))
+
+    def test_reservas_na_janela(self, indice):
+        """Deve listar apenas as reservas que intersectam a janela."""
+        ids = [r[0] for r in indice.reservas_na_janela(h(0.5), h(6.5))]
+        assert ids == ["a1", "a2", "a3"]
+
+        ids = [r[0] for r in indice.reservas_na_janela(h(1), h(2))]
+        assert ids == []
+
+    def test_adicionar_e_remover(self, indice):
+        """Deve refletir inserções e cancelamentos."""
+        indice.adicionar("a4", h(4), h(5))
+        assert indice.ocupada_em(h(4.5))
+
+        assert indice.remover("a4")
+        assert not indice.ocupada_em(h(4.5))
+        assert not indice.remover("a4")
+
+    def test_adicionar_mesmo_id_substitui(self, indice):
+        """Reagendar (mesmo ID) deve mover a reserva."""
+        indice.adicionar("a1", h(4), h(5))
+
+        assert len(indice) == 3
+        assert not indice.ocupada_em(h(0.5))
+        assert indice.ocupada_em(h(4.5))
+
+    def test_reserva_longa_cobre_outras(self):
+        """Deve achar ocupação por reserva longa que começou antes das curtas."""
+        indice = IndiceReservasSala([
+            ("longa", h(0), h(10)),
+            ("curta", h(1), h(2)),
+        ])
+
+        assert indice.ocupada_em(h(5))
+        assert [r[0] for r in indice.reservas_na_janela(h(5), h(6))] == ["longa"]
+
+    def test_periodo_invalido(self, indice):
+        """Deve rejeitar reserva com início após o fim."""
+        with pytest.raises(ValueError):
+            indice.adicionar("x", h(2), h(1))
+
+    def test_equivale_a_busca_linear(self):
+        """Resultados devem bater com a varredura linear em dados aleatórios."""
+        rnd = random.Random(42)
+        reservas = []
+        for i in range(300):
+            inicio = rnd.uniform(0, 100)
+            reservas.append((f"r{i}", h(inicio), h(inicio + rnd.uniform(0.1, 3))))
+        indice = IndiceReservasSala(reservas)
+
+        for _ in range(200):
+            a = rnd.uniform(-5, 105)
+            b = a + rnd.uniform(0.1, 5)
+            esperado_instante = any(i <= h(a) <= f for _, i, f in reservas)
+            esperado_janela = sorted(r for r, i, f in reservas if i < h(b) and f > h(a))
+
+            assert indice.ocupada_em(h(a)) == esperado_instante
+            assert indice.sobrepoe(h(a), h(b)) == bool(esperado_janela)
+            assert sorted(r[0] for r in indice.reservas_na_janela(h(a), h(b))) == esperado_janela
+
+
+# ============================================================================
+# TESTES DA INTEGRAÇÃO COM SALA E IndiceAgenda
+# ============================================================================
+
+class TestSalaComIndice:
+    """Sala.statusEm deve aceitar o índice no lugar da lista."""
+
+    def test_status_com_indice(self, indice):
+        sala = Sala(nome="Sala 1", tipo="Consulta")
+
+        assert sala.statusEm(h(0.5), indice) == "ocupada"
+        assert sala.statusEm(h(1.5), indice) == "livre"
+
+    def test_sala_inativa_continua_bloqueada(self, indice):
+        sala = Sala(nome="Sala 1", tipo="Consulta", ativa=False)
+
+        assert sala.statusEm(h(0.5), indice) == "bloqueada"
+
+
+class TestIndiceAgenda:
+    """Testes do IndiceAgenda (carga do banco e manutenção)."""
+
+    @pytest.fixture
+    def agenda(self):
+        conn = MagicMock()
+        cursor = MagicMock()
+        conn.__enter__ = Mock(return_value=conn)
+        conn.__exit__ = Mock(return_value=False)
+        cursor.__enter__ = Mock(return_value=cursor)
+        cursor.__exit__ = Mock(return_value=False)
+        conn.cursor.return_value = cursor
+        cursor.fetchall.return_value = [
+            {"uuid": "a1", "fk_sala_uuid": "s1", "inicio": h(0), "fim": h(1)},
+            {"uuid": "a2", "fk_sala_uuid": "s2", "inicio": h(0), "fim": h(2)},
+        ]
+
+        agenda = IndiceAgenda()
+        with patch.object(agenda, '_get_conn', return_value=conn):
+            agenda.carregar(h(0), h(24))
+        return agenda
+
+    def test_carregar_por_sala(self, agenda):
+        """Deve separar as reservas por sala."""
+        assert agenda.sala("s1").ocupada_em(h(0.5))
+        assert not agenda.sala("s1").ocupada_em(h(1.5))
+        assert agenda.sala("s2").ocupada_em(h(1.5))
+        assert len(agenda.sala("s3")) == 0
+
+    def test_cobre_janela(self, agenda):
+        assert agenda.cobre(h(5))
+        assert not agenda.cobre(h(25))
+
+    def test_mover_entre_salas(self, agenda):
+        """Registrar agendamento existente em outra sala deve movê-lo."""
+        agenda.registrar("a1", "s3", h(3), h(4))
+
+        assert len(agenda.sala("s1")) == 0
+        assert agenda.sala("s3").ocupada_em(h(3.5))
+
+    def test_cancelar(self, agenda):
+        assert agenda.cancelar("a2")
+        assert not agenda.sala("s2").ocupada_em(h(1.5))
+        assert not agenda.cancelar("a2")
+
+
+# ============================================================================
+# TESTES DA SINCRONIZAÇÃO ENTRE WORKERS
+# ============================================================================
+
+def conexao_falsa(linhas: list = None):
+    """Conexão falsa cujo cursor retorna `linhas` em todo fetchall."""
+    conn = MagicMock()
+    cursor = MagicMock()
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+    conn.cursor.return_value = cursor
+    cursor.fetchall.return_value = linhas or []
+    return conn, cursor
+
+
+class TestSincronizacao:
+    """Escritas de outro worker chegam ao índice pelo canal "agenda"."""
+
+    @pytest.fixture
+    def barramento(self):
+        """Barramento deste worker (sem a thread de escuta)."""
+        return BarramentoInvalidacao()
+
+    @pytest.fixture
+    def agenda(self, barramento):
+        agenda = IndiceAgenda(barramento=barramento)
+        conn, _ = conexao_falsa()
+        with patch.object(agenda, '_get_conn', return_value=conn):
+            agenda.carregar(h(0), h(24))
+        return agenda
+
+    def test_reserva_de_outro_worker(self, agenda, barramento):
+        """Reserva criada por outra instância do serviço deve aparecer como ocupada."""
+        sala = Sala("Consultório 1", "consultorio")
+        salas = SalaServico(indice_agenda=agenda, barramento=Mock(), cache=Mock())
+
+        with patch.object(salas, 'buscar_sala', return_value=sala):
+            assert salas.consultar_disponibilidade(sala.sala_id, h(1.5)) == "livre"
+
+        # Outro worker grava a reserva; o NOTIFY sai no cursor dele
+        outro = AgendamentoServico(barramento=BarramentoInvalidacao(), canal=Mock())
+        conn_outro, cursor_outro = conexao_falsa()
+        with patch.object(outro, '_get_conn', return_value=conn_outro):
+            reserva = outro.criar_agendamento(sala.sala_id, "p1", "c1", "pet1", h(1), h(2), "Consulta")
+        notify = next(c for c in cursor_outro.execute.call_args_list if "pg_notify" in c[0][0])
+
+        # ... e chega a este worker pela thread de escuta
+        barramento._processar(notify[0][1][1])
+        assert agenda.estatisticas()["dias_pendentes"] == 1
+
+        conn, cursor = conexao_falsa([
+            {"uuid": reserva.id, "fk_sala_uuid": sala.sala_id, "inicio": h(1), "fim": h(2)},
+        ])
+        with patch.object(agenda, '_get_conn', return_value=conn), \
+             patch.object(salas, 'buscar_sala', return_value=sala):
+            assert salas.consultar_disponibilidade(sala.sala_id, h(1.5)) == "ocupada"
+
+        assert agenda.estatisticas()["dias_pendentes"] == 0
+
+    def test_cancelamento_de_outro_worker(self, agenda, barramento):
+        agenda.registrar("a1", "s1", h(1), h(2))
+
+        barramento._processar('{"cache": "agenda", "chaves": ["2025-01-06"]}')
+        conn, _ = conexao_falsa([])
+        with patch.object(agenda, '_get_conn', return_value=conn):
+            assert agenda.cobre(h(1.5))
+
+        assert not agenda.sala("s1").ocupada_em(h(1.5))
+
+    def test_dia_sujo_vai_ao_banco_se_recarga_falhar(self, agenda, barramento):
+        """Sem conseguir recarregar, o dia invalidado deixa de ser coberto (os outros não)."""
+        barramento._processar('{"cache": "agenda", "chaves": ["2025-01-06"]}')
+
+        with patch.object(agenda, '_get_conn', side_effect=Exception("banco fora")):
+            assert not agenda.cobre(h(1.5))
+            assert agenda.cobre(h(20))  # 2025-01-07 04:00
+
+    def test_invalidacao_total_recarrega_janela(self, agenda, barramento):
+        barramento.invalidar_tudo()
+
+        conn, _ = conexao_falsa([{"uuid": "a9", "fk_sala_uuid": "s1", "inicio": h(3), "fim": h(4)}])
+        with patch.object(agenda, '_get_conn', return_value=conn):
+            assert agenda.cobre(h(3.5))
+
+        assert agenda.sala("s1").ocupada_em(h(3.5))
+        assert agenda.estatisticas()["recargas_janela"] == 2
+
+    def test_janela_acompanha_relogio(self, barramento):
+        agora = [h(0)]
+        agenda = IndiceAgenda(barramento=barramento, janela_dias=1, relogio=lambda: agora[0])
+        conn, cursor = conexao_falsa()
+
+        with patch.object(agenda, '_get_conn', return_value=conn):
+            assert agenda.cobre(h(1))
+            assert not agenda.cobre(h(20))
+            agora[0] = h(20)
+            assert agenda.cobre(h(20))
+
+        assert cursor.execute.call_count == 2
+        assert agenda.janela_inicio == datetime(2025, 1, 7)
+
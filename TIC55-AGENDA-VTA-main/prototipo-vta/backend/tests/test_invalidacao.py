@@ -0,0 +1,219 @@
+"""
+Testes para o barramento de invalidação (DB.invalidacao.BarramentoInvalidacao)
+pytest test_invalidacao.py -v
+
+O teste com LISTEN/NOTIFY real só roda com VTA_TEST_DSN definida.
+"""
+
+import json
+import os
+import socket
+import time
+import pytest
+from collections import namedtuple
+from unittest.mock import MagicMock, patch
+
+from backend.DB.invalidacao import BarramentoInvalidacao, TAMANHO_MAXIMO_PAYLOAD
+
+
+Notify = namedtuple("Notify", "pid channel payload")
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+class ConexaoEscuta:
+    """Conexão falsa com socket real, para o select() da thread de escuta."""
+
+    def __init__(self):
+        self._leitura, self._escrita = socket.socketpair()
+        self.notifies = []
+        self.autocommit = False
+        self.executados = []
+
+    def fileno(self):
+        return self._leitura.fileno()
+
+    def cursor(self):
+        cur = MagicMock()
+        cur.__enter__ = lambda s: s
+        cur.__exit__ = lambda s, *a: False
+        cur.execute.side_effect = lambda sql, *a: self.executados.append(sql)
+        return cur
+
+    def poll(self):
+        if not self._leitura.recv(4096):
+            raise ConnectionError("conexão encerrada pelo servidor")
+
+    def enviar(self, payload: dict):
+        self.notifies.append(Notify(0, "vta_invalidacao", json.dumps(payload)))
+        self._escrita.send(b"!")
+
+    def derrubar(self):
+        self._escrita.close()
+
+    def close(self):
+        self._leitura.close()
+
+
+def esperar(condicao, timeout: float = 2.0) -> bool:
+    """Aguarda a condição ficar verdadeira (a thread de escuta é assíncrona)."""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def barramento():
+    b = BarramentoInvalidacao(intervalo_verificacao=0.05, espera_reconexao=0.01)
+    yield b
+    b.parar()
+
+
+@pytest.fixture
+def recebidas(barramento):
+    """Registra um cache "sala" que anota cada invalidação recebida."""
+    chamadas = []
+    barramento.registrar("sala", chamadas.append)
+    return chamadas
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestPublicar:
+    """Publicação dentro da transação do serviço."""
+
+    def test_publicar_notifica_e_invalida_local(self, barramento, recebidas):
+        cur = MagicMock()
+
+        barramento.publicar(cur, "sala", ["s1"])
+
+        sql, (canal, payload) = cur.execute.call_args[0]
+        assert "pg_notify" in sql
+        assert canal == "vta_invalidacao"
+        assert json.loads(payload)["chaves"] == ["s1"]
+        assert recebidas == [["s1"]]
+
+    def test_payload_grande_invalida_cache_inteiro(self, barramento, recebidas):
+        cur = MagicMock()
+        chaves = [f"chave-{i}" for i in range(TAMANHO_MAXIMO_PAYLOAD)]
+
+        barramento.publicar(cur, "sala", chaves)
+
+        _, (_, payload) = cur.execute.call_args[0]
+        assert json.loads(payload)["chaves"] is None
+
+    def test_cabe_mede_o_payload_escapado(self, barramento):
+        """Aspas e barras dobram no payload: o tamanho da chave crua não basta."""
+        assert barramento.cabe("eventos", ["x" * 5_000])
+        assert not barramento.cabe("eventos", ['"' * 5_000])
+
+    def test_publicar_agora_em_transacao_propria(self, barramento, recebidas):
+        """Fora de uma escrita (ex.: eventos após o commit), usa uma transação curta."""
+        conn = MagicMock()
+        cur = MagicMock()
+        conn.__enter__.return_value = conn
+        conn.cursor.return_value.__enter__.return_value = cur
+
+        with patch.object(barramento, '_get_conn', return_value=conn):
+            barramento.publicar_agora("sala", ["s1"])
+
+        assert "pg_notify" in cur.execute.call_args[0][0]
+        assert conn.commit.call_count == 1
+        assert recebidas == [["s1"]]
+
+    def test_outros_caches_nao_sao_afetados(self, barramento, recebidas):
+        barramento.publicar(MagicMock(), "usuario", ["a@vta.com"])
+        assert recebidas == []
+
+
+class TestReceber:
+    """Tratamento das mensagens recebidas."""
+
+    def test_mensagem_invalida_e_ignorada(self, barramento, recebidas):
+        barramento._processar("isso não é json")
+        barramento._processar(json.dumps({"sem": "cache"}))
+        assert recebidas == []
+
+    def test_callback_com_erro_nao_interrompe_os_demais(self, barramento, recebidas):
+        def falha(chaves):
+            raise RuntimeError("cache quebrado")
+
+        barramento.registrar("sala", falha)
+        barramento._processar(json.dumps({"cache": "sala", "chaves": ["s1"]}))
+
+        assert recebidas == [["s1"]]
+
+    def test_invalidar_tudo(self, barramento, recebidas):
+        barramento.invalidar_tudo()
+        assert recebidas == [None]
+        assert barramento.estatisticas()["limpezas_totais"] == 1
+
+
+class TestEscuta:
+    """Thread de escuta: recebe, reconecta e limpa tudo após quedas."""
+
+    def test_recebe_e_reconecta(self, barramento, recebidas):
+        primeira, segunda = ConexaoEscuta(), ConexaoEscuta()
+        aberturas = [ConnectionError("banco fora do ar"), primeira, segunda]
+
+        def abrir():
+            resultado = aberturas.pop(0)
+            if isinstance(resultado, Exception):
+                raise resultado
+            return resultado
+
+        with patch.object(barramento, "_abrir_conexao", side_effect=abrir):
+            barramento.iniciar()
+            assert esperar(barramento.conectado.is_set)
+            assert "LISTEN vta_invalidacao;" in primeira.executados
+            recebidas.clear()
+
+            primeira.enviar({"cache": "sala", "chaves": ["s1"]})
+            assert esperar(lambda: recebidas == [["s1"]])
+
+            # Queda: limpa tudo, reconecta e volta a escutar
+            primeira.derrubar()
+            assert esperar(lambda: "LISTEN vta_invalidacao;" in segunda.executados)
+            assert None in recebidas
+
+            segunda.enviar({"cache": "sala", "chaves": ["s2"]})
+            assert esperar(lambda: recebidas[-1] == ["s2"])
+
+        estatisticas = barramento.estatisticas()
+        assert estatisticas["recebidas"] == 2
+        assert estatisticas["reconexoes"] == 2
+
+
+@pytest.mark.database
+@pytest.mark.skipif(not os.getenv("VTA_TEST_DSN"), reason="VTA_TEST_DSN não definida")
+class TestListenNotifyBanco:
+    """NOTIFY só chega aos outros workers após o commit."""
+
+    def test_outro_worker_recebe_apos_commit(self):
+        dsn = os.environ["VTA_TEST_DSN"]
+        escritor = BarramentoInvalidacao(dsn)
+        leitor = BarramentoInvalidacao(dsn, intervalo_verificacao=0.1)
+        recebidas = []
+        leitor.registrar("sala", recebidas.append)
+
+        leitor.iniciar()
+        try:
+            assert esperar(leitor.conectado.is_set, timeout=5)
+            recebidas.clear()
+
+            with escritor._get_conn() as conn, conn.cursor() as cur:
+                escritor.publicar(cur, "sala", ["s1"])
+                time.sleep(0.3)
+                assert recebidas == []
+                conn.commit()
+
+            assert esperar(lambda: recebidas == [["s1"]], timeout=5)
+        finally:
+            leitor.parar()
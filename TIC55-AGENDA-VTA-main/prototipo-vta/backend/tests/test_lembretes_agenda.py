@@ -0,0 +1,246 @@
+"""
+Testes para o motor de lembretes da agenda (services.lembretes_agenda)
+pytest test_lembretes_agenda.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.enums.perfil_usuario import PerfilUsuario
+from backend.models.usuario import Usuario
+from backend.services.lembretes_agenda import LembretesAgenda
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+AGORA = datetime(2026, 3, 2, 8, 0)
+
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+
+    conn.cursor.return_value = cursor
+
+    # Reivindica tudo o que for enviado (nenhum outro worker na frente)
+    def executar(sql, params=None):
+        if "INSERT INTO lembrete_enviado" in sql:
+            cursor.fetchall.return_value = [
+                {"fk_agendamento_uuid": a, "antecedencia_min": m} for a, m in zip(params[0], params[1])
+            ]
+    cursor.execute.side_effect = executar
+
+    return conn, cursor
+
+
+@pytest.fixture
+def profissional():
+    return Usuario("Dra. Ana", "ana@vta.com", "hash", perfil=PerfilUsuario.VETERINARIO)
+
+
+@pytest.fixture
+def recepcionista():
+    return Usuario("Bia", "bia@vta.com", "hash", perfil=PerfilUsuario.RECEPCIONISTA)
+
+
+@pytest.fixture
+def agenda():
+    agenda = Mock()
+    agenda.versao_atual.return_value = 10
+    agenda.listar_agenda.return_value = []
+    agenda.listar_alteracoes.return_value = {"versao": 10, "alterados": [], "removidos": []}
+    return agenda
+
+
+@pytest.fixture
+def relogio():
+    return [AGORA]
+
+
+@pytest.fixture
+def lembretes(agenda, profissional, recepcionista, relogio, mock_conn):
+    autenticacao = Mock()
+    autenticacao.listar_usuarios_ativos.return_value = [profissional, recepcionista]
+    motor = LembretesAgenda(agenda, autenticacao, Mock(), antecedencias=[1440, 60],
+                            relogio=lambda: relogio[0])
+    with patch.object(motor, '_get_conn', return_value=mock_conn[0]):
+        yield motor
+
+
+def item(agendamento_id, inicio, profissional_id, status="AGENDADO"):
+    return {
+        "id": agendamento_id,
+        "inicio": inicio.isoformat(),
+        "status": status,
+        "tipo": "Consulta",
+        "pet": "Rex",
+        "cliente": "Carlos",
+        "sala": "Sala 1",
+        "profissional_id": profissional_id,
+    }
+
+
+def enviados(lembretes):
+    return lembretes.notificacoes.enviar_em_lote.call_args_list
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestDisparo:
+    """Lembretes saem nas antecedências configuradas."""
+
+    def test_dispara_nas_antecedencias(self, lembretes, agenda, relogio, profissional, recepcionista):
+        inicio = AGORA + timedelta(days=2)
+        agenda.listar_agenda.return_value = [item("a1", inicio, profissional.usuario_id)]
+
+        assert lembretes.processar() == 0
+        assert lembretes.estatisticas()["heap"] == 2
+
+        relogio[0] = inicio - timedelta(hours=24)
+        assert lembretes.processar() == 1
+        destinatarios, mensagem, tipo, _ = enviados(lembretes)[0][0]
+        assert destinatarios == [recepcionista, profissional]
+        assert tipo == "lembrete"
+        assert "Rex" in mensagem and "Sala 1" in mensagem
+
+        relogio[0] = inicio - timedelta(hours=1)
+        assert lembretes.processar() == 1
+        # Último lembrete enviado: o agendamento sai da memória
+        assert lembretes.estatisticas()["agendamentos"] == 0
+
+    def test_agendamento_proximo_recebe_so_o_ultimo_aviso(self, lembretes, agenda, profissional):
+        agenda.listar_agenda.return_value = [item("a1", AGORA + timedelta(minutes=30), profissional.usuario_id)]
+
+        assert lembretes.processar() == 1
+        assert len(enviados(lembretes)) == 1
+
+    def test_outro_worker_ja_enviou(self, lembretes, agenda, relogio, mock_conn, profissional):
+        conn, cursor = mock_conn
+        cursor.execute.side_effect = None
+        cursor.fetchall.return_value = []
+        inicio = AGORA + timedelta(days=2)
+        agenda.listar_agenda.return_value = [item("a1", inicio, profissional.usuario_id)]
+        lembretes.processar()
+
+        relogio[0] = inicio - timedelta(hours=24)
+        assert lembretes.processar() == 0
+        assert enviados(lembretes) == []
+        assert lembretes.estatisticas()["enviados_por_outro_worker"] == 1
+
+    def test_banco_fora_devolve_ao_heap(self, lembretes, agenda, relogio, mock_conn, profissional):
+        conn, cursor = mock_conn
+        inicio = AGORA + timedelta(days=2)
+        agenda.listar_agenda.return_value = [item("a1", inicio, profissional.usuario_id)]
+        lembretes.processar()
+
+        relogio[0] = inicio - timedelta(hours=24)
+        cursor.execute.side_effect = Exception("banco fora")
+        with pytest.raises(Exception):
+            lembretes.processar()
+        assert lembretes.estatisticas()["heap"] == 2
+
+
+    def test_falha_no_envio_desfaz_reivindicacao(self, lembretes, agenda, relogio, mock_conn, profissional):
+        """Fila do despacho cheia: o lembrete volta a ser enviável e sai na próxima volta."""
+        conn, cursor = mock_conn
+        inicio = AGORA + timedelta(days=2)
+        agenda.listar_agenda.return_value = [item("a1", inicio, profissional.usuario_id)]
+        lembretes.processar()
+        relogio[0] = inicio - timedelta(hours=24)
+        lembretes.processar()
+
+        relogio[0] = inicio - timedelta(hours=1)
+        lembretes.notificacoes.enviar_em_lote.side_effect = Exception("fila cheia")
+        assert lembretes.processar() == 0
+
+        sql, params = cursor.execute.call_args[0]
+        assert "DELETE FROM lembrete_enviado" in sql
+        assert (params[0], params[1]) == (["a1"], [60])
+        assert lembretes.estatisticas()["agendamentos"] == 1
+        assert lembretes.estatisticas()["falhas"] == 1
+
+        lembretes.notificacoes.enviar_em_lote.side_effect = None
+        relogio[0] += timedelta(seconds=lembretes.intervalo)
+        assert lembretes.processar() == 1
+        assert lembretes.estatisticas()["agendamentos"] == 0
+
+
+class TestAlteracoes:
+    """Remarcações e cancelamentos chegam pelo feed da agenda."""
+
+    def test_remarcado_dispara_no_novo_horario(self, lembretes, agenda, relogio, profissional):
+        inicio = AGORA + timedelta(days=2)
+        novo_inicio = inicio + timedelta(hours=3)
+        agenda.listar_agenda.return_value = [item("a1", inicio, profissional.usuario_id)]
+        lembretes.processar()
+
+        agenda.listar_alteracoes.return_value = {
+            "versao": 11, "alterados": [item("a1", novo_inicio, profissional.usuario_id)], "removidos": [],
+        }
+        relogio[0] = inicio - timedelta(hours=24)
+        assert lembretes.processar() == 0
+        agenda.listar_alteracoes.assert_called_with(10)
+
+        agenda.listar_alteracoes.return_value = {"versao": 11, "alterados": [], "removidos": []}
+        relogio[0] = novo_inicio - timedelta(hours=24)
+        assert lembretes.processar() == 1
+
+    def test_cancelado_nao_dispara(self, lembretes, agenda, relogio, profissional):
+        inicio = AGORA + timedelta(days=2)
+        agenda.listar_agenda.return_value = [item("a1", inicio, profissional.usuario_id)]
+        lembretes.processar()
+
+        agenda.listar_alteracoes.return_value = {
+            "versao": 11, "alterados": [item("a1", inicio, profissional.usuario_id, status="CANCELADO")],
+            "removidos": [],
+        }
+        relogio[0] = inicio - timedelta(hours=1)
+        assert lembretes.processar() == 0
+        assert enviados(lembretes) == []
+
+    def test_heap_compactado_apos_muitas_remarcacoes(self, lembretes, agenda, profissional):
+        inicio = AGORA + timedelta(days=2)
+        lembretes.processar()
+
+        for minutos in range(1, 51):
+            agenda.listar_alteracoes.return_value = {
+                "versao": 10 + minutos,
+                "alterados": [item("a1", inicio + timedelta(minutes=minutos), profissional.usuario_id)],
+                "removidos": [],
+            }
+            lembretes.processar()
+
+        assert lembretes.estatisticas()["heap"] <= 4
+
+
+class TestJanela:
+    """A tabela não é varrida de novo: só a borda da janela."""
+
+    def test_estende_so_a_borda(self, lembretes, agenda, relogio):
+        lembretes.processar()
+        carga_inicial = agenda.listar_agenda.call_args[0]
+        assert carga_inicial == (AGORA, AGORA + timedelta(days=7))
+
+        relogio[0] = AGORA + timedelta(minutes=30)
+        lembretes.processar()
+        assert agenda.listar_agenda.call_count == 1
+
+        relogio[0] = AGORA + timedelta(hours=2)
+        lembretes.processar()
+        assert agenda.listar_agenda.call_args[0] == (AGORA + timedelta(days=7), relogio[0] + timedelta(days=7))
+
+    def test_antecedencia_invalida(self, agenda):
+        with pytest.raises(ValueError):
+            LembretesAgenda(agenda, Mock(), Mock(), antecedencias=[0])
@@ -0,0 +1,133 @@
+"""
+Testes para o limitador de tentativas de login (services.limitador_login)
+pytest test_limitador_login.py -v
+"""
+
+import pytest
+from unittest.mock import patch
+
+from backend.services.autenticacao_servico import AutenticacaoServico
+from backend.services.limitador_login import (
+    BaldesArquivo, BaldesMemoria, LimitadorLogin, LimiteExcedidoErro
+)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+class Relogio:
+    """Relógio controlado pelo teste."""
+
+    def __init__(self):
+        self.agora = 1_000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+@pytest.fixture
+def limitador(relogio):
+    return LimitadorLogin(limite_ip="5/60", limite_email="3/300", relogio=relogio)
+
+
+def tentar(limitador, vezes, ip="10.0.0.1", email="ana@vta.com"):
+    """Faz várias tentativas e conta as barradas."""
+    barradas = 0
+    for _ in range(vezes):
+        try:
+            limitador.verificar(ip, email)
+        except LimiteExcedidoErro:
+            barradas += 1
+    return barradas
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestLimites:
+    """Baldes por email e por IP."""
+
+    def test_email_barrado_apos_capacidade(self, limitador):
+        assert tentar(limitador, 3) == 0
+
+        with pytest.raises(LimiteExcedidoErro) as erro:
+            limitador.verificar("10.0.0.2", "ANA@vta.com ")
+
+        assert erro.value.tentar_novamente_em == pytest.approx(100)
+        assert limitador.estatisticas()["bloqueadas_email"] == 1
+
+    def test_fichas_voltam_com_o_tempo(self, limitador, relogio):
+        tentar(limitador, 3)
+
+        relogio.agora += 100
+
+        assert tentar(limitador, 1) == 0
+        assert tentar(limitador, 1) == 1
+
+    def test_ip_barrado_nao_gasta_fichas_do_email(self, limitador):
+        """Spray de um IP contra vários emails não tranca a vítima."""
+        for i in range(5):
+            limitador.verificar("10.0.0.9", f"usuario{i}@vta.com")
+
+        assert tentar(limitador, 10, ip="10.0.0.9", email="vitima@vta.com") == 10
+        assert tentar(limitador, 3, ip="10.0.0.1", email="vitima@vta.com") == 0
+        assert limitador.estatisticas()["bloqueadas_ip"] == 10
+
+    def test_sucesso_devolve_fichas_do_email(self, limitador):
+        tentar(limitador, 3)
+
+        limitador.registrar_sucesso("ana@vta.com")
+
+        assert tentar(limitador, 1) == 0
+
+    def test_limite_invalido(self):
+        with pytest.raises(ValueError):
+            LimitadorLogin(limite_ip="0/60")
+
+
+class TestBaldes:
+    """Backends de armazenamento dos baldes."""
+
+    def test_memoria_descarta_baldes_cheios(self):
+        baldes = BaldesMemoria(max_chaves=2)
+        baldes.consumir("a", 1, 10, agora=0)
+        baldes.consumir("b", 1, 10, agora=0)
+
+        baldes.consumir("c", 1, 10, agora=20)
+
+        assert set(baldes._baldes) == {"c"}
+
+    def test_arquivo_compartilhado_entre_workers(self, tmp_path, relogio):
+        """Dois limitadores (workers) sobre o mesmo arquivo dividem os baldes."""
+        caminho = str(tmp_path / "limite_login.sqlite3")
+        worker_a = LimitadorLogin(BaldesArquivo(caminho), "5/60", "3/300", relogio)
+        worker_b = LimitadorLogin(BaldesArquivo(caminho), "5/60", "3/300", relogio)
+
+        assert tentar(worker_a, 2) == 0
+        assert tentar(worker_b, 2) == 1
+
+        worker_a.registrar_sucesso("ana@vta.com")
+        assert tentar(worker_b, 1) == 0
+
+
+class TestServico:
+    """sessao_login barra antes do banco e do PBKDF2."""
+
+    def test_login_barrado_nao_consulta_banco(self, limitador):
+        servico = AutenticacaoServico(limitador=limitador)
+        tentar(limitador, 3)
+
+        with patch.object(servico, '_get_conn') as get_conn, \
+             patch.object(servico.executor_hash, 'validar_senha') as validar:
+            with pytest.raises(LimiteExcedidoErro):
+                servico.sessao_login("ana@vta.com", "senha123", ip="10.0.0.1")
+
+        get_conn.assert_not_called()
+        validar.assert_not_called()
@@ -0,0 +1,171 @@
+"""
+Testes para o repositório de notificações em memória (services.notificacoes_memoria)
+pytest test_notificacoes_memoria.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+from backend.models.notificacao import Notificacao
+from backend.models.usuario import Usuario
+from backend.services.notificacao_servico import NotificacaoServico
+from backend.services.notificacoes_memoria import RepositorioNotificacoesMemoria
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def repositorio():
+    return RepositorioNotificacoesMemoria(max_por_usuario=3)
+
+
+def nova(usuario_id="u1", lida=False, criada_em=None):
+    return Notificacao(usuario_id, "info", "Título", "Mensagem", criada_em=criada_em, lida=lida)
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestIndices:
+    """Caixa por usuário e índice por id."""
+
+    def test_usuarios_isolados(self, repositorio):
+        a, b = nova("u1"), nova("u2")
+        repositorio.salvar(a)
+        repositorio.salvar(b)
+
+        assert repositorio.buscar_por_usuario("u1") == [a]
+        assert repositorio.buscar_por_usuario("u2") == [b]
+        assert repositorio.buscar_por_usuario("u3") == []
+
+    def test_mais_recentes_primeiro(self, repositorio):
+        primeira, segunda = nova(), nova()
+        repositorio.salvar(primeira)
+        repositorio.salvar(segunda)
+
+        assert repositorio.buscar_por_usuario("u1") == [segunda, primeira]
+
+    def test_marcar_lida_move_entre_indices(self, repositorio):
+        notificacao = nova()
+        repositorio.salvar(notificacao)
+        assert repositorio.contar_nao_lidas("u1") == 1
+
+        notificacao.marcar_como_lida()
+        assert repositorio.atualizar(notificacao) is True
+
+        assert repositorio.contar_nao_lidas("u1") == 0
+        assert repositorio.buscar_por_usuario("u1", lida=True) == [notificacao]
+        assert repositorio.buscar_por_usuario("u1", lida=False) == []
+
+    def test_excluir(self, repositorio):
+        notificacao = nova()
+        repositorio.salvar(notificacao)
+
+        assert repositorio.excluir(notificacao.notificacao_id) is True
+        assert repositorio.buscar_por_id(notificacao.notificacao_id) is None
+        assert repositorio.contar_nao_lidas("u1") == 0
+        assert repositorio.excluir(notificacao.notificacao_id) is False
+
+
+class TestLimite:
+    """Descarte quando a caixa passa de max_por_usuario."""
+
+    def test_descarta_lida_mais_antiga_primeiro(self, repositorio):
+        nao_lida, lida = nova(), nova(lida=True)
+        for notificacao in [nao_lida, lida, nova(), nova()]:
+            repositorio.salvar(notificacao)
+
+        assert repositorio.buscar_por_id(lida.notificacao_id) is None
+        assert repositorio.buscar_por_id(nao_lida.notificacao_id) is not None
+        assert repositorio.estatisticas()["descartadas"] == 1
+
+    def test_sem_lidas_descarta_a_mais_antiga(self, repositorio):
+        notificacoes = [nova() for _ in range(4)]
+        for notificacao in notificacoes:
+            repositorio.salvar(notificacao)
+
+        assert repositorio.buscar_por_id(notificacoes[0].notificacao_id) is None
+        assert repositorio.contar_nao_lidas("u1") == 3
+
+
+class TestRetencao:
+    """excluir_lidas_antes, usado por NotificacaoServico.aplicar_retencao."""
+
+    def test_respeita_data_e_limite(self):
+        repositorio = RepositorioNotificacoesMemoria()
+        antiga = datetime.now(timezone.utc) - timedelta(days=40)
+        for usuario_id in ["u1", "u2"]:
+            repositorio.salvar(nova(usuario_id, lida=True, criada_em=antiga))
+            repositorio.salvar(nova(usuario_id, lida=False, criada_em=antiga))
+            repositorio.salvar(nova(usuario_id, lida=True))
+
+        data_limite = datetime.now(timezone.utc) - timedelta(days=30)
+        assert repositorio.excluir_lidas_antes(data_limite, 1) == 1
+        assert repositorio.excluir_lidas_antes(data_limite, 10) == 1
+        assert repositorio.estatisticas()["notificacoes"] == 4
+
+
+class TestContador:
+    """Contador do sino: nao_lidas e versao (ETag)."""
+
+    def test_versao_muda_com_o_contador(self, repositorio):
+        assert repositorio.contador("u1") == {"nao_lidas": 0, "versao": 0}
+
+        notificacao = nova()
+        repositorio.salvar(notificacao)
+        depois_do_envio = repositorio.contador("u1")
+        assert depois_do_envio["nao_lidas"] == 1
+
+        notificacao.marcar_como_lida()
+        repositorio.atualizar(notificacao)
+        depois_da_leitura = repositorio.contador("u1")
+        assert depois_da_leitura["nao_lidas"] == 0
+        assert depois_da_leitura["versao"] > depois_do_envio["versao"]
+
+    def test_operacoes_sem_efeito_mantem_versao(self, repositorio):
+        lida = nova(lida=True, criada_em=datetime.now(timezone.utc) - timedelta(days=40))
+        repositorio.salvar(lida)
+        antes = repositorio.contador("u1")
+
+        assert repositorio.marcar_todas_como_lidas("u1") == 0
+        repositorio.excluir(lida.notificacao_id)
+
+        assert repositorio.contador("u1") == antes
+
+    def test_marcar_todas(self, repositorio):
+        repositorio.salvar(nova())
+        repositorio.salvar(nova())
+        antes = repositorio.contador("u1")
+
+        assert repositorio.marcar_todas_como_lidas("u1") == 2
+        assert repositorio.contador("u1") == {"nao_lidas": 0, "versao": antes["versao"] + 1}
+
+
+class TestServico:
+    """NotificacaoServico usa o repositório em memória por padrão."""
+
+    def test_contagem_acompanha_leitura(self):
+        servico = NotificacaoServico(canal=Mock())
+        usuario = Usuario("Ana", "ana@vta.com", "hash")
+        notificacao = servico.enviar(usuario, "Consulta confirmada")
+        servico.enviar(usuario, "Pagamento recebido")
+
+        assert servico.contar_nao_lidas(usuario) == 2
+        assert servico.marcarComoLida(notificacao.notificacao_id) is True
+        assert servico.contar_nao_lidas(usuario) == 1
+        assert servico.marcarTodasComoLidas(usuario) == 1
+        assert servico.contar_nao_lidas(usuario) == 0
+        assert len(servico.listarTodas(usuario)) == 2
+
+    def test_contador_pelo_id_da_sessao(self):
+        servico = NotificacaoServico(canal=Mock())
+        usuario = Usuario("Ana", "ana@vta.com", "hash")
+        servico.enviar(usuario, "Consulta confirmada")
+
+        assert servico.contador(usuario.usuario_id)["nao_lidas"] == 1
+        with pytest.raises(ValueError):
+            servico.contador("")
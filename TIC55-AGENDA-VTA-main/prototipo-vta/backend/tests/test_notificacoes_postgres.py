@@ -0,0 +1,185 @@
+"""
+Testes para o repositório de notificações no PostgreSQL (services.notificacoes_postgres)
+pytest test_notificacoes_postgres.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.models.notificacao import Notificacao
+from backend.models.usuario import Usuario
+from backend.enums.status_usuario import StatusUsuario
+from backend.services.notificacao_servico import NotificacaoServico
+from backend.services.notificacoes_postgres import RepositorioNotificacoesPostgres
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+
+    conn.cursor.return_value = cursor
+
+    return conn, cursor
+
+
+@pytest.fixture
+def repositorio():
+    return RepositorioNotificacoesPostgres()
+
+
+USUARIO_UUID = "0b0c6f2e-1d3a-4c57-9a57-2f1f4c3c7a10"
+
+
+def linha(lida=False):
+    return {
+        "uuid": "8f5e2c1a-6b7d-4e3f-a1b2-c3d4e5f60718",
+        "fk_usuario_uuid": USUARIO_UUID,
+        "tipo": "info",
+        "titulo": "Agenda",
+        "mensagem": "Consulta confirmada",
+        "criada_em": datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc),
+        "lida": lida,
+    }
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestGravacao:
+    """Um INSERT por envio."""
+
+    def test_lote_em_um_insert(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        notificacoes = [Notificacao(USUARIO_UUID, "info", "t", f"m{i}") for i in range(3)]
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            assert repositorio.salvar_em_lote(notificacoes) == 3
+
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args[0]
+        assert "unnest" in sql
+        assert params[0] == [n.notificacao_id for n in notificacoes]
+        assert conn.commit.call_count == 1
+        assert repositorio.estatisticas() == {"lotes": 1, "inseridas": 3}
+
+    def test_lote_vazio_nao_acessa_banco(self, repositorio):
+        with patch.object(repositorio, '_get_conn') as get_conn:
+            assert repositorio.salvar_em_lote([]) == 0
+        get_conn.assert_not_called()
+
+
+class TestConsultas:
+    """Leitura de linhas para Notificacao."""
+
+    def test_nao_lidas_usa_filtro(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha()]
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            notificacoes = repositorio.buscar_por_usuario(USUARIO_UUID, lida=False)
+
+        sql = cursor.execute.call_args[0][0]
+        assert "AND NOT lida" in sql
+        assert "ORDER BY criada_em DESC" in sql
+        assert notificacoes[0].usuario_id == USUARIO_UUID
+        assert notificacoes[0].lida is False
+
+    def test_buscar_por_id_inexistente(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = None
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            assert repositorio.buscar_por_id("x") is None
+
+
+class TestContador:
+    """notificacao_contador, mantido pelos triggers da migração 010."""
+
+    def test_le_so_o_contador(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = {"nao_lidas": 4, "versao": 9}
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            assert repositorio.contador(USUARIO_UUID) == {"nao_lidas": 4, "versao": 9}
+            assert repositorio.contar_nao_lidas(USUARIO_UUID) == 4
+
+        for chamada in cursor.execute.call_args_list:
+            assert "FROM notificacao_contador" in chamada[0][0]
+
+    def test_usuario_sem_contador(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = None
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            assert repositorio.contador(USUARIO_UUID) == {"nao_lidas": 0, "versao": 0}
+
+
+class TestOperacoesEmConjunto:
+    """Marcar todas e excluir antigas: um comando por chamada."""
+
+    def test_marcar_todas(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        cursor.rowcount = 7
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            assert repositorio.marcar_todas_como_lidas(USUARIO_UUID) == 7
+
+        cursor.execute.assert_called_once()
+        assert "NOT lida" in cursor.execute.call_args[0][0]
+
+    def test_excluir_lidas_do_usuario(self, repositorio, mock_conn):
+        conn, cursor = mock_conn
+        cursor.rowcount = 2
+        data_limite = datetime.now(timezone.utc)
+
+        with patch.object(repositorio, '_get_conn', return_value=conn):
+            assert repositorio.excluir_lidas_antes(data_limite, 100, usuario_id=USUARIO_UUID) == 2
+
+        sql, params = cursor.execute.call_args[0]
+        assert "SKIP LOCKED" in sql
+        assert params == (data_limite, USUARIO_UUID, 100)
+
+
+class TestServico:
+    """NotificacaoServico delega as operações em lote ao repositório."""
+
+    def test_envio_em_lote_grava_uma_vez(self):
+        repositorio = Mock()
+        canal = Mock()
+        servico = NotificacaoServico(repositorio=repositorio, canal=canal)
+        ativos = [Usuario("Ana", "ana@vta.com", "hash"), Usuario("Bia", "bia@vta.com", "hash")]
+        inativo = Usuario("Caio", "caio@vta.com", "hash", status=StatusUsuario.INATIVO)
+
+        notificacoes = servico.enviar_em_lote(ativos + [inativo], "Manutenção programada", "aviso")
+
+        assert len(notificacoes) == 2
+        repositorio.salvar_em_lote.assert_called_once_with(notificacoes)
+        repositorio.salvar.assert_not_called()
+        tipo, eventos = canal.publicar_lote.call_args[0]
+        assert (tipo, len(eventos)) == ("notificacao", 2)
+        canal.publicar.assert_not_called()
+
+    def test_excluir_antigas_por_usuario(self):
+        repositorio = Mock()
+        repositorio.excluir_lidas_antes.return_value = 3
+        servico = NotificacaoServico(repositorio=repositorio, canal=Mock())
+        usuario = Usuario("Ana", "ana@vta.com", "hash")
+
+        assert servico.excluirAntigas(usuario, dias=30) == 3
+
+        args, kwargs = repositorio.excluir_lidas_antes.call_args
+        assert kwargs["usuario_id"] == usuario.usuario_id
+        assert args[0] < datetime.now(timezone.utc) - timedelta(days=30)
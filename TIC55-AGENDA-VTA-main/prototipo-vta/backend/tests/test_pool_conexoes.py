@@ -0,0 +1,297 @@
+"""
+Testes para o pool de conexões (DB.pool.PoolConexoes) e sua integração com Conexao
+pytest test_pool_conexoes.py -v
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from backend.DB.pool import PoolConexoes, PoolEsgotadoErro
+from backend.DB.conexao import Conexao
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+class ConexaoFalsa:
+    """Conexão mínima que imita a interface usada pelo pool."""
+
+    def __init__(self):
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.falhar_select = False
+
+    def cursor(self):
+        cur = MagicMock()
+        cur.__enter__ = lambda s: s
+        cur.__exit__ = lambda s, *a: False
+        if self.falhar_select:
+            cur.execute.side_effect = Exception("conexão perdida")
+        return cur
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fabrica():
+    """Fábrica que registra todas as conexões criadas."""
+    criadas = []
+
+    def _fabrica():
+        conn = ConexaoFalsa()
+        criadas.append(conn)
+        return conn
+
+    _fabrica.criadas = criadas
+    return _fabrica
+
+
+@pytest.fixture(autouse=True)
+def limpar_pools():
+    """Garante que cada teste comece sem pools de processo."""
+    Conexao._pools.clear()
+    yield
+    Conexao._pools.clear()
+
+
+# ============================================================================
+# TESTES DO POOL
+# ============================================================================
+
+class TestPoolConexoes:
+    """Testes do PoolConexoes."""
+
+    def test_abre_minimo_na_criacao(self, fabrica):
+        """Deve abrir as conexões mínimas ao ser criado."""
+        pool = PoolConexoes(fabrica, minimo=2, maximo=5)
+
+        assert len(fabrica.criadas) == 2
+        assert pool.estatisticas()["ociosas"] == 2
+
+    def test_reutiliza_conexao_devolvida(self, fabrica):
+        """Deve reaproveitar a conexão em vez de abrir outra."""
+        pool = PoolConexoes(fabrica, minimo=0, maximo=5)
+
+        conn1 = pool.obter()
+        pool.devolver(conn1)
+        conn2 = pool.obter()
+
+        assert conn1 is conn2
+        assert len(fabrica.criadas) == 1
+
+    def test_devolver_faz_rollback(self, fabrica):
+        """Deve desfazer transação pendente ao devolver."""
+        pool = PoolConexoes(fabrica, minimo=0, maximo=1)
+
+        conn = pool.obter()
+        pool.devolver(conn)
+
+        assert conn.rollbacks == 1
+
+    def test_timeout_quando_esgotado(self, fabrica):
+        """Deve lançar PoolEsgotadoErro quando não há conexão livre."""
+        pool = PoolConexoes(fabrica, minimo=0, maximo=1, timeout=0.05)
+        pool.obter()
+
+        with pytest.raises(PoolEsgotadoErro):
+            pool.obter()
+
+        stats = pool.estatisticas()
+        assert stats["esperas"] == 1
+        assert stats["tempo_espera_total"] > 0
+
+    def test_espera_conexao_ser_devolvida(self, fabrica):
+        """Deve entregar a conexão assim que outra thread devolver."""
+        pool = PoolConexoes(fabrica, minimo=0, maximo=1, timeout=2)
+        conn = pool.obter()
+
+        threading.Timer(0.05, pool.devolver, args=(conn,)).start()
+
+        assert pool.obter() is conn
+        assert pool.estatisticas()["esperas"] == 1
+
+    def test_descarta_conexao_fechada(self, fabrica):
+        """Deve substituir conexão que foi fechada enquanto ociosa."""
+        pool = PoolConexoes(fabrica, minimo=1, maximo=1)
+        fabrica.criadas[0].closed = 1
+
+        conn = pool.obter()
+
+        assert conn is fabrica.criadas[1]
+        assert pool.estatisticas()["descartadas"] == 1
+
+    def test_health_check_apos_ociosidade(self, fabrica):
+        """Deve testar conexão ociosa há muito tempo e descartá-la se falhar."""
+        pool = PoolConexoes(fabrica, minimo=1, maximo=1, verificar_apos=0)
+        fabrica.criadas[0].falhar_select = True
+
+        conn = pool.obter()
+
+        assert conn is not fabrica.criadas[0]
+        assert fabrica.criadas[0].closed
+
+    def test_estatisticas_em_uso(self, fabrica):
+        """Deve contar conexões emprestadas e ociosas."""
+        pool = PoolConexoes(fabrica, minimo=0, maximo=3)
+        a = pool.obter()
+        pool.obter()
+        pool.devolver(a)
+
+        stats = pool.estatisticas()
+        assert stats["em_uso"] == 1
+        assert stats["ociosas"] == 1
+        assert stats["abertas"] == 2
+
+    def test_nunca_excede_maximo_com_threads(self, fabrica):
+        """Várias threads não devem abrir mais que o máximo."""
+        pool = PoolConexoes(fabrica, minimo=0, maximo=3, timeout=5)
+
+        def trabalho():
+            for _ in range(20):
+                conn = pool.obter()
+                time.sleep(0.001)
+                pool.devolver(conn)
+
+        threads = [threading.Thread(target=trabalho) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(fabrica.criadas) <= 3
+        assert pool.estatisticas()["em_uso"] == 0
+
+    def test_limites_invalidos(self, fabrica):
+        """Deve rejeitar mínimo maior que máximo."""
+        with pytest.raises(ValueError):
+            PoolConexoes(fabrica, minimo=5, maximo=2)
+
+
+# ============================================================================
+# TESTES DA INTEGRAÇÃO COM CONEXAO
+# ============================================================================
+
+class TestConexaoComPool:
+    """Testes do Conexao._get_conn usando o pool do processo."""
+
+    def test_servicos_compartilham_pool(self, fabrica, monkeypatch):
+        """Instâncias com a mesma configuração devem usar o mesmo pool."""
+        monkeypatch.setattr(Conexao, "_abrir_conexao", lambda self: fabrica())
+
+        a, b = Conexao(), Conexao()
+
+        assert a._get_pool() is b._get_pool()
+
+    def test_get_conn_devolve_ao_pool(self, fabrica, monkeypatch):
+        """Deve commitar e devolver a conexão ao sair do bloco."""
+        monkeypatch.setattr(Conexao, "_abrir_conexao", lambda self: fabrica())
+        servico = Conexao()
+
+        with servico._get_conn() as conn:
+            assert servico.estatisticas_pool()["em_uso"] == 1
+
+        assert conn.commits == 1
+        assert servico.estatisticas_pool()["em_uso"] == 0
+
+        with servico._get_conn() as conn2:
+            pass
+        assert conn2 is conn
+
+    def test_get_conn_rollback_em_erro(self, fabrica, monkeypatch):
+        """Deve fazer rollback e devolver a conexão quando houver exceção."""
+        monkeypatch.setattr(Conexao, "_abrir_conexao", lambda self: fabrica())
+        servico = Conexao()
+
+        with pytest.raises(RuntimeError):
+            with servico._get_conn() as conn:
+                raise RuntimeError("falha")
+
+        assert conn.commits == 0
+        assert conn.rollbacks >= 1
+        assert servico.estatisticas_pool()["em_uso"] == 0
+
+
+# ============================================================================
+# TESTES DA CONEXÃO POR REQUISIÇÃO
+# ============================================================================
+
+class TestConexaoPorRequisicao:
+    """Testes da conexão compartilhada via flask.g durante uma requisição."""
+
+    @pytest.fixture
+    def app(self, fabrica, monkeypatch):
+        from flask import Flask
+
+        monkeypatch.setattr(Conexao, "_abrir_conexao", lambda self: fabrica())
+        app = Flask(__name__)
+        Conexao.registrar_app(app)
+        return app
+
+    def test_servicos_reutilizam_conexao_na_requisicao(self, app):
+        """Serviços diferentes devem receber a mesma conexão na requisição."""
+        a, b = Conexao(), Conexao()
+
+        with app.test_request_context():
+            with a._get_conn() as conn1:
+                pass
+            with b._get_conn() as conn2:
+                pass
+
+            assert conn1 is conn2
+            assert a.estatisticas_pool()["em_uso"] == 1
+
+        assert a.estatisticas_pool()["em_uso"] == 0
+
+    def test_teardown_devolve_conexao(self, app, fabrica):
+        """A conexão deve voltar ao pool e ser reaproveitada na próxima requisição."""
+        servico = Conexao()
+
+        with app.test_request_context():
+            with servico._get_conn() as conn1:
+                pass
+        with app.test_request_context():
+            with servico._get_conn() as conn2:
+                pass
+
+        assert conn1 is conn2
+        assert len(fabrica.criadas) == 1
+
+    def test_liberar_antes_de_trabalho_longo(self, app):
+        """A conexão liberada volta ao pool no meio da requisição."""
+        servico = Conexao()
+
+        with app.test_request_context():
+            with servico._get_conn():
+                pass
+            servico._liberar_conexao_requisicao()
+            assert servico.estatisticas_pool()["em_uso"] == 0
+
+            with servico._get_conn():
+                pass
+            assert servico.estatisticas_pool()["em_uso"] == 1
+
+        assert servico.estatisticas_pool()["em_uso"] == 0
+
+    def test_sem_registrar_app_usa_pool_direto(self, fabrica, monkeypatch):
+        """Sem registrar_app, cada bloco devolve a conexão imediatamente."""
+        from flask import Flask
+
+        monkeypatch.setattr(Conexao, "_abrir_conexao", lambda self: fabrica())
+        app = Flask(__name__)
+        servico = Conexao()
+
+        with app.test_request_context():
+            with servico._get_conn():
+                pass
+            assert servico.estatisticas_pool()["em_uso"] == 0
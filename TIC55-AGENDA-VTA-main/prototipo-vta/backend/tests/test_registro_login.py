@@ -0,0 +1,112 @@
+"""
+Testes para o write-behind de ultimo_login (services.registro_login.RegistroLogin)
+pytest test_registro_login.py -v
+"""
+
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.services.registro_login import RegistroLogin
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+
+    conn.cursor.return_value = cursor
+
+    return conn, cursor
+
+
+@pytest.fixture
+def registro():
+    return RegistroLogin(intervalo=60)
+
+
+AGORA = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestDescarga:
+    """Um UPDATE por lote."""
+
+    def test_lote_em_um_unico_update(self, registro, mock_conn):
+        conn, cursor = mock_conn
+        registro.registrar(1, AGORA)
+        registro.registrar(2, AGORA)
+        registro.registrar(1, AGORA + timedelta(minutes=5))
+        registro.registrar(1, AGORA - timedelta(minutes=5))
+
+        with patch.object(registro, '_get_conn', return_value=conn):
+            assert registro.descarregar() == 2
+
+        cursor.execute.assert_called_once()
+        ids, instantes = cursor.execute.call_args[0][1]
+        assert dict(zip(ids, instantes)) == {1: AGORA + timedelta(minutes=5), 2: AGORA}
+        assert registro.estatisticas()["pendentes"] == 0
+
+    def test_buffer_vazio_nao_acessa_banco(self, registro):
+        with patch.object(registro, '_get_conn') as get_conn:
+            assert registro.descarregar() == 0
+
+        get_conn.assert_not_called()
+
+    def test_falha_devolve_ao_buffer(self, registro, mock_conn):
+        conn, cursor = mock_conn
+        cursor.execute.side_effect = Exception("banco fora")
+        registro.registrar(1, AGORA)
+
+        with patch.object(registro, '_get_conn', return_value=conn):
+            assert registro.descarregar() == 0
+
+        estatisticas = registro.estatisticas()
+        assert estatisticas["pendentes"] == 1
+        assert estatisticas["falhas"] == 1
+
+
+class TestThread:
+    """Descarga periódica, antecipada e no encerramento."""
+
+    def test_parar_descarrega(self, registro, mock_conn):
+        conn, cursor = mock_conn
+        registro.iniciar()
+        registro.registrar(1, AGORA)
+
+        with patch.object(registro, '_get_conn', return_value=conn):
+            registro.parar()
+
+        cursor.execute.assert_called_once()
+        assert registro.estatisticas()["gravados"] == 1
+
+    def test_buffer_cheio_antecipa_descarga(self, mock_conn):
+        conn, cursor = mock_conn
+        registro = RegistroLogin(intervalo=60, max_pendentes=2)
+
+        with patch.object(registro, '_get_conn', return_value=conn):
+            registro.iniciar()
+            registro.registrar(1, AGORA)
+            registro.registrar(2, AGORA)
+
+            for _ in range(100):
+                if registro.estatisticas()["descargas"]:
+                    break
+                time.sleep(0.01)
+            registro.parar()
+
+        assert registro.estatisticas()["descargas"] == 1
@@ -0,0 +1,207 @@
+"""
+Testes para o SalaServico (camada de serviço, com banco simulado)
+pytest test_sala_servico.py -v
+"""
+
+import pytest
+from datetime import datetime
+from uuid import uuid4
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.services.cache_salas import CacheSalas
+from backend.services.sala_servico import SalaServico
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def servico():
+    """Cria instância do serviço para testes (com cache próprio, vazio)."""
+    return SalaServico(cache=CacheSalas())
+
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+    
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+    
+    conn.cursor.return_value = cursor
+    
+    return conn, cursor
+
+
+def linha_sala(nome, ativa=True, ocupada=False):
+    """Simula uma linha retornada pela consulta de status."""
+    return {
+        "uuid": str(uuid4()),
+        "nome": nome,
+        "tipo": "Consulta",
+        "ativa": ativa,
+        "ocupada": ocupada,
+    }
+
+
+# ============================================================================
+# TESTES DA CONSULTA DE STATUS EM LOTE
+# ============================================================================
+
+class TestConsultarStatusSalas:
+    """Testes do método consultar_status_salas."""
+    
+    def test_status_de_cada_sala(self, servico, mock_conn):
+        """Deve classificar salas em livre, ocupada e bloqueada."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [
+            linha_sala("Sala 1"),
+            linha_sala("Sala 2", ocupada=True),
+            linha_sala("Sala 3", ativa=False, ocupada=True),
+        ]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            resultado = servico.consultar_status_salas(datetime(2025, 1, 6, 10, 0))
+        
+        assert [status for _, status in resultado] == ["livre", "ocupada", "bloqueada"]
+        assert resultado[0][0].nome == "Sala 1"
+    
+    @pytest.mark.parametrize("quantidade", [1, 10, 200])
+    def test_uma_ida_ao_banco_independente_de_salas(self, servico, mock_conn, quantidade):
+        """O número de consultas não deve crescer com o número de salas."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha_sala(f"Sala {i}") for i in range(quantidade)]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            livres = servico.listar_salas_disponiveis(datetime(2025, 1, 6, 10, 0))
+        
+        assert len(livres) == quantidade
+        assert cursor.execute.call_count == 1
+    
+    def test_periodo_usa_sobreposicao(self, servico, mock_conn):
+        """Consulta por período deve usar sobreposição de intervalos."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = []
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.consultar_status_salas(
+                datetime(2025, 1, 6, 8, 0), datetime(2025, 1, 6, 12, 0)
+            )
+        
+        query, params = cursor.execute.call_args[0]
+        assert "a.inicio < %(fim)s AND a.fim > %(inicio)s" in query
+        assert params["fim"] == datetime(2025, 1, 6, 12, 0)
+    
+    def test_periodo_invalido(self, servico):
+        """Deve rejeitar período com início após o fim."""
+        with pytest.raises(ValueError):
+            servico.consultar_status_salas(
+                datetime(2025, 1, 6, 12, 0), datetime(2025, 1, 6, 8, 0)
+            )
+
+
+class TestConsultarDisponibilidade:
+    """Testes do método consultar_disponibilidade."""
+    
+    def test_sala_nao_encontrada(self, servico, mock_conn):
+        """Deve indicar sala inexistente."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = []
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            status = servico.consultar_disponibilidade(str(uuid4()), datetime(2025, 1, 6, 10, 0))
+        
+        assert status == "sala_nao_encontrada"
+    
+    def test_sala_ocupada(self, servico, mock_conn):
+        """Deve retornar o status calculado pela consulta em lote."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha_sala("Sala 1", ocupada=True)]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            status = servico.consultar_disponibilidade(str(uuid4()), datetime(2025, 1, 6, 10, 0))
+        
+        assert status == "ocupada"
+        assert cursor.execute.call_count == 1
+
+
+class TestInvalidacao:
+    """Escritas em sala publicam invalidação na mesma transação."""
+    
+    def test_desativar_publica_invalidacao(self, mock_conn):
+        """Deve publicar a sala alterada antes do commit."""
+        conn, cursor = mock_conn
+        cursor.rowcount = 1
+        barramento = Mock()
+        servico = SalaServico(barramento=barramento, cache=CacheSalas())
+        sala_uuid = str(uuid4())
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.desativar_sala(sala_uuid) is True
+        
+        barramento.publicar.assert_called_once_with(cursor, "sala", [sala_uuid])
+    
+    def test_sala_nao_encontrada_nao_publica(self, mock_conn):
+        """Sem linha alterada, nada a invalidar."""
+        conn, cursor = mock_conn
+        cursor.rowcount = 0
+        barramento = Mock()
+        servico = SalaServico(barramento=barramento, cache=CacheSalas())
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert servico.ativar_sala(str(uuid4())) is False
+        
+        barramento.publicar.assert_not_called()
+
+
+class TestCacheLeitura:
+    """Buscas de sala passam pelo cache antes do banco."""
+    
+    def test_buscar_sala_vai_ao_banco_uma_vez(self, servico, mock_conn):
+        """Segunda busca pela mesma sala não consulta o banco."""
+        conn, cursor = mock_conn
+        row = linha_sala("Sala 1")
+        cursor.fetchone.return_value = row
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            primeira = servico.buscar_sala(row["uuid"])
+            segunda = servico.buscar_sala(row["uuid"])
+            por_nome = servico.buscar_sala_por_nome("Sala 1")
+        
+        assert primeira.nome == segunda.nome == por_nome.nome == "Sala 1"
+        assert cursor.execute.call_count == 1
+        assert servico.cache.estatisticas()["acertos"] == 2
+    
+    def test_listar_salas_filtra_ativas_em_memoria(self, servico, mock_conn):
+        """A lista completa é cacheada; apenas_ativas não gera outra consulta."""
+        conn, cursor = mock_conn
+        cursor.fetchall.return_value = [linha_sala("Sala 1"), linha_sala("Sala 2", ativa=False)]
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            todas = servico.listar_salas()
+            ativas = servico.listar_salas(apenas_ativas=True)
+        
+        assert [s.nome for s in todas] == ["Sala 1", "Sala 2"]
+        assert [s.nome for s in ativas] == ["Sala 1"]
+        assert cursor.execute.call_count == 1
+    
+    def test_escrita_invalida_cache(self, mock_conn):
+        """Depois de desativar, a próxima busca volta ao banco."""
+        conn, cursor = mock_conn
+        servico = SalaServico(barramento=Mock(), cache=CacheSalas())
+        row = linha_sala("Sala 1")
+        cursor.fetchone.return_value = row
+        cursor.rowcount = 1
+        
+        with patch.object(servico, '_get_conn', return_value=conn):
+            servico.buscar_sala(row["uuid"])
+            servico.desativar_sala(row["uuid"])
+            servico.buscar_sala(row["uuid"])
+        
+        selects = [c for c in cursor.execute.call_args_list if c[0][0].startswith("SELECT")]
+        assert len(selects) == 2
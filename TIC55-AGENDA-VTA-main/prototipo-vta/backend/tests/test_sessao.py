@@ -0,0 +1,157 @@
+"""
+Testes para o retrato de permissões da sessão (services.sessao.SessaoPermissoes)
+pytest test_sessao.py -v
+"""
+
+import pytest
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.enums.perfil_usuario import PerfilUsuario
+from backend.enums.status_usuario import StatusUsuario
+from backend.models.usuario import Usuario
+from backend.services.autenticacao_servico import AutenticacaoServico
+from backend.services.sessao import SessaoPermissoes
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def mock_conn():
+    """Cria mock de conexão do banco."""
+    conn = MagicMock()
+    cursor = MagicMock()
+
+    conn.__enter__ = Mock(return_value=conn)
+    conn.__exit__ = Mock(return_value=False)
+    cursor.__enter__ = Mock(return_value=cursor)
+    cursor.__exit__ = Mock(return_value=False)
+
+    conn.cursor.return_value = cursor
+
+    return conn, cursor
+
+
+@pytest.fixture
+def sessoes():
+    return SessaoPermissoes(barramento=Mock())
+
+
+@pytest.fixture
+def usuario():
+    return Usuario(
+        nome="Ana Souza",
+        email="ana@vta.com",
+        senha_hash="100000$00$00",
+        perfil=PerfilUsuario.RECEPCIONISTA,
+    )
+
+
+def linha(perfil="recepcionista", status="ativo", versao=1):
+    return {"perfil": perfil, "status": status, "versao_permissoes": versao}
+
+
+# ============================================================================
+# TESTES
+# ============================================================================
+
+class TestPode:
+    """Autorização a partir do retrato, sem banco."""
+
+    def test_mesma_regra_do_usuario(self, usuario):
+        snapshot = SessaoPermissoes.criar_snapshot(usuario, 1)
+
+        for acao in ("visualizar", "criar", "editar", "excluir"):
+            assert SessaoPermissoes.pode(snapshot, acao) == usuario.pode(acao)
+
+    def test_admin_e_inativo(self, usuario):
+        snapshot = SessaoPermissoes.criar_snapshot(usuario, 1)
+
+        assert SessaoPermissoes.pode({**snapshot, "perfil": "admin"}, "excluir") is True
+        assert SessaoPermissoes.pode({**snapshot, "status": "inativo"}, "visualizar") is False
+        assert SessaoPermissoes.pode(None, "visualizar") is False
+
+
+class TestValidar:
+    """Conferência do retrato com a versão de permissões."""
+
+    def test_versao_em_memoria_nao_consulta_banco(self, sessoes, usuario, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha()
+
+        with patch.object(sessoes, '_get_conn', return_value=conn):
+            snapshot = sessoes.iniciar(usuario)
+            for _ in range(5):
+                assert sessoes.validar(snapshot) is snapshot
+
+        assert cursor.execute.call_count == 1
+        assert sessoes.estatisticas()["acertos"] == 5
+
+    def test_versao_nova_renova_uma_vez(self, sessoes, usuario, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha()
+
+        with patch.object(sessoes, '_get_conn', return_value=conn):
+            snapshot = sessoes.iniciar(usuario)
+
+            cursor.fetchone.return_value = linha(perfil="admin", versao=2)
+            sessoes.invalidar(["ana@vta.com"])
+            renovado = sessoes.validar(snapshot)
+
+            assert renovado["perfil"] == "admin"
+            assert renovado["versao"] == 2
+            assert sessoes.validar(renovado) is renovado
+
+        assert cursor.execute.call_count == 2
+        assert sessoes.estatisticas()["renovadas"] == 1
+
+    def test_usuario_desativado_encerra_sessao(self, sessoes, usuario, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.return_value = linha(status="inativo", versao=2)
+        snapshot = SessaoPermissoes.criar_snapshot(usuario, 1)
+
+        with patch.object(sessoes, '_get_conn', return_value=conn):
+            assert sessoes.validar(snapshot) is None
+
+        assert sessoes.estatisticas()["encerradas"] == 1
+
+    def test_consulta_antiga_nao_repovoa(self, sessoes, usuario, mock_conn):
+        """Invalidação durante a consulta: a versão lida não fica em memória."""
+        conn, cursor = mock_conn
+
+        def ler_e_invalidar():
+            sessoes.invalidar(["ana@vta.com"])
+            return linha()
+        cursor.fetchone.side_effect = ler_e_invalidar
+
+        with patch.object(sessoes, '_get_conn', return_value=conn):
+            sessoes.iniciar(usuario)
+
+        assert sessoes.estatisticas()["tamanho"] == 0
+
+    def test_registra_no_barramento(self):
+        barramento = Mock()
+        sessoes = SessaoPermissoes(barramento=barramento)
+
+        barramento.registrar.assert_called_once_with("usuario", sessoes.invalidar)
+
+
+class TestVersaoNoServico:
+    """AutenticacaoServico incrementa a versão e invalida a memória."""
+
+    @pytest.mark.parametrize("metodo, args", [
+        ("atualizar_perfil_usuario", ("Ana@vta.com", PerfilUsuario.ADMIN)),
+        ("desativar_usuario", ("Ana@vta.com",)),
+    ])
+    def test_incrementa_versao(self, metodo, args, mock_conn):
+        conn, cursor = mock_conn
+        cursor.rowcount = 1
+        sessoes = Mock()
+        servico = AutenticacaoServico(barramento=Mock(), sessoes=sessoes)
+
+        with patch.object(servico, '_get_conn', return_value=conn):
+            assert getattr(servico, metodo)(*args) is True
+
+        assert "versao_permissoes = versao_permissoes + 1" in cursor.execute.call_args[0][0]
+        sessoes.invalidar.assert_called_once_with(["ana@vta.com"])
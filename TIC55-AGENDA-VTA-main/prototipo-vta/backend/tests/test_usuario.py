@@ -325,6 +325,29 @@ class TestValidarSenha:
         assert Usuario.validar_senha(123, "senha") is False
 
 
+class TestPrecisaRehash:
+    """Testes do método precisa_rehash."""
+    
+    def test_hash_atual_nao_precisa(self):
+        """Hash com as iterações atuais está em dia."""
+        assert Usuario.precisa_rehash(Usuario.hash_senha("senha123")) is False
+    
+    def test_menos_iteracoes_precisa(self):
+        """Hash com menos iterações que o atual deve ser regravado."""
+        assert Usuario.precisa_rehash(Usuario.hash_senha("senha123", iterations=100_000)) is True
+    
+    def test_sha256_legado_precisa(self):
+        """Hash SHA256 sem salt deve ser regravado."""
+        legado = hashlib.sha256(b"senha123").hexdigest()
+        assert Usuario.precisa_rehash(legado) is True
+    
+    def test_hash_ilegivel(self):
+        """Hash inválido não dispara regravação."""
+        assert Usuario.precisa_rehash("abc$def$ghi") is False
+        assert Usuario.precisa_rehash("") is False
+        assert Usuario.precisa_rehash(None) is False
+
+
 # ============================================================================
 # TESTES DE STATUS
 # ============================================================================
@@ -494,6 +517,36 @@ class TestPermissoes:
         assert len(permissoes) == 0
 
 
+class TestMascaraPermissoes:
+    """Política compilada em máscaras de bits."""
+
+    def test_mascaras_equivalem_ao_mapa(self):
+        for perfil, permissoes in Usuario.PERMISSOES_POR_PERFIL.items():
+            if perfil == PerfilUsuario.ADMIN:
+                continue
+            for acao, bit in Usuario.BIT_POR_ACAO.items():
+                assert bool(Usuario.MASCARA_POR_PERFIL[perfil] & bit) == (acao in permissoes)
+
+    def test_get_permissoes_nao_recria_set(self, usuario_admin):
+        assert usuario_admin.get_permissoes() is usuario_admin.get_permissoes()
+
+    def test_bit_permissao(self):
+        assert Usuario.bit_permissao(" EDITAR ") == Usuario.BIT_POR_ACAO["editar"]
+        assert Usuario.bit_permissao("qualquer_coisa") == Usuario.BIT_OUTRAS_ACOES
+        assert Usuario.bit_permissao("") == 0
+        assert Usuario.bit_permissao(None) == 0
+
+    def test_perfis_com_permissao(self):
+        assert Usuario.perfis_com_permissao("criar") == {PerfilUsuario.ADMIN, PerfilUsuario.RECEPCIONISTA}
+        assert Usuario.perfis_com_permissao("qualquer_coisa") == {PerfilUsuario.ADMIN}
+
+    def test_filtrar_por_permissao(self, usuario_admin, usuario_valido, usuario_inativo):
+        usuarios = [usuario_valido, usuario_admin, usuario_inativo]
+
+        assert Usuario.filtrar_por_permissao(usuarios, "visualizar") == [usuario_valido, usuario_admin]
+        assert Usuario.filtrar_por_permissao(usuarios, "editar") == [usuario_admin]
+
+
 # ============================================================================
 # TESTES DE SERIALIZAÇÃO
 # ============================================================================